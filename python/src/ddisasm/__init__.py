@@ -5,6 +5,8 @@ from contextlib import contextmanager
 from typing import Iterator
 
 from .version import __version__
+from ._driver import run_ddisasm
+from .worker import Worker, WorkerError
 
 if hasattr(native_importlib_resources, "files"):
     importlib_resources = native_importlib_resources
@@ -12,7 +14,13 @@ else:
     import importlib_resources  # type: ignore
 
 
-__all__ = ["ddisasm_path", "__version__"]
+__all__ = [
+    "ddisasm_path",
+    "run_ddisasm",
+    "Worker",
+    "WorkerError",
+    "__version__",
+]
 
 
 @contextmanager
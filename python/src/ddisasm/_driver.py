@@ -0,0 +1,124 @@
+import io
+import os
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Union
+
+if TYPE_CHECKING:
+    import gtirb
+
+    from .cache import ResultCache
+
+PathOrBytes = Union[str, "os.PathLike[str]", bytes]
+
+# Options that select where ddisasm writes its output. The Python API always
+# collects the output itself, so callers may not override them.
+_OUTPUT_OPTIONS = {"ir", "json", "asm"}
+
+
+def build_args(**options: Any) -> List[str]:
+    """
+    Convert keyword options into ddisasm command-line arguments.
+
+    Option names use underscores in place of dashes, e.g.
+    ``skip_function_analysis=True`` becomes ``--skip-function-analysis``.
+    Boolean options are emitted as flags when true and omitted when false,
+    ``None`` values are omitted, and lists are passed as multiple tokens.
+    """
+    args = []
+    for name, value in options.items():
+        if name in _OUTPUT_OPTIONS:
+            raise ValueError(f"option '{name}' is managed by the ddisasm API")
+        if value is None or value is False:
+            continue
+        flag = "--" + name.replace("_", "-")
+        if value is True:
+            args.append(flag)
+        elif isinstance(value, (list, tuple)):
+            args.append(flag)
+            args.extend(str(v) for v in value)
+        else:
+            args.extend([flag, str(value)])
+    return args
+
+
+@contextmanager
+def input_path(path_or_bytes: PathOrBytes) -> Iterator[str]:
+    """
+    Yield a path on disk for the input binary.
+
+    Raw bytes are written to a temporary file that is removed on exit.
+    """
+    if not isinstance(path_or_bytes, bytes):
+        yield os.fspath(path_or_bytes)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="ddisasm-") as tmpdir:
+        path = os.path.join(tmpdir, "input.bin")
+        with open(path, "wb") as f:
+            f.write(path_or_bytes)
+        yield path
+
+
+def load_ir(data: bytes) -> "gtirb.IR":
+    """
+    Deserialize a GTIRB protobuf stream held in memory.
+    """
+    # Imported lazily so that the console entry point does not pay for
+    # loading gtirb and protobuf.
+    import gtirb
+
+    return gtirb.IR.load_protobuf_file(io.BytesIO(data))
+
+
+def run_ddisasm(
+    path_or_bytes: PathOrBytes,
+    cache: Optional["ResultCache"] = None,
+    **options: Any,
+) -> "gtirb.IR":
+    """
+    Run the ddisasm executable on a binary and return its GTIRB
+    representation.
+
+    This is a convenience wrapper around the command line: each call starts
+    a new ddisasm process, so the analysis does not run in the Python
+    interpreter. Use `ddisasm.Worker` to amortize process startup over many
+    binaries.
+
+    `path_or_bytes` is either the path of the binary or its raw contents.
+    Keyword options are forwarded to ddisasm as command-line arguments (see
+    `build_args`), e.g. ``run_ddisasm("ex", threads=4, hints="hints.csv")``.
+
+    The IR is streamed from ddisasm's stdout and deserialized in memory, so no
+    intermediate .gtirb file is written. If a `ddisasm.cache.ResultCache` is
+    given, a cached IR for the same input and options is returned without
+    running ddisasm, and new results are added to the cache.
+
+    Raises subprocess.CalledProcessError if ddisasm fails; its `stderr`
+    attribute holds ddisasm's diagnostic output.
+    """
+    from . import ddisasm_path
+
+    args = build_args(**options)
+    if cache is not None:
+        key = cache.key_for(path_or_bytes, "ir", **options)
+        cached = cache.get(key)
+        if cached is not None:
+            return load_ir(cached)
+
+    with ddisasm_path() as tool_path, input_path(path_or_bytes) as path:
+        cmd = [str(tool_path), path, "--ir", "-"] + args
+        completed = subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+        )
+    if completed.returncode != 0:
+        raise subprocess.CalledProcessError(
+            completed.returncode,
+            cmd,
+            output=completed.stdout,
+            stderr=completed.stderr,
+        )
+    if cache is not None:
+        cache.put(key, completed.stdout)
+    return load_ir(completed.stdout)
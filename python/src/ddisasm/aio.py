@@ -0,0 +1,218 @@
+import asyncio
+import codecs
+import functools
+import re
+import subprocess
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from ._driver import PathOrBytes, build_args, input_path, load_ir
+
+if TYPE_CHECKING:
+    import gtirb
+
+    from .cache import ResultCache
+
+
+class ProgressEvent(NamedTuple):
+    """
+    A progress report parsed from ddisasm's stderr.
+
+    `kind` is one of the pass phases printed by ddisasm ("load", "compute"
+    or "transform"), in which case `seconds` holds the phase's run time, or
+    "warning"/"error", in which case `message` holds the diagnostic.
+    """
+
+    kind: str
+    module: Optional[str]
+    pass_name: Optional[str]
+    seconds: Optional[float] = None
+    message: Optional[str] = None
+
+
+_PASS_NAME = re.compile(r"^ {4}(\S.*?) {2,}")
+_PHASE = re.compile(r"(load|compute|transform) \[\s*([0-9hms]+)\]")
+_DURATION = re.compile(r"(\d+)(ms|h|m|s)")
+_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(text: str) -> float:
+    """
+    Convert a duration printed by ddisasm (e.g. "1m3s", "15ms") to seconds.
+    """
+    return sum(int(n) * _UNITS[unit] for n, unit in _DURATION.findall(text))
+
+
+class ProgressParser:
+    """
+    Incrementally parse the pass progress that ddisasm prints to stderr.
+
+    ddisasm reports each phase on the pass' line as soon as it completes, so
+    events are produced from partial lines as well as complete ones.
+    """
+
+    def __init__(self):
+        self.module: Optional[str] = None
+        self.pass_name: Optional[str] = None
+        self._line = ""
+        self._phases_seen = 0
+
+    def feed(self, text: str) -> List[ProgressEvent]:
+        """
+        Consume more stderr output and return the events it completes.
+        """
+        events = []
+        self._line += text
+        while "\n" in self._line:
+            line, self._line = self._line.split("\n", 1)
+            events.extend(self._scan(line, complete=True))
+            self._phases_seen = 0
+        events.extend(self._scan(self._line, complete=False))
+        return events
+
+    def _scan(self, line: str, complete: bool) -> List[ProgressEvent]:
+        for prefix, kind in (("WARNING: ", "warning"), ("ERROR: ", "error")):
+            if line.startswith(prefix):
+                if not complete:
+                    return []
+                message = line[len(prefix) :]
+                return [
+                    ProgressEvent(
+                        kind, self.module, self.pass_name, message=message
+                    )
+                ]
+
+        if line.startswith("Processing module: "):
+            if complete:
+                self.module = line[len("Processing module: ") :]
+                self.pass_name = None
+            return []
+
+        match = _PASS_NAME.match(line)
+        if match:
+            self.pass_name = match.group(1)
+
+        phases = _PHASE.findall(line)[self._phases_seen :]
+        self._phases_seen += len(phases)
+        return [
+            ProgressEvent(
+                kind, self.module, self.pass_name, parse_duration(elapsed)
+            )
+            for kind, elapsed in phases
+        ]
+
+
+async def _communicate(
+    process: asyncio.subprocess.Process,
+    progress: Optional[Callable[[ProgressEvent], None]],
+) -> Tuple[bytes, bytes]:
+    async def read_stderr() -> bytes:
+        parser = ProgressParser()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        chunks = []
+        while True:
+            data = await process.stderr.read(4096)
+            if not data:
+                break
+            chunks.append(data)
+            if progress is not None:
+                for event in parser.feed(decoder.decode(data)):
+                    progress(event)
+        return b"".join(chunks)
+
+    stdout, stderr = await asyncio.gather(process.stdout.read(), read_stderr())
+    await process.wait()
+    return stdout, stderr
+
+
+async def _disassemble(
+    path_or_bytes: PathOrBytes,
+    timeout: Optional[float],
+    progress: Optional[Callable[[ProgressEvent], None]],
+    args: List[str],
+) -> bytes:
+    """
+    Run ddisasm and return the GTIRB it writes to stdout.
+    """
+    from . import ddisasm_path
+
+    with ddisasm_path() as tool_path, input_path(path_or_bytes) as path:
+        cmd = [str(tool_path), path, "--ir", "-"] + args
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                _communicate(process, progress), timeout
+            )
+        except BaseException:
+            # Cancelled or timed out: do not leave ddisasm running.
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode, cmd, output=stdout, stderr=stderr
+        )
+    return stdout
+
+
+async def disassemble(
+    path_or_bytes: PathOrBytes,
+    *,
+    limit: Optional[asyncio.Semaphore] = None,
+    timeout: Optional[float] = None,
+    progress: Optional[Callable[[ProgressEvent], None]] = None,
+    cache: Optional["ResultCache"] = None,
+    **options: Any,
+) -> "gtirb.IR":
+    """
+    Disassemble a binary in a ddisasm subprocess without blocking the loop.
+
+    :param path_or_bytes: The path of the binary or its raw contents.
+    :param limit: A semaphore shared by all jobs that should count against
+        the same concurrency bound; the ddisasm process is only started once
+        the semaphore is acquired.
+    :param timeout: Seconds after which ddisasm is killed and
+        asyncio.TimeoutError is raised.
+    :param progress: Called with a ProgressEvent each time ddisasm reports
+        a completed pass phase, warning or error.
+    :param cache: A `ddisasm.cache.ResultCache`, as for
+        `ddisasm.run_ddisasm`. Cache hits do not acquire `limit`.
+    :param options: ddisasm command-line options, as for
+        `ddisasm.run_ddisasm`.
+
+    Cancelling the returned coroutine kills the ddisasm process. Raises
+    subprocess.CalledProcessError if ddisasm fails.
+    """
+    args = build_args(**options)
+    loop = asyncio.get_running_loop()
+    if cache is not None:
+        # Hashing the input and reading the cache entry are blocking file I/O.
+        key = await loop.run_in_executor(
+            None,
+            functools.partial(cache.key_for, path_or_bytes, "ir", **options),
+        )
+        cached = await loop.run_in_executor(None, cache.get, key)
+        if cached is not None:
+            return await loop.run_in_executor(None, load_ir, cached)
+
+    if limit is None:
+        data = await _disassemble(path_or_bytes, timeout, progress, args)
+    else:
+        async with limit:
+            data = await _disassemble(path_or_bytes, timeout, progress, args)
+    if cache is not None:
+        await loop.run_in_executor(None, cache.put, key, data)
+
+    # Deserializing a large IR is CPU bound; keep it off the event loop.
+    return await loop.run_in_executor(None, load_ir, data)
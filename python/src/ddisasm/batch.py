@@ -0,0 +1,199 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from timeit import default_timer as timer
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from ._driver import build_args
+from .stats import PipelineStats, load_stats
+
+if TYPE_CHECKING:
+    from .cache import ResultCache
+
+# Input size handled efficiently by each additional Datalog thread. Smaller
+# binaries are analyzed with a single thread so that more of them can run
+# side by side.
+BYTES_PER_THREAD = 2 * 1024 * 1024
+
+
+class BatchResult(NamedTuple):
+    """
+    The outcome of disassembling one binary with `disassemble_many`.
+    """
+
+    path: str
+    output: str
+    returncode: int
+    threads: int
+    wall_time: float
+    peak_rss: Optional[int]
+    stderr: bytes
+    stats: Optional[PipelineStats] = None
+
+
+def threads_for_size(size: int, max_threads: int) -> int:
+    """
+    Choose the number of Datalog threads (`-j`) for a binary of `size` bytes.
+    """
+    return max(1, min(max_threads, size // BYTES_PER_THREAD))
+
+
+class _Slots:
+    """
+    Counting semaphore that hands out several slots at once.
+    """
+
+    def __init__(self, count: int):
+        self._free = count
+        self._cond = threading.Condition()
+
+    def acquire(self, count: int) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: self._free >= count)
+            self._free -= count
+
+    def release(self, count: int) -> None:
+        with self._cond:
+            self._free += count
+            self._cond.notify_all()
+
+
+def _run(cmd: List[str]) -> Tuple[int, Optional[int], bytes]:
+    """
+    Run a command and return its exit code, peak RSS in bytes (if the
+    platform reports it) and stderr.
+    """
+    process = subprocess.Popen(
+        cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    if not hasattr(os, "wait4"):
+        _, stderr = process.communicate()
+        return process.returncode, None, stderr
+
+    # Reap the child ourselves to collect its resource usage.
+    stderr = process.stderr.read()
+    process.stderr.close()
+    _, status, usage = os.wait4(process.pid, 0)
+    if os.WIFEXITED(status):
+        process.returncode = os.WEXITSTATUS(status)
+    else:
+        process.returncode = -os.WTERMSIG(status)
+
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return process.returncode, usage.ru_maxrss * scale, stderr
+
+
+def disassemble_many(
+    paths: Iterable[str],
+    jobs: Optional[int] = None,
+    threads_per_job: Optional[int] = None,
+    output_dir: Optional[str] = None,
+    cache: Optional["ResultCache"] = None,
+    **options: Any,
+) -> Iterator[BatchResult]:
+    """
+    Disassemble many binaries with a pool of ddisasm processes.
+
+    `jobs` is the number of CPU slots to fill (defaults to the number of
+    CPUs). Each binary is given between 1 and `threads_per_job` (defaults to
+    `jobs`) Datalog threads based on its size and occupies that many slots
+    while it runs, so large binaries get more threads and small binaries run
+    side by side. Binaries are started largest first.
+
+    The GTIRB of each binary is written to `output_dir` (or next to the
+    input if not given) as ``<name>.gtirb``. Other keyword options are
+    passed to ddisasm as in `ddisasm.run_ddisasm`.
+
+    Results are yielded as soon as each binary finishes, together with the
+    per-pass statistics reported by ddisasm.
+
+    If a `ddisasm.cache.ResultCache` is given, binaries with a cached IR are
+    not disassembled: the IR is copied to the output and the result has
+    zero threads and no statistics. New IRs are added to the cache.
+    """
+    from . import ddisasm_path
+
+    jobs = jobs or os.cpu_count() or 1
+    threads_per_job = min(threads_per_job or jobs, jobs)
+    if "threads" in options:
+        raise ValueError("'threads' is chosen per binary by disassemble_many")
+    args = build_args(**options)
+
+    inputs = sorted((str(p) for p in paths), key=os.path.getsize, reverse=True)
+    outputs = {}
+    for path in inputs:
+        directory = Path(output_dir) if output_dir else Path(path).parent
+        outputs[path] = str(directory / (Path(path).name + ".gtirb"))
+    if len(set(outputs.values())) != len(outputs):
+        raise ValueError("input files must have distinct names")
+
+    slots = _Slots(jobs)
+
+    def run_one(tool_path: Path, path: str) -> BatchResult:
+        if cache is not None:
+            key = cache.key_for(path, "ir", **options)
+            cached = cache.get(key)
+            if cached is not None:
+                with open(outputs[path], "wb") as f:
+                    f.write(cached)
+                return BatchResult(path, outputs[path], 0, 0, 0.0, None, b"")
+
+        threads = threads_for_size(os.path.getsize(path), threads_per_job)
+        cmd = [str(tool_path), path, "--ir", outputs[path]]
+        cmd += ["--threads", str(threads)] + args
+
+        fd, stats_path = tempfile.mkstemp(prefix="ddisasm-", suffix=".json")
+        os.close(fd)
+        cmd += ["--stats-json", stats_path]
+        try:
+            slots.acquire(threads)
+            try:
+                start = timer()
+                returncode, peak_rss, stderr = _run(cmd)
+                wall_time = timer() - start
+            finally:
+                slots.release(threads)
+            stats = load_stats(stats_path) if returncode == 0 else None
+        finally:
+            os.unlink(stats_path)
+
+        if cache is not None and returncode == 0:
+            with open(outputs[path], "rb") as f:
+                cache.put(key, f.read())
+
+        return BatchResult(
+            path,
+            outputs[path],
+            returncode,
+            threads,
+            wall_time,
+            peak_rss,
+            stderr,
+            stats,
+        )
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with ddisasm_path() as tool_path, ThreadPoolExecutor(jobs) as executor:
+        futures = [executor.submit(run_one, tool_path, p) for p in inputs]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Optional
+
+from ._driver import PathOrBytes
+from .version import __version__
+
+# Options that do not change the disassembly result.
+_IGNORED_OPTIONS = {"threads"}
+
+# Options whose value is a file whose contents affect the result.
+_FILE_OPTIONS = {"hints"}
+
+# Temporary files older than this are left over from crashed writers.
+_STALE_TEMPFILE_AGE = 3600
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    A content-addressed, size-bounded cache of ddisasm outputs on disk.
+
+    Entries are keyed on the SHA-256 of the input binary, the ddisasm
+    version, the kind of output and the options that affect it. Entries are
+    written atomically, so several processes may share one directory. When
+    the cache grows past `max_size` bytes, the least recently used entries
+    are evicted.
+    """
+
+    def __init__(self, directory: str, max_size: int = 10 * 1024**3):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, input_hash: str, kind: str = "ir", **options: Any) -> str:
+        """
+        Compute the cache key for an input and ddisasm options.
+
+        :param input_hash: The SHA-256 hex digest of the input binary.
+        :param kind: The kind of output, e.g. "ir" or "asm".
+        """
+        relevant = {}
+        for name, value in options.items():
+            if name in _IGNORED_OPTIONS or value is None or value is False:
+                continue
+            if name in _FILE_OPTIONS:
+                value = _hash_file(value)
+            elif isinstance(value, (list, tuple)):
+                value = [str(v) for v in value]
+            elif value is not True:
+                value = str(value)
+            relevant[name] = value
+
+        description = json.dumps(
+            [__version__, kind, input_hash, relevant], sort_keys=True
+        )
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def key_for(
+        self, path_or_bytes: PathOrBytes, kind: str = "ir", **options: Any
+    ) -> str:
+        """
+        Compute the cache key for a binary given by path or contents.
+        """
+        if isinstance(path_or_bytes, bytes):
+            input_hash = hashlib.sha256(path_or_bytes).hexdigest()
+        else:
+            input_hash = _hash_file(os.fspath(path_or_bytes))
+        return self.key(input_hash, kind, **options)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Return the cached output for `key`, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        # Record the use for LRU eviction.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Store the output for `key`, evicting old entries if necessary.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until the cache fits `max_size`.
+        """
+        now = time.time()
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith(".tmp-"):
+                    if now - stat.st_mtime > _STALE_TEMPFILE_AGE:
+                        self._remove(entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        # Another process sharing the cache may have removed it already.
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,82 @@
+import json
+from typing import Any, Dict, List, NamedTuple, Optional
+
+
+class PhaseStats(NamedTuple):
+    """
+    Statistics for one phase ("load", "analyze" or "transform") of a pass.
+
+    `peak_rss_delta` is measured for the whole ddisasm process, so with
+    ``module_jobs`` greater than 1 it includes concurrent modules.
+    """
+
+    phase: str
+    wall_time: float
+    cpu_time: float
+    peak_rss_delta: int
+
+
+class PassStats(NamedTuple):
+    """
+    Statistics for one analysis pass run on one module.
+    """
+
+    module: str
+    name: str
+    phases: Dict[str, PhaseStats]
+    relations: Dict[str, int]
+
+    @property
+    def wall_time(self) -> float:
+        return sum(p.wall_time for p in self.phases.values())
+
+    @property
+    def cpu_time(self) -> float:
+        return sum(p.cpu_time for p in self.phases.values())
+
+
+class PipelineStats(NamedTuple):
+    """
+    The statistics written by ``ddisasm --stats-json``.
+    """
+
+    ddisasm_version: str
+    passes: List[PassStats]
+
+    def find(self, name: str, module: Optional[str] = None) -> List[PassStats]:
+        """
+        Return the runs of the pass `name`, optionally only for `module`.
+        """
+        return [
+            p
+            for p in self.passes
+            if p.name == name and (module is None or p.module == module)
+        ]
+
+
+def parse_stats(data: Dict[str, Any]) -> PipelineStats:
+    """
+    Build a PipelineStats from the decoded JSON document.
+    """
+    passes = []
+    for entry in data["passes"]:
+        phases = {
+            p["phase"]: PhaseStats(
+                p["phase"], p["wall_time"], p["cpu_time"], p["peak_rss_delta"]
+            )
+            for p in entry["phases"]
+        }
+        passes.append(
+            PassStats(
+                entry["module"], entry["pass"], phases, entry["relations"]
+            )
+        )
+    return PipelineStats(data["ddisasm_version"], passes)
+
+
+def load_stats(path: str) -> PipelineStats:
+    """
+    Load a file written by ``ddisasm --stats-json``.
+    """
+    with open(path) as f:
+        return parse_stats(json.load(f))
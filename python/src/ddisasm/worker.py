@@ -0,0 +1,152 @@
+import os
+import subprocess
+import threading
+from contextlib import ExitStack
+from typing import IO, TYPE_CHECKING, Any, Optional, Union
+
+from ._driver import PathOrBytes, build_args, input_path, load_ir
+
+if TYPE_CHECKING:
+    import gtirb
+
+    from .cache import ResultCache
+
+
+class WorkerError(Exception):
+    """
+    Raised when a ddisasm worker fails to serve a request.
+    """
+
+
+class Worker:
+    """
+    A long-lived ddisasm process that disassembles many binaries.
+
+    The worker runs ``ddisasm --serve`` and sends it one request per binary,
+    so process startup is paid once per worker instead of once per binary.
+    Keyword options are converted to ddisasm command-line arguments as in
+    `ddisasm.run_ddisasm` and apply to every request.
+
+    A worker is not restarted while it is healthy. If the ddisasm process
+    exits (e.g. after a fatal analysis error), the pending request raises
+    WorkerError and the next request starts a fresh process.
+
+    Requests are serialized; use one worker per thread for concurrency.
+    """
+
+    def __init__(
+        self,
+        stderr: Optional[Union[int, IO[Any]]] = None,
+        cache: Optional["ResultCache"] = None,
+        **options: Any,
+    ):
+        """
+        :param stderr: Where the worker's progress output goes; accepts the
+            same values as `subprocess.Popen`. Defaults to inheriting this
+            process' stderr.
+        :param cache: A `ddisasm.cache.ResultCache` to look results up in
+            before sending requests, and to add new results to.
+        """
+        self._args = build_args(**options)
+        self._options = options
+        self._cache = cache
+        self._stderr = stderr
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._resources = ExitStack()
+
+    def __enter__(self) -> "Worker":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def disassemble(self, path_or_bytes: PathOrBytes) -> "gtirb.IR":
+        """
+        Disassemble a binary and return its GTIRB representation.
+        """
+        return load_ir(self._request("ir", path_or_bytes))
+
+    def disassemble_asm(self, path_or_bytes: PathOrBytes) -> str:
+        """
+        Disassemble a binary and return its assembly listing.
+        """
+        return self._request("asm", path_or_bytes).decode()
+
+    def close(self) -> None:
+        """
+        Stop the worker process.
+        """
+        with self._lock:
+            self._stop()
+
+    def _start(self) -> subprocess.Popen:
+        from . import ddisasm_path
+
+        if self._process is not None and self._process.poll() is None:
+            return self._process
+        self._stop()
+
+        tool_path = self._resources.enter_context(ddisasm_path())
+        self._process = subprocess.Popen(
+            [str(tool_path), "--serve"] + self._args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+        )
+        return self._process
+
+    def _stop(self) -> None:
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except (BrokenPipeError, OSError):
+                # The process exited with a request still buffered.
+                pass
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+        self._resources.close()
+
+    def _request(self, kind: str, path_or_bytes: PathOrBytes) -> bytes:
+        if self._cache is None:
+            return self._send(kind, path_or_bytes)
+
+        key = self._cache.key_for(path_or_bytes, kind, **self._options)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        payload = self._send(kind, path_or_bytes)
+        self._cache.put(key, payload)
+        return payload
+
+    def _send(self, kind: str, path_or_bytes: PathOrBytes) -> bytes:
+        with self._lock, input_path(path_or_bytes) as path:
+            request = os.fsencode(os.path.abspath(path))
+            if b"\n" in request:
+                raise ValueError(f"unsupported input path: {path!r}")
+
+            process = self._start()
+            try:
+                process.stdin.write(kind.encode() + b" " + request + b"\n")
+                process.stdin.flush()
+                header = process.stdout.readline()
+            except BrokenPipeError:
+                header = b""
+            if not header:
+                self._stop()
+                raise WorkerError("ddisasm worker exited unexpectedly")
+
+            status, size = header.split()
+            payload = process.stdout.read(int(size))
+            if len(payload) != int(size):
+                self._stop()
+                raise WorkerError("ddisasm worker exited unexpectedly")
+
+        if status != b"ok":
+            raise WorkerError(payload.decode(errors="replace"))
+        return payload
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import subprocess
+import unittest
+from unittest import mock
+
+from ddisasm import aio
+from ddisasm.aio import ProgressEvent, ProgressParser
+from fake_ddisasm import FakeDdisasmTestCase
+
+# The progress printed by ddisasm for a module, with a warning reported in
+# the middle of a pass' line.
+STDERR = (
+    "Building the initial gtirb representation [  20ms]\n"
+    "Processing module: ex\n"
+    "    disassembly              load [  15ms]     compute [  1m3s]"
+    "   transform [ 250ms]\n"
+    "    SCC analysis                                    compute [   2ms]"
+    "                    \n"
+    "    no return analysis       load [   1ms]\n"
+    "WARNING: no return analysis: something odd\n"
+    "                                                    compute [    2s]"
+    "   transform [   3ms]\n"
+    "ERROR: cannot disassemble\n"
+)
+
+EVENTS = [
+    ProgressEvent("load", "ex", "disassembly", 0.015),
+    ProgressEvent("compute", "ex", "disassembly", 63.0),
+    ProgressEvent("transform", "ex", "disassembly", 0.25),
+    ProgressEvent("compute", "ex", "SCC analysis", 0.002),
+    ProgressEvent("load", "ex", "no return analysis", 0.001),
+    ProgressEvent(
+        "warning",
+        "ex",
+        "no return analysis",
+        message="no return analysis: something odd",
+    ),
+    ProgressEvent("compute", "ex", "no return analysis", 2.0),
+    ProgressEvent("transform", "ex", "no return analysis", 0.003),
+    ProgressEvent(
+        "error", "ex", "no return analysis", message="cannot disassemble"
+    ),
+]
+
+
+class ProgressParserTest(unittest.TestCase):
+    def test_duration(self):
+        self.assertEqual(aio.parse_duration("15ms"), 0.015)
+        self.assertEqual(aio.parse_duration("1m3s"), 63.0)
+        self.assertEqual(aio.parse_duration("2h5m"), 7500.0)
+
+    def test_whole(self):
+        self.assertEqual(ProgressParser().feed(STDERR), EVENTS)
+
+    def test_pieces(self):
+        """
+        Phases are reported as soon as they are printed, whatever the size
+        of the pieces the output arrives in.
+        """
+        for size in (1, 5, 64):
+            with self.subTest(size=size):
+                parser = ProgressParser()
+                events = []
+                for i in range(0, len(STDERR), size):
+                    events.extend(parser.feed(STDERR[i : i + size]))
+                self.assertEqual(events, EVENTS)
+
+        parser = ProgressParser()
+        parser.feed("Processing module: ex\n")
+        self.assertEqual(
+            parser.feed("    disassembly              load [  15ms]"),
+            EVENTS[:1],
+        )
+        self.assertEqual(parser.feed("     compute [ "), [])
+        self.assertEqual(parser.feed(" 1m3s]"), EVENTS[1:2])
+
+
+class AioTest(FakeDdisasmTestCase):
+    def setUp(self):
+        super().setUp()
+        self.log = os.path.join(self.tmpdir, "log")
+        patchers = [
+            mock.patch("ddisasm.aio.load_ir", lambda data: data),
+            mock.patch.dict(os.environ, {"FAKE_DDISASM_LOG": self.log}),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def max_overlap(self):
+        """Return the largest number of ddisasm runs that overlapped."""
+        events = []
+        with open(self.log) as f:
+            for line in f:
+                _, start, end, _ = line.split(" ", 3)
+                events.append((float(start), 1))
+                events.append((float(end), -1))
+        # Sort ends before starts at the same time.
+        events.sort()
+        running = overlap = 0
+        for _, change in events:
+            running += change
+            overlap = max(overlap, running)
+        return overlap
+
+    def test_limit(self):
+        """No more than the semaphore's value of ddisasm runs overlap."""
+        paths = [self.binary(str(i), str(i).encode()) for i in range(6)]
+
+        async def main():
+            limit = asyncio.Semaphore(2)
+            return await asyncio.gather(
+                *(aio.disassemble(p, limit=limit) for p in paths)
+            )
+
+        with mock.patch.dict(os.environ, {"FAKE_DDISASM_DELAY": "0.3"}):
+            results = asyncio.run(main())
+        self.assertEqual(
+            results, [b"GTIRB:" + str(i).encode() for i in range(6)]
+        )
+        self.assertEqual(self.max_overlap(), 2)
+
+    def test_progress(self):
+        """The progress callback gets the events of ddisasm's stderr."""
+        stderr = os.path.join(self.tmpdir, "stderr")
+        with open(stderr, "w") as f:
+            f.write(STDERR)
+        events = []
+        with mock.patch.dict(os.environ, {"FAKE_DDISASM_STDERR": stderr}):
+            result = asyncio.run(aio.disassemble(b"1", progress=events.append))
+        self.assertEqual(result, b"GTIRB:1")
+        self.assertEqual(events, EVENTS)
+
+    def test_cancel(self):
+        """Cancelling the task kills and reaps ddisasm."""
+        processes = []
+        create_subprocess_exec = asyncio.create_subprocess_exec
+
+        async def record(*args, **kwargs):
+            process = await create_subprocess_exec(*args, **kwargs)
+            processes.append(process)
+            return process
+
+        async def main():
+            task = asyncio.ensure_future(aio.disassemble(b"1"))
+            while not processes:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with mock.patch.dict(
+            os.environ, {"FAKE_DDISASM_DELAY": "30"}
+        ), mock.patch("asyncio.create_subprocess_exec", record):
+            asyncio.run(main())
+
+        (process,) = processes
+        self.assertIsNotNone(process.returncode)
+        self.assertLess(process.returncode, 0)
+        with self.assertRaises(ChildProcessError):
+            os.waitpid(process.pid, os.WNOHANG)
+        self.assertFalse(os.path.exists(self.log))
+
+    def test_error(self):
+        with self.assertRaises(subprocess.CalledProcessError) as cm:
+            asyncio.run(aio.disassemble(b"fail"))
+        self.assertEqual(cm.exception.returncode, 1)
+        self.assertIn(b"cannot disassemble", cm.exception.stderr)
+
+    def test_timeout(self):
+        with mock.patch.dict(os.environ, {"FAKE_DDISASM_DELAY": "5"}):
+            with self.assertRaises(asyncio.TimeoutError):
+                asyncio.run(aio.disassemble(b"1", timeout=0.5))
+        # The process was killed before it finished its run.
+        self.assertFalse(os.path.exists(self.log))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import unittest
+from unittest import mock
+
+from ddisasm.batch import disassemble_many
+from fake_ddisasm import FakeDdisasmTestCase
+
+
+class BatchTest(FakeDdisasmTestCase):
+    def setUp(self):
+        super().setUp()
+        self.log = os.path.join(self.tmpdir, "log")
+        patcher = mock.patch.dict(os.environ, {"FAKE_DDISASM_LOG": self.log})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def started(self):
+        """Return the inputs in the order ddisasm was started on them."""
+        with open(self.log) as f:
+            runs = [line.split(" ", 3) for line in f]
+        runs.sort(key=lambda run: float(run[1]))
+        return [run[3].split()[0] for run in runs]
+
+    def test_largest_first(self):
+        paths = [
+            self.binary("small", b"1"),
+            self.binary("large", b"333"),
+            self.binary("medium", b"22"),
+        ]
+        results = list(disassemble_many(paths, jobs=1))
+        order = [paths[1], paths[2], paths[0]]
+        self.assertEqual(self.started(), order)
+        self.assertEqual([r.path for r in results], order)
+        for result in results:
+            self.assertEqual(result.returncode, 0)
+            self.assertEqual(result.threads, 1)
+            self.assertEqual(result.output, result.path + ".gtirb")
+            self.assertEqual(result.stats.ddisasm_version, "fake")
+            with open(result.path, "rb") as f, open(result.output, "rb") as g:
+                self.assertEqual(g.read(), b"GTIRB:" + f.read())
+
+    def test_output_dir(self):
+        output_dir = os.path.join(self.tmpdir, "out")
+        (result,) = disassemble_many(
+            [self.binary("ex", b"1")], output_dir=output_dir
+        )
+        self.assertEqual(result.output, os.path.join(output_dir, "ex.gtirb"))
+        self.assertTrue(os.path.exists(result.output))
+
+    def test_error(self):
+        """A failing binary is reported without stopping the others."""
+        paths = [
+            self.binary("one", b"1"),
+            self.binary("bad", b"fail"),
+            self.binary("two", b"2"),
+        ]
+        results = {r.path: r for r in disassemble_many(paths, jobs=2)}
+        self.assertEqual(set(results), set(paths))
+
+        bad = results.pop(paths[1])
+        self.assertEqual(bad.returncode, 1)
+        self.assertIn(b"cannot disassemble", bad.stderr)
+        self.assertIsNone(bad.stats)
+        self.assertFalse(os.path.exists(bad.output))
+        for result in results.values():
+            self.assertEqual(result.returncode, 0)
+            self.assertIsNotNone(result.stats)
+
+    def test_invalid_arguments(self):
+        paths = [self.binary("ex", b"1")]
+        with self.assertRaisesRegex(ValueError, "threads"):
+            list(disassemble_many(paths, threads=2))
+        os.mkdir(os.path.join(self.tmpdir, "sub"))
+        paths.append(self.binary(os.path.join("sub", "ex"), b"2"))
+        with self.assertRaisesRegex(ValueError, "distinct names"):
+            list(
+                disassemble_many(
+                    paths, output_dir=os.path.join(self.tmpdir, "out")
+                )
+            )
+        with self.assertRaises(FileNotFoundError):
+            list(disassemble_many([os.path.join(self.tmpdir, "missing")]))
+
+
+if __name__ == "__main__":
+    unittest.main()
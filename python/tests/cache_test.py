@@ -0,0 +1,145 @@
+import hashlib
+import os
+import time
+import unittest
+from unittest import mock
+
+import ddisasm
+from ddisasm.cache import ResultCache
+from fake_ddisasm import FakeDdisasmTestCase
+
+INPUT_HASH = hashlib.sha256(b"ex").hexdigest()
+
+
+class ResultCacheTest(FakeDdisasmTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ResultCache(os.path.join(self.tmpdir, "cache"))
+
+    def test_key_stability(self):
+        key = self.cache.key(
+            INPUT_HASH, "ir", keep_functions=["main"], no_analysis=True
+        )
+        self.assertEqual(len(key), 64)
+        self.assertEqual(
+            key,
+            ResultCache(self.tmpdir).key(
+                INPUT_HASH, "ir", no_analysis=True, keep_functions=["main"]
+            ),
+        )
+        # Options that do not change the result are not part of the key.
+        self.assertEqual(
+            key,
+            self.cache.key(
+                INPUT_HASH,
+                "ir",
+                keep_functions=["main"],
+                no_analysis=True,
+                threads=8,
+                debug=False,
+                generate_import_libs=None,
+            ),
+        )
+        # Everything else is.
+        for other in (
+            self.cache.key(
+                INPUT_HASH, "asm", keep_functions=["main"], no_analysis=True
+            ),
+            self.cache.key(
+                INPUT_HASH, "ir", keep_functions=["f"], no_analysis=True
+            ),
+            self.cache.key(INPUT_HASH, "ir", keep_functions=["main"]),
+            self.cache.key(
+                "0" * 64, "ir", keep_functions=["main"], no_analysis=True
+            ),
+        ):
+            self.assertNotEqual(key, other)
+
+    def test_key_for(self):
+        path = self.binary("ex", b"ex")
+        self.assertEqual(
+            self.cache.key_for(path, "asm", threads=2),
+            self.cache.key(INPUT_HASH, "asm"),
+        )
+        self.assertEqual(
+            self.cache.key_for(b"ex", "asm"),
+            self.cache.key(INPUT_HASH, "asm"),
+        )
+
+    def test_hints_contents(self):
+        """The contents of the hints file are part of the key."""
+        hints = self.binary("hints.csv", b"one")
+        key = self.cache.key(INPUT_HASH, hints=hints)
+        self.binary("hints.csv", b"two")
+        self.assertNotEqual(key, self.cache.key(INPUT_HASH, hints=hints))
+
+    def test_get_put(self):
+        key = self.cache.key(INPUT_HASH)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, b"GTIRB")
+        self.assertEqual(self.cache.get(key), b"GTIRB")
+        self.cache.put(key, b"GTIRB2")
+        self.assertEqual(self.cache.get(key), b"GTIRB2")
+        self.assertEqual(os.listdir(self.cache.directory), [key])
+
+    def test_evict(self):
+        """The least recently used entries are evicted first."""
+        self.cache.max_size = 20
+        for i, key in enumerate("abc"):
+            self.cache.put(key, b"0123456789")
+            os.utime(self.cache._path(key), (i, i))
+        self.assertEqual(sorted(os.listdir(self.cache.directory)), ["b", "c"])
+
+        # Reading "b" makes "c" the least recently used entry.
+        self.assertIsNotNone(self.cache.get("b"))
+        self.cache.put("d", b"0123456789")
+        self.assertEqual(sorted(os.listdir(self.cache.directory)), ["b", "d"])
+
+    def test_stale_tempfiles(self):
+        stale = os.path.join(self.cache.directory, ".tmp-stale")
+        fresh = os.path.join(self.cache.directory, ".tmp-fresh")
+        for path in (stale, fresh):
+            with open(path, "wb") as f:
+                f.write(b"partial")
+        old = time.time() - 2 * 3600
+        os.utime(stale, (old, old))
+        self.cache.evict()
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(fresh))
+
+    def test_run_ddisasm(self):
+        """A cached IR is returned without running ddisasm."""
+        log = os.path.join(self.tmpdir, "log")
+        with mock.patch(
+            "ddisasm._driver.load_ir", lambda data: data
+        ), mock.patch.dict(os.environ, {"FAKE_DDISASM_LOG": log}):
+            path = self.binary("ex", b"ex")
+            for _ in range(2):
+                self.assertEqual(
+                    ddisasm.run_ddisasm(path, cache=self.cache), b"GTIRB:ex"
+                )
+            self.assertEqual(
+                ddisasm.run_ddisasm(b"ex", cache=self.cache, threads=4),
+                b"GTIRB:ex",
+            )
+        with open(log) as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+    def test_worker(self):
+        """The worker caches listings separately from IRs."""
+        path = self.binary("ex", b"ex")
+        with mock.patch("ddisasm.worker.load_ir", lambda data: data):
+            with ddisasm.Worker(cache=self.cache) as worker:
+                self.assertEqual(worker.disassemble_asm(path), "ASM:ex")
+                self.assertEqual(worker.disassemble(path), b"GTIRB:ex")
+            with ddisasm.Worker(cache=self.cache) as worker:
+                self.assertEqual(worker.disassemble_asm(path), "ASM:ex")
+                self.assertEqual(worker.disassemble(b"ex"), b"GTIRB:ex")
+                self.assertIsNone(worker._process)
+        self.assertEqual(
+            self.cache.get(self.cache.key_for(path, "asm")), b"ASM:ex"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
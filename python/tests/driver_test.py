@@ -0,0 +1,84 @@
+import os
+import pathlib
+import subprocess
+import unittest
+from unittest import mock
+
+import ddisasm
+from ddisasm._driver import build_args, input_path
+from fake_ddisasm import FakeDdisasmTestCase
+
+
+class BuildArgsTest(unittest.TestCase):
+    def test_values(self):
+        self.assertEqual(
+            build_args(threads=4, hints="hints.csv"),
+            ["--threads", "4", "--hints", "hints.csv"],
+        )
+
+    def test_underscores(self):
+        self.assertEqual(
+            build_args(skip_function_analysis=True),
+            ["--skip-function-analysis"],
+        )
+
+    def test_omitted(self):
+        self.assertEqual(
+            build_args(skip_function_analysis=False, hints=None), []
+        )
+
+    def test_lists(self):
+        self.assertEqual(
+            build_args(with_souffle_relations=["a", 1], threads=2),
+            ["--with-souffle-relations", "a", "1", "--threads", "2"],
+        )
+
+    def test_output_options(self):
+        for name in ("ir", "json", "asm"):
+            with self.subTest(option=name):
+                with self.assertRaisesRegex(ValueError, name):
+                    build_args(**{name: "out"})
+
+
+class InputPathTest(unittest.TestCase):
+    def test_bytes(self):
+        """Bytes are written to a temporary file removed on exit."""
+        with input_path(b"\x7fELF") as path:
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"\x7fELF")
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(os.path.dirname(path)))
+
+    def test_path(self):
+        with input_path(pathlib.Path("dir", "ex")) as path:
+            self.assertEqual(path, os.path.join("dir", "ex"))
+        with input_path("ex") as path:
+            self.assertEqual(path, "ex")
+
+
+class RunDdisasmTest(FakeDdisasmTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("ddisasm._driver.load_ir", lambda data: data)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_path(self):
+        path = self.binary("ex", b"1")
+        self.assertEqual(ddisasm.run_ddisasm(path), b"GTIRB:1")
+        self.assertEqual(
+            ddisasm.run_ddisasm(pathlib.Path(path), threads=2), b"GTIRB:1"
+        )
+
+    def test_bytes(self):
+        self.assertEqual(ddisasm.run_ddisasm(b"2"), b"GTIRB:2")
+
+    def test_error(self):
+        with self.assertRaises(subprocess.CalledProcessError) as cm:
+            ddisasm.run_ddisasm(b"fail")
+        self.assertEqual(cm.exception.returncode, 1)
+        self.assertIn(b"cannot disassemble", cm.exception.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
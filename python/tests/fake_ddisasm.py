@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+A stand-in for the ddisasm executable in the tests of the Python package.
+
+The "GTIRB" of a binary is b"GTIRB:" followed by its contents and its
+"listing" is "ASM:" followed by its contents. Binaries whose contents start
+with b"fail" make ddisasm exit with an error, and binaries whose contents
+start with b"crash" make the --serve worker exit.
+
+If FAKE_DDISASM_LOG is set, a "<pid> <start> <end> <args>" line is appended
+to it for each run (or request of a worker). If FAKE_DDISASM_DELAY is set,
+each run takes that many seconds. If FAKE_DDISASM_STDERR is set, each run
+writes the contents of that file to stderr, a few bytes at a time.
+"""
+import contextlib
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import unittest
+from typing import Iterator
+from unittest import mock
+
+PATH = pathlib.Path(__file__).resolve()
+
+
+@contextlib.contextmanager
+def patch_ddisasm_path() -> Iterator[None]:
+    """
+    Make the ddisasm package run this script instead of ddisasm.
+    """
+
+    @contextlib.contextmanager
+    def ddisasm_path():
+        yield PATH
+
+    with mock.patch("ddisasm.ddisasm_path", ddisasm_path):
+        yield
+
+
+class FakeDdisasmTestCase(unittest.TestCase):
+    """
+    Run the tests with this script in place of ddisasm, in a temporary
+    directory for the input binaries.
+    """
+
+    def setUp(self):
+        stack = contextlib.ExitStack()
+        self.addCleanup(stack.close)
+        self.tmpdir = stack.enter_context(tempfile.TemporaryDirectory())
+        stack.enter_context(patch_ddisasm_path())
+
+    def binary(self, name: str, contents: bytes) -> str:
+        """
+        Write a binary to the temporary directory and return its path.
+        """
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "wb") as f:
+            f.write(contents)
+        return path
+
+
+def _log(start: float, args) -> None:
+    log = os.environ.get("FAKE_DDISASM_LOG")
+    if log:
+        with open(log, "a") as f:
+            f.write(
+                "{} {} {} {}\n".format(
+                    os.getpid(), start, time.time(), " ".join(args)
+                )
+            )
+
+
+def _option(args, name):
+    return args[args.index(name) + 1] if name in args else None
+
+
+def _write_stderr() -> None:
+    path = os.environ.get("FAKE_DDISASM_STDERR")
+    if path:
+        with open(path, "rb") as f:
+            data = f.read()
+        # Flush small pieces, so that lines arrive in several reads.
+        for i in range(0, len(data), 7):
+            sys.stderr.buffer.write(data[i : i + 7])
+            sys.stderr.buffer.flush()
+
+
+def _run(args) -> int:
+    start = time.time()
+    _write_stderr()
+    time.sleep(float(os.environ.get("FAKE_DDISASM_DELAY", "0")))
+    with open(args[0], "rb") as f:
+        contents = f.read()
+    _log(start, args)
+    if contents.startswith(b"fail"):
+        print("ERROR: cannot disassemble " + args[0], file=sys.stderr)
+        return 1
+
+    output = _option(args, "--ir")
+    if output == "-":
+        sys.stdout.buffer.write(b"GTIRB:" + contents)
+    else:
+        with open(output, "wb") as f:
+            f.write(b"GTIRB:" + contents)
+
+    stats = _option(args, "--stats-json")
+    if stats:
+        with open(stats, "w") as f:
+            json.dump({"ddisasm_version": "fake", "passes": []}, f)
+    return 0
+
+
+def _serve() -> int:
+    for line in sys.stdin.buffer:
+        start = time.time()
+        kind, path = line.rstrip(b"\n").split(b" ", 1)
+        _log(start, [kind.decode(), os.fsdecode(path)])
+        try:
+            with open(path, "rb") as f:
+                contents = f.read()
+        except OSError as ex:
+            status, payload = b"error", str(ex).encode()
+        else:
+            if contents.startswith(b"crash"):
+                return 1
+            status = b"ok"
+            payload = (b"GTIRB:" if kind == b"ir" else b"ASM:") + contents
+        sys.stdout.buffer.write(
+            status + b" " + str(len(payload)).encode() + b"\n" + payload
+        )
+        sys.stdout.buffer.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    if "--serve" in sys.argv[1:]:
+        sys.exit(_serve())
+    sys.exit(_run(sys.argv[1:]))
@@ -0,0 +1,65 @@
+import os
+import unittest
+from unittest import mock
+
+import ddisasm
+from fake_ddisasm import FakeDdisasmTestCase
+
+
+class WorkerTest(FakeDdisasmTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("ddisasm.worker.load_ir", lambda data: data)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_two_requests(self):
+        """Both requests are served by the same process."""
+        with ddisasm.Worker() as worker:
+            self.assertEqual(
+                worker.disassemble(self.binary("one", b"1")), b"GTIRB:1"
+            )
+            pid = worker._process.pid
+            self.assertEqual(
+                worker.disassemble_asm(self.binary("two", b"2")), "ASM:2"
+            )
+            self.assertEqual(worker._process.pid, pid)
+            self.assertEqual(worker.disassemble(b"3"), b"GTIRB:3")
+        self.assertIsNone(worker._process)
+
+    def test_error_status(self):
+        """An error response raises, and the worker keeps serving."""
+        with ddisasm.Worker() as worker:
+            worker.disassemble(self.binary("one", b"1"))
+            pid = worker._process.pid
+            missing = os.path.join(self.tmpdir, "missing")
+            with self.assertRaisesRegex(ddisasm.WorkerError, "missing"):
+                worker.disassemble(missing)
+            self.assertEqual(worker.disassemble(b"2"), b"GTIRB:2")
+            self.assertEqual(worker._process.pid, pid)
+
+    def test_restart_after_kill(self):
+        """A new process is started if the previous one was killed."""
+        with ddisasm.Worker() as worker:
+            worker.disassemble(self.binary("one", b"1"))
+            process = worker._process
+            process.kill()
+            process.wait()
+            self.assertEqual(
+                worker.disassemble_asm(self.binary("two", b"2")), "ASM:2"
+            )
+            self.assertNotEqual(worker._process.pid, process.pid)
+
+    def test_restart_after_exit(self):
+        """A request that makes the process exit raises WorkerError."""
+        with ddisasm.Worker() as worker:
+            with self.assertRaisesRegex(
+                ddisasm.WorkerError, "exited unexpectedly"
+            ):
+                worker.disassemble(self.binary("crash", b"crash"))
+            self.assertIsNone(worker._process)
+            self.assertEqual(worker.disassemble(b"1"), b"GTIRB:1")
+
+
+if __name__ == "__main__":
+    unittest.main()
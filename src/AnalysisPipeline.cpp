@@ -22,6 +22,10 @@
 //===----------------------------------------------------------------------===//
 #include "AnalysisPipeline.h"
 
+#include <fstream>
+#include <iomanip>
+#include <sstream>
+
 #include "passes/DatalogAnalysisPass.h"
 
 void AnalysisPipeline::configureDebugDir(const std::string &DebugDirRoot, bool MultiModule)
@@ -65,6 +69,28 @@ void AnalysisPipeline::enableSouffleOutputs()
     }
 }
 
+void AnalysisPipeline::setSouffleRelationFilter(const std::vector<std::string> &Patterns)
+{
+    for(auto &Pass : Passes)
+    {
+        if(DatalogAnalysisPass *DatalogPass = dynamic_cast<DatalogAnalysisPass *>(Pass.get()))
+        {
+            DatalogPass->setRelationFilter(Patterns);
+        }
+    }
+}
+
+void AnalysisPipeline::enableBinaryRelations()
+{
+    for(auto &Pass : Passes)
+    {
+        if(DatalogAnalysisPass *DatalogPass = dynamic_cast<DatalogAnalysisPass *>(Pass.get()))
+        {
+            DatalogPass->enableBinaryRelations();
+        }
+    }
+}
+
 void AnalysisPipeline::configureSouffleInterpreter(const std::string &InterpreterDir,
                                                    const std::string &LibraryDir)
 {
@@ -77,13 +103,13 @@ void AnalysisPipeline::configureSouffleInterpreter(const std::string &Interprete
     }
 }
 
-std::set<std::string> AnalysisPipeline::getPassSlugs()
+std::set<std::string> AnalysisPipeline::getPassSlugs(bool DatalogOnly)
 {
     std::set<std::string> Slugs;
     for(auto &Pass : Passes)
     {
         // only the datalog passes support hints
-        if(dynamic_cast<DatalogAnalysisPass *>(Pass.get()))
+        if(!DatalogOnly || dynamic_cast<DatalogAnalysisPass *>(Pass.get()))
         {
             Slugs.insert(Pass->getNameSlug());
         }
@@ -96,6 +122,149 @@ void AnalysisPipeline::loadHints(const std::string &Path)
     DatalogHints.read(Path, getPassSlugs());
 }
 
+bool AnalysisPipeline::resumeAfter(const std::string &Slug)
+{
+    if(getPassSlugs(false).count(Slug) == 0)
+    {
+        return false;
+    }
+    ResumeAfter = Slug;
+    return true;
+}
+
+// The keys of the checkpoints of an incremental directory, one `<slug> <key>' line per pass.
+static const std::string IncrementalStateFile = "incremental-state";
+
+// 64-bit FNV-1a, which is stable across platforms and runs, unlike std::hash.
+static uint64_t fnv1a(uint64_t Hash, const char *Data, size_t Size)
+{
+    for(size_t I = 0; I < Size; I++)
+    {
+        Hash = (Hash ^ static_cast<uint8_t>(Data[I])) * 0x100000001b3ULL;
+    }
+    return Hash;
+}
+
+static std::string digest(const std::string &Text, uint64_t Hash = 0xcbf29ce484222325ULL)
+{
+    std::stringstream Hex;
+    Hex << std::hex << std::setw(16) << std::setfill('0')
+        << fnv1a(Hash, Text.data(), Text.size());
+    return Hex.str();
+}
+
+std::string AnalysisPipeline::getInputKey(const std::string &Path, const std::string &Options)
+{
+    uint64_t Hash = 0xcbf29ce484222325ULL;
+    std::ifstream In(Path, std::ios::in | std::ios::binary);
+    std::vector<char> Buffer(1 << 20);
+    while(In.read(Buffer.data(), Buffer.size()) || In.gcount() > 0)
+    {
+        Hash = fnv1a(Hash, Buffer.data(), In.gcount());
+    }
+    return digest(Options, Hash);
+}
+
+std::optional<std::string> AnalysisPipeline::setIncrementalDir(const std::string &Dir,
+                                                               const std::string &InputKey)
+{
+    CheckpointDir = Dir;
+
+    // Chain the keys, since a pass depends on the results of all the passes before it.
+    std::string Key = InputKey;
+    for(auto &Pass : Passes)
+    {
+        const std::string Slug = Pass->getNameSlug();
+        Key = digest(Key + "\n" + Slug + "\n" + DatalogHints.getHints(Slug));
+        PassKeys[Slug] = Key;
+    }
+
+    std::ifstream State((fs::path(Dir) / IncrementalStateFile).string());
+    std::string Slug, CheckpointKey;
+    while(State >> Slug >> CheckpointKey)
+    {
+        CheckpointKeys[Slug] = CheckpointKey;
+    }
+
+    std::optional<std::string> Reusable;
+    for(auto &Pass : Passes)
+    {
+        Slug = Pass->getNameSlug();
+        auto It = CheckpointKeys.find(Slug);
+        if(It == CheckpointKeys.end() || It->second != PassKeys[Slug]
+           || !fs::exists(getCheckpointPath(Dir, Slug)))
+        {
+            break;
+        }
+        Reusable = Slug;
+    }
+
+    if(Reusable)
+    {
+        ResumeAfter = *Reusable;
+    }
+    return Reusable;
+}
+
+fs::path AnalysisPipeline::getCheckpointPath(const std::string &Dir, const std::string &Slug)
+{
+    return fs::path(Dir) / (Slug + ".gtirb");
+}
+
+void AnalysisPipeline::saveCheckpoint(const gtirb::Module &Module, const AnalysisPass &Pass)
+{
+    fs::create_directories(CheckpointDir);
+    fs::path Path = getCheckpointPath(CheckpointDir, Pass.getNameSlug());
+
+    // Write to a temporary file first so that a crash never leaves a
+    // truncated checkpoint behind.
+    fs::path TempPath = Path;
+    TempPath += ".tmp";
+    {
+        std::ofstream Out(TempPath.string(), std::ios::out | std::ios::binary);
+        Module.getIR()->save(Out);
+    }
+    fs::rename(TempPath, Path);
+
+    if(!PassKeys.empty())
+    {
+        CheckpointKeys[Pass.getNameSlug()] = PassKeys[Pass.getNameSlug()];
+        saveIncrementalState();
+    }
+}
+
+void AnalysisPipeline::saveIncrementalState()
+{
+    fs::path Path = fs::path(CheckpointDir) / IncrementalStateFile;
+    fs::path TempPath = Path;
+    TempPath += ".tmp";
+    {
+        std::ofstream Out(TempPath.string());
+        for(auto &[Slug, Key] : CheckpointKeys)
+        {
+            Out << Slug << " " << Key << "\n";
+        }
+    }
+    fs::rename(TempPath, Path);
+}
+
+std::unique_lock<std::mutex> AnalysisPipeline::lockContext()
+{
+    if(ContextMutex)
+    {
+        return std::unique_lock<std::mutex>(*ContextMutex);
+    }
+    return std::unique_lock<std::mutex>();
+}
+
+void AnalysisPipeline::notifyModuleBegin(const gtirb::Module &Module)
+{
+    for(auto &Listener : Listeners)
+    {
+        Listener->notifyModuleBegin(Module);
+    }
+}
+
 void AnalysisPipeline::notifyPassBegin(const AnalysisPass &Name)
 {
     for(auto &Listener : Listeners)
@@ -128,14 +297,26 @@ void AnalysisPipeline::notifyPassResult(AnalysisPassPhase Phase, const AnalysisP
 
 void AnalysisPipeline::run(gtirb::Context &Context, gtirb::Module &Module)
 {
+    notifyModuleBegin(Module);
+
     AnalysisPass *PreviousPass = nullptr;
+    bool Skipping = !ResumeAfter.empty();
     for(auto &Pass : Passes)
     {
+        if(Skipping)
+        {
+            // The module was loaded from the checkpoint of a later pass.
+            Skipping = Pass->getNameSlug() != ResumeAfter;
+            continue;
+        }
+
         notifyPassBegin(*Pass);
         notifyPassPhase(AnalysisPassPhase::LOAD, Pass->hasLoad());
         if(Pass->hasLoad())
         {
+            auto Lock = lockContext();
             auto Result = Pass->load(Context, Module, PreviousPass);
+            Lock.unlock();
             notifyPassResult(AnalysisPassPhase::LOAD, Result);
         }
 
@@ -157,10 +338,18 @@ void AnalysisPipeline::run(gtirb::Context &Context, gtirb::Module &Module)
         notifyPassPhase(AnalysisPassPhase::TRANSFORM, Pass->hasTransform());
         if(Pass->hasTransform())
         {
+            auto Lock = lockContext();
             auto Result = Pass->transform(Context, Module);
+            Lock.unlock();
             notifyPassResult(AnalysisPassPhase::TRANSFORM, Result);
         }
 
+        if(!CheckpointDir.empty())
+        {
+            auto Lock = lockContext();
+            saveCheckpoint(Module, *Pass);
+        }
+
         PreviousPass = Pass.get();
         notifyPassEnd(*Pass);
     }
@@ -22,6 +22,9 @@
 //===----------------------------------------------------------------------===//
 #ifndef _ANALYSIS_PIPELINE_H_
 #define _ANALYSIS_PIPELINE_H_
+#include <mutex>
+#include <optional>
+
 #include "Hints.h"
 #include "passes/AnalysisPass.h"
 
@@ -40,6 +43,7 @@ It is intended for implementation of user interfaces.
 class AnalysisPipelineListener
 {
 public:
+    virtual void notifyModuleBegin(const gtirb::Module& Module) = 0;
     virtual void notifyPassBegin(const AnalysisPass& Name) = 0;
     virtual void notifyPassEnd(const AnalysisPass& Pass) = 0;
     virtual void notifyPassPhase(AnalysisPassPhase Phase, bool HasPhase = true) = 0;
@@ -64,14 +68,77 @@ public:
     void setDatalogThreadCount(unsigned int Count);
     void setDatalogProfileDir(const std::string& ProfileDir);
     void enableSouffleOutputs();
+    void enableBinaryRelations();
+    void setSouffleRelationFilter(const std::vector<std::string>& Patterns);
     void configureSouffleInterpreter(const std::string& InterpreterDir,
                                      const std::string& LibraryDir);
     void loadHints(const std::string& Path);
 
+    /**
+    Save the IR to Dir after each pass, as `<pass-slug>.gtirb'.
+    */
+    void setCheckpointDir(const std::string& Dir)
+    {
+        CheckpointDir = Dir;
+    }
+
+    /**
+    Skip the passes up to and including the pass with the given slug, whose
+    checkpoint the module was loaded from.
+
+    Returns false if no pass has the given slug.
+    */
+    bool resumeAfter(const std::string& Slug);
+
+    /**
+    Get the path of the checkpoint saved in Dir after the pass with the given slug.
+    */
+    static fs::path getCheckpointPath(const std::string& Dir, const std::string& Slug);
+
+    /**
+    Keep the checkpoints of the passes in Dir across runs, together with a key
+    for each pass that digests InputKey and the hints of that pass and of all
+    the passes before it.
+
+    Returns the slug of the last pass whose key is unchanged since the
+    previous run and whose checkpoint exists. The caller should load that
+    checkpoint instead of the input file: the passes up to and including it are
+    skipped, as with resumeAfter().
+
+    Must be called after loadHints().
+    */
+    std::optional<std::string> setIncrementalDir(const std::string& Dir,
+                                                 const std::string& InputKey);
+
+    /**
+    Compute the key of an input file for setIncrementalDir(): a digest of the
+    contents of the file and of the given description of the options that
+    affect the analysis.
+    */
+    static std::string getInputKey(const std::string& Path, const std::string& Options);
+
+    /**
+    Get the slugs of the Datalog passes, or of all passes if DatalogOnly is false.
+    */
+    std::set<std::string> getPassSlugs(bool DatalogOnly = true);
+
+    /**
+    Serialize the phases that access the gtirb::Context (load and transform)
+    with other pipelines sharing the same mutex, so that pipelines can analyze
+    different modules of one IR concurrently.
+    */
+    void setContextMutex(std::mutex& Mutex)
+    {
+        ContextMutex = &Mutex;
+    }
+
     void run(gtirb::Context& Context, gtirb::Module& Module);
 
 private:
-    std::set<std::string> getPassSlugs();
+    void saveCheckpoint(const gtirb::Module& Module, const AnalysisPass& Pass);
+    void saveIncrementalState();
+    std::unique_lock<std::mutex> lockContext();
+    void notifyModuleBegin(const gtirb::Module& Module);
     void notifyPassBegin(const AnalysisPass& Name);
     void notifyPassEnd(const AnalysisPass& Pass);
     void notifyPassPhase(AnalysisPassPhase Phase, bool HasPhase = true);
@@ -80,5 +147,12 @@ private:
     std::list<std::shared_ptr<AnalysisPipelineListener>> Listeners;
     std::list<std::unique_ptr<AnalysisPass>> Passes;
     HintsLoader DatalogHints;
+    std::mutex* ContextMutex = nullptr;
+    std::string CheckpointDir;
+    std::string ResumeAfter;
+
+    // Keys of the passes in this run, and of the checkpoints in CheckpointDir.
+    std::map<std::string, std::string> PassKeys;
+    std::map<std::string, std::string> CheckpointKeys;
 };
 #endif /* _ANALYSIS_PIPELINE_H_ */
@@ -155,6 +155,14 @@ namespace gtirb
             typedef std::map<std::string, std::tuple<std::string, std::string>> Type;
         };
 
+        /// \brief Auxiliary data for the symbol tables of Souffle relations in the binary format.
+        struct SouffleSymbols
+        {
+            static constexpr const char* Name = "souffleSymbols";
+            // Entries of the form {Namespace, Symbols}.
+            typedef std::map<std::string, std::vector<std::string>> Type;
+        };
+
         /// \brief Auxiliary data for the list of possible entry points in a raw binary.
         struct RawEntries
         {
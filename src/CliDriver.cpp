@@ -22,13 +22,15 @@
 //===----------------------------------------------------------------------===//
 #include "CliDriver.h"
 
+#include <mutex>
+
 // Define CLI output field widths
 constexpr size_t IndentWidth = 4;
 constexpr size_t TimeWidth = 8;
 constexpr size_t PassNameWidth = 18;
 constexpr size_t PassStepWidth = 12;
 
-void printElapsedTime(std::chrono::duration<double> Elapsed)
+void printElapsedTime(std::chrono::duration<double> Elapsed, std::ostream &Out)
 {
     auto Hours = std::chrono::duration_cast<std::chrono::hours>(Elapsed).count();
     auto Minutes = std::chrono::duration_cast<std::chrono::minutes>(Elapsed).count();
@@ -55,7 +57,7 @@ void printElapsedTime(std::chrono::duration<double> Elapsed)
     }
 
     // set width to TimeWidth-2; it includes the size of the brackets
-    std::cerr << "[" << std::right << std::setw(TimeWidth - 2) << FmttedDuration.str() << "]";
+    Out << "[" << std::right << std::setw(TimeWidth - 2) << FmttedDuration.str() << "]";
 }
 
 void printElapsedTimeSince(std::chrono::time_point<std::chrono::high_resolution_clock> Start)
@@ -64,15 +66,20 @@ void printElapsedTimeSince(std::chrono::time_point<std::chrono::high_resolution_
     printElapsedTime(End - Start);
 }
 
+void DDisasmPipelineListener::notifyModuleBegin(const gtirb::Module &Module)
+{
+    out() << "Processing module: " << Module.getName() << "\n";
+}
+
 void DDisasmPipelineListener::notifyPassBegin(const AnalysisPass &Pass)
 {
-    std::cerr << std::setw(IndentWidth) << "" << std::left << std::setw(PassNameWidth)
-              << Pass.getName() << std::flush;
+    out() << std::setw(IndentWidth) << "" << std::left << std::setw(PassNameWidth)
+          << Pass.getName() << std::flush;
 }
 
 void DDisasmPipelineListener::notifyPassEnd([[maybe_unused]] const AnalysisPass &Pass)
 {
-    std::cerr << "\n";
+    out() << "\n";
 }
 
 void DDisasmPipelineListener::notifyPassPhase(AnalysisPassPhase Phase, bool HasPhase)
@@ -92,33 +99,34 @@ void DDisasmPipelineListener::notifyPassPhase(AnalysisPassPhase Phase, bool HasP
     }
     if(HasPhase)
     {
-        std::cerr << std::right << std::setw(PassStepWidth) << (Name + " ");
+        out() << std::right << std::setw(PassStepWidth) << (Name + " ");
     }
     else
     {
-        std::cerr << std::setw(PassStepWidth + TimeWidth) << "";
+        out() << std::setw(PassStepWidth + TimeWidth) << "";
     }
-    std::cerr << std::flush;
+    out() << std::flush;
 }
 
 void DDisasmPipelineListener::notifyPassResult(AnalysisPassPhase Phase,
                                                const AnalysisPassResult &Result)
 {
-    printElapsedTime(Result.RunTime);
+    printElapsedTime(Result.RunTime, out());
     if(!Result.Warnings.empty() || !Result.Errors.empty())
     {
-        std::cerr << "\n";
+        out() << "\n";
     }
     for(const std::string &Warning : Result.Warnings)
     {
-        std::cerr << "WARNING: " << Warning << "\n";
+        out() << "WARNING: " << Warning << "\n";
     }
     for(const std::string &Error : Result.Errors)
     {
-        std::cerr << "ERROR: " << Error << "\n" << std::flush;
+        out() << "ERROR: " << Error << "\n" << std::flush;
     }
     if(!Result.Errors.empty())
     {
+        flush();
         std::exit(EXIT_FAILURE);
     }
     if(!Result.Warnings.empty())
@@ -138,8 +146,20 @@ void DDisasmPipelineListener::notifyPassResult(AnalysisPassPhase Phase,
         }
 
         // Re-indent after emitting warnings
-        std::cerr << std::setw(IndentWidth + PassNameWidth
-                               + PaddingMult * (PassStepWidth + TimeWidth))
-                  << "";
+        out() << std::setw(IndentWidth + PassNameWidth
+                           + PaddingMult * (PassStepWidth + TimeWidth))
+              << "";
+    }
+}
+
+void DDisasmPipelineListener::flush()
+{
+    if(Buffered)
+    {
+        // Listeners of concurrent pipelines flush whole modules at a time.
+        static std::mutex OutputMutex;
+        std::lock_guard<std::mutex> Lock(OutputMutex);
+        std::cerr << Buffer.str() << std::flush;
+        Buffer.str("");
     }
 }
@@ -25,25 +25,50 @@
 
 #include <chrono>
 #include <iomanip>
+#include <iostream>
+#include <sstream>
 
 #include "AnalysisPipeline.h"
 #include "passes/AnalysisPass.h"
 
-void printElapsedTime(std::chrono::duration<double> Elapsed);
+void printElapsedTime(std::chrono::duration<double> Elapsed, std::ostream& Out = std::cerr);
 void printElapsedTimeSince(std::chrono::time_point<std::chrono::high_resolution_clock> Start);
 bool printPassResults(const AnalysisPassResult& Result);
 
 class DDisasmPipelineListener : public AnalysisPipelineListener
 {
 public:
+    /**
+    If Buffered is true, progress is held back until flush() is called, so that
+    the progress of modules analyzed concurrently is not interleaved.
+    */
+    explicit DDisasmPipelineListener(bool Buffered = false) : Buffered(Buffered)
+    {
+    }
+
     virtual ~DDisasmPipelineListener()
     {
     }
 
+    virtual void notifyModuleBegin(const gtirb::Module& Module);
     virtual void notifyPassBegin(const AnalysisPass& Pass);
     virtual void notifyPassEnd(const AnalysisPass& Pass);
     virtual void notifyPassPhase(AnalysisPassPhase Phase, bool HasPhase);
     virtual void notifyPassResult(AnalysisPassPhase Phase, const AnalysisPassResult& Result);
+
+    /**
+    Write the buffered progress to stderr.
+    */
+    void flush();
+
+private:
+    std::ostream& out()
+    {
+        return Buffered ? static_cast<std::ostream&>(Buffer) : std::cerr;
+    }
+
+    bool Buffered;
+    std::ostringstream Buffer;
 };
 
 #endif /* _CLI_DRIVER_H_ */
@@ -180,7 +180,6 @@ int main(int argc, char **argv)
 
     for(auto &Module : Modules)
     {
-        std::cerr << "Processing module: " << Module.getName() << "\n";
         Pipeline.run(Context, Module);
     }
 
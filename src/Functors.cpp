@@ -22,6 +22,8 @@
 //===----------------------------------------------------------------------===//
 #include "Functors.h"
 
+#include <algorithm>
+#include <atomic>
 #include <cassert>
 #include <fstream>
 #include <iostream>
@@ -53,28 +55,75 @@ namespace
 
 FunctorContextManager FunctorContext;
 
-const gtirb::ByteInterval* FunctorContextManager::getByteInterval(uint64_t EA, size_t Size)
+static thread_local FunctorContextManager* ThreadFunctorContext = nullptr;
+
+static std::atomic<uint64_t> NextGeneration{1};
+
+/**
+The data range of the last successful lookup on this thread. Souffle reads
+data at nearby addresses in a row, so this avoids most searches.
+*/
+static thread_local struct
+{
+    uint64_t Generation = 0;
+    const FunctorContextManager::DataRange* Range = nullptr;
+} LastDataRange;
+
+FunctorContextManager& FunctorContextManager::current()
+{
+    return ThreadFunctorContext ? *ThreadFunctorContext : FunctorContext;
+}
+
+FunctorContextScope::FunctorContextScope(FunctorContextManager& Context)
+    : Previous(ThreadFunctorContext)
 {
-    for(const auto& Section : Module->findSectionsOn(gtirb::Addr(EA)))
+    ThreadFunctorContext = &Context;
+}
+
+FunctorContextScope::~FunctorContextScope()
+{
+    ThreadFunctorContext = Previous;
+}
+
+const FunctorContextManager::DataRange* FunctorContextManager::findDataRange(uint64_t EA,
+                                                                            size_t Size)
+{
+    auto Contains = [EA, Size](const DataRange& Range) {
+        return Range.Begin <= EA && EA < Range.End && Size <= Range.End - EA;
+    };
+
+    if(LastDataRange.Generation == Generation && Generation != 0
+       && Contains(*LastDataRange.Range))
     {
-        bool Executable = Section.isFlagSet(gtirb::SectionFlag::Executable);
-        bool Initialized = Section.isFlagSet(gtirb::SectionFlag::Initialized);
-        bool Loaded = Section.isFlagSet(gtirb::SectionFlag::Loaded);
-        if(Loaded && (Executable || Initialized))
+        return LastDataRange.Range;
+    }
+
+    // Search the ranges that start at or before EA, from the last one, until no
+    // earlier range can contain EA. If ranges overlap, use the one that starts
+    // first, like a search of the sections in address order would.
+    auto It = std::upper_bound(DataRanges.begin(), DataRanges.end(), EA,
+                               [](uint64_t A, const DataRange& Range) { return A < Range.Begin; });
+    const DataRange* Found = nullptr;
+    for(size_t I = It - DataRanges.begin(); I > 0 && MaxEnds[I - 1] > EA; I--)
+    {
+        if(Contains(DataRanges[I - 1]))
         {
-            for(const auto& ByteInterval : Section.findByteIntervalsOn(gtirb::Addr(EA)))
-            {
-                uint64_t Addr = static_cast<uint64_t>(*ByteInterval.getAddress());
-                uint64_t IntervalSize = ByteInterval.getInitializedSize();
-                if(EA + Size > Addr + IntervalSize)
-                {
-                    continue;
-                }
-                return &ByteInterval;
-            }
+            Found = &DataRanges[I - 1];
         }
     }
-    return nullptr;
+
+    if(Found && !Found->Overlaps)
+    {
+        LastDataRange.Generation = Generation;
+        LastDataRange.Range = Found;
+    }
+    return Found;
+}
+
+const gtirb::ByteInterval* FunctorContextManager::getByteInterval(uint64_t EA, size_t Size)
+{
+    const DataRange* Range = findDataRange(EA, Size);
+    return Range ? Range->ByteInterval : nullptr;
 }
 
 uint64_t functor_data_valid(uint64_t EA, size_t Size)
@@ -83,23 +132,22 @@ uint64_t functor_data_valid(uint64_t EA, size_t Size)
     {
         return 0;
     }
-    const gtirb::ByteInterval* ByteInterval = FunctorContext.getByteInterval(EA, Size);
+    const gtirb::ByteInterval* ByteInterval =
+        FunctorContextManager::current().getByteInterval(EA, Size);
     return ByteInterval != nullptr ? 1 : 0;
 }
 
 void FunctorContextManager::readData(uint64_t EA, uint8_t* Buffer, size_t Count)
 {
-    const gtirb::ByteInterval* ByteInterval = FunctorContext.getByteInterval(EA, Count);
-    if(ByteInterval == nullptr)
+    const DataRange* Range = findDataRange(EA, Count);
+    if(Range == nullptr)
     {
         memset(Buffer, 0, Count);
         return;
     }
-    uint64_t Addr = static_cast<uint64_t>(*ByteInterval->getAddress());
-    auto Data = ByteInterval->rawBytes<const uint8_t>();
 
     // memcpy: safely handles unaligned requests.
-    memcpy(Buffer, Data + EA - Addr, Count);
+    memcpy(Buffer, Range->Bytes + EA - Range->Begin, Count);
 }
 
 uint64_t functor_data_unsigned(uint64_t EA, size_t Size)
@@ -123,29 +171,33 @@ uint64_t functor_data_unsigned(uint64_t EA, size_t Size)
 uint64_t functor_data_u8(uint64_t EA)
 {
     uint8_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
     return Value;
 }
 
 uint64_t functor_data_u16(uint64_t EA)
 {
     uint16_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return FunctorContext.IsBigEndian ? be16toh(Value) : le16toh(Value);
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return Context.IsBigEndian ? be16toh(Value) : le16toh(Value);
 }
 
 uint64_t functor_data_u32(uint64_t EA)
 {
     uint32_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return FunctorContext.IsBigEndian ? be32toh(Value) : le32toh(Value);
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return Context.IsBigEndian ? be32toh(Value) : le32toh(Value);
 }
 
 uint64_t functor_data_u64(uint64_t EA)
 {
     uint64_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return FunctorContext.IsBigEndian ? be64toh(Value) : le64toh(Value);
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return Context.IsBigEndian ? be64toh(Value) : le64toh(Value);
 }
 
 int64_t functor_data_signed(uint64_t EA, size_t Size)
@@ -169,29 +221,33 @@ int64_t functor_data_signed(uint64_t EA, size_t Size)
 int64_t functor_data_s8(uint64_t EA)
 {
     uint8_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
     return static_cast<int8_t>(Value);
 }
 
 int64_t functor_data_s16(uint64_t EA)
 {
     uint16_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return static_cast<int16_t>(FunctorContext.IsBigEndian ? be16toh(Value) : le16toh(Value));
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return static_cast<int16_t>(Context.IsBigEndian ? be16toh(Value) : le16toh(Value));
 }
 
 int64_t functor_data_s32(uint64_t EA)
 {
     uint32_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return static_cast<int32_t>(FunctorContext.IsBigEndian ? be32toh(Value) : le32toh(Value));
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return static_cast<int32_t>(Context.IsBigEndian ? be32toh(Value) : le32toh(Value));
 }
 
 int64_t functor_data_s64(uint64_t EA)
 {
     uint64_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return static_cast<int64_t>(FunctorContext.IsBigEndian ? be64toh(Value) : le64toh(Value));
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return static_cast<int64_t>(Context.IsBigEndian ? be64toh(Value) : le64toh(Value));
 }
 
 uint64_t functor_aligned(uint64_t EA, size_t Size)
@@ -230,6 +286,54 @@ void FunctorContextManager::useModule(const gtirb::Module* M)
 {
     Module = M;
 
+    // Index the initialized bytes that the data functors can read.
+    DataRanges.clear();
+    for(const auto& Section : Module->sections())
+    {
+        bool Executable = Section.isFlagSet(gtirb::SectionFlag::Executable);
+        bool Initialized = Section.isFlagSet(gtirb::SectionFlag::Initialized);
+        bool Loaded = Section.isFlagSet(gtirb::SectionFlag::Loaded);
+        if(!Loaded || !(Executable || Initialized))
+        {
+            continue;
+        }
+        for(const auto& ByteInterval : Section.byte_intervals())
+        {
+            std::optional<gtirb::Addr> Addr = ByteInterval.getAddress();
+            if(!Addr || ByteInterval.getInitializedSize() == 0)
+            {
+                continue;
+            }
+            uint64_t Begin = static_cast<uint64_t>(*Addr);
+            DataRanges.push_back({Begin, Begin + ByteInterval.getInitializedSize(),
+                                  &ByteInterval, ByteInterval.rawBytes<const uint8_t>(),
+                                  false});
+        }
+    }
+    std::stable_sort(
+        DataRanges.begin(), DataRanges.end(),
+        [](const DataRange& A, const DataRange& B) { return A.Begin < B.Begin; });
+
+    MaxEnds.resize(DataRanges.size());
+    uint64_t MaxEnd = 0;
+    for(size_t I = 0; I < DataRanges.size(); I++)
+    {
+        if(I > 0 && DataRanges[I].Begin < MaxEnd)
+        {
+            DataRanges[I].Overlaps = true;
+            for(size_t J = I; J > 0 && MaxEnds[J - 1] > DataRanges[I].Begin; J--)
+            {
+                if(DataRanges[J - 1].End > DataRanges[I].Begin)
+                {
+                    DataRanges[J - 1].Overlaps = true;
+                }
+            }
+        }
+        MaxEnd = std::max(MaxEnd, DataRanges[I].End);
+        MaxEnds[I] = MaxEnd;
+    }
+    Generation = NextGeneration++;
+
     // Check module's byte order
     switch(Module->getByteOrder())
     {
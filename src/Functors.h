@@ -23,6 +23,7 @@
 #ifndef SRC_FUNCTORS_H_
 #define SRC_FUNCTORS_H_
 #include <gtirb/gtirb.hpp>
+#include <vector>
 
 #include "souffle/SouffleInterface.h"
 
@@ -88,12 +89,47 @@ public:
 
     const gtirb::ByteInterval* getByteInterval(uint64_t EA, size_t Size);
     void readData(uint64_t EA, uint8_t* Buffer, size_t Count);
+
+    /**
+    Use the data of a module, which must not change while functors are called.
+    */
     void useModule(const gtirb::Module* M);
     bool IsBigEndian = false;
 
+    /**
+    Get the context used by functors called from the current thread: the one
+    installed by a FunctorContextScope, or the global FunctorContext.
+    */
+    static FunctorContextManager& current();
+
+    /**
+    The initialized bytes of a byte interval in a loaded, executable or
+    initialized section.
+    */
+    struct DataRange
+    {
+        uint64_t Begin;
+        uint64_t End;
+        const gtirb::ByteInterval* ByteInterval;
+        const uint8_t* Bytes;
+        // Whether the range overlaps another range.
+        bool Overlaps;
+    };
+
 private:
+    const DataRange* findDataRange(uint64_t EA, size_t Size);
+
     const gtirb::Module* Module = nullptr;
 
+    // Data ranges sorted by address, and the largest end address of the ranges
+    // up to each index.
+    std::vector<DataRange> DataRanges;
+    std::vector<uint64_t> MaxEnds;
+
+    // Identifies the data ranges of the last call to useModule, for the
+    // per-thread cache of the last range found.
+    uint64_t Generation = 0;
+
 #ifndef __EMBEDDED_SOUFFLE__
     void loadGtirb(void);
     std::unique_ptr<gtirb::Context> GtirbContext;
@@ -102,4 +138,25 @@ private:
 
 extern FunctorContextManager FunctorContext;
 
+/**
+Install a FunctorContextManager for the functors called from the current
+thread during the lifetime of the scope.
+
+A Souffle program run with a single thread evaluates its functors on the
+calling thread, so this allows programs for different modules to run
+concurrently.
+*/
+class FunctorContextScope
+{
+public:
+    explicit FunctorContextScope(FunctorContextManager& Context);
+    ~FunctorContextScope();
+
+    FunctorContextScope(const FunctorContextScope&) = delete;
+    FunctorContextScope& operator=(const FunctorContextScope&) = delete;
+
+private:
+    FunctorContextManager* Previous;
+};
+
 #endif // SRC_FUNCTORS_H_
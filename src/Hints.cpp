@@ -82,3 +82,28 @@ void HintsLoader::insert(souffle::SouffleProgram &Program, const std::string &Na
         }
     }
 }
+
+std::string HintsLoader::getHints(const std::string &Namespace) const
+{
+    auto It = HintsTable.find(Namespace);
+    if(It == HintsTable.end())
+    {
+        return "";
+    }
+
+    std::map<std::string, const std::list<std::pair<uint32_t, std::string>> *> Relations;
+    for(auto &[RelationName, Hints] : It->second)
+    {
+        Relations[RelationName] = &Hints;
+    }
+
+    std::stringstream Text;
+    for(auto &[RelationName, Hints] : Relations)
+    {
+        for(auto &[LineNumber, Hint] : *Hints)
+        {
+            Text << RelationName << "\t" << Hint << "\n";
+        }
+    }
+    return Text.str();
+}
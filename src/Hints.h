@@ -44,6 +44,12 @@ public:
     */
     void insert(souffle::SouffleProgram& Program, const std::string& Namespace);
 
+    /**
+    Get the hints loaded for a namespace as text, one `relation<TAB>tuple'
+    line per hint, sorted by relation name and in file order within a relation.
+    */
+    std::string getHints(const std::string& Namespace) const;
+
 private:
     // map of (namespace -> map(relation name -> list(pair(lineno, tuple text))))
     std::unordered_map<std::string,
@@ -22,11 +22,19 @@
 //===----------------------------------------------------------------------===//
 #include <fcntl.h>
 
+#include <algorithm>
+#include <atomic>
 #include <chrono>
+#include <exception>
+#include <functional>
 #include <iomanip>
 #include <iostream>
+#include <mutex>
+#include <optional>
+#include <sstream>
 #include <string>
 #include <thread>
+#include <typeinfo>
 #include <vector>
 #if defined(_MSC_VER)
 #include <io.h>
@@ -48,8 +56,11 @@
 #include "AnalysisPipeline.h"
 #include "AuxDataSchema.h"
 #include "CliDriver.h"
+#include "Functors.h"
 #include "Hints.h"
+#include "PipelineStats.h"
 #include "Registration.h"
+#include "TraceEvents.h"
 #include "Version.h"
 #include "gtirb-builder/GtirbBuilder.h"
 #include "passes/DisassemblyPass.h"
@@ -123,6 +134,321 @@ static void checkOutputParamIsWritable(const po::variables_map &Vars, const std:
     }
 }
 
+static void configurePipeline(AnalysisPipeline &Pipeline, const po::variables_map &Vars,
+                              bool MultiModule)
+{
+    Pipeline.push<DisassemblyPass>(Vars.count("self-diagnose") != 0,
+                                   Vars.count("ignore-errors") != 0,
+                                   Vars.count("no-cfi-directives") != 0);
+
+    if(Vars.count("skip-function-analysis") == 0)
+    {
+        Pipeline.push<SccPass>();
+        Pipeline.push<NoReturnPass>();
+        Pipeline.push<FunctionInferencePass>();
+    }
+
+    Pipeline.setDatalogThreadCount(Vars["threads"].as<unsigned int>());
+    const std::string &ProfileDir = Vars["profile"].as<std::string>();
+    if(!ProfileDir.empty())
+    {
+        fs::create_directories(ProfileDir);
+        Pipeline.setDatalogProfileDir(ProfileDir);
+    }
+
+    if(Vars.count("debug-dir"))
+    {
+        Pipeline.configureDebugDir(Vars["debug-dir"].as<std::string>(), MultiModule);
+    }
+
+    if(Vars.count("interpreter"))
+    {
+        Pipeline.configureSouffleInterpreter(
+            Vars["interpreter"].as<std::string>(),
+            Vars.count("library-dir") ? Vars["library-dir"].as<std::string>() : std::string());
+    }
+
+    // TODO: currently, hints files have no support for static archives containing multiple modules;
+    // all hints are used when processing each module, which is most likely not desirable.
+    if(Vars.count("hints"))
+    {
+        Pipeline.loadHints(Vars["hints"].as<std::string>());
+    }
+
+    if(Vars.count("with-souffle-relations") || Vars.count("souffle-relations"))
+    {
+        Pipeline.enableSouffleOutputs();
+    }
+
+    if(Vars.count("souffle-relations"))
+    {
+        std::vector<std::string> Patterns;
+        std::stringstream List(Vars["souffle-relations"].as<std::string>());
+        std::string Pattern;
+        while(std::getline(List, Pattern, ','))
+        {
+            if(!Pattern.empty())
+            {
+                Patterns.push_back(Pattern);
+            }
+        }
+        Pipeline.setSouffleRelationFilter(Patterns);
+    }
+
+    if(Vars.count("binary-souffle-relations"))
+    {
+        Pipeline.enableBinaryRelations();
+    }
+}
+
+/**
+Describe the options that affect the results of the analysis passes, for the
+keys of the checkpoints of `--incremental-dir'.
+*/
+static std::string describeAnalysisOptions(const po::variables_map &Vars)
+{
+    std::stringstream Description;
+    Description << DDISASM_FULL_VERSION_STRING << "\n";
+    for(const char *Name : {"self-diagnose", "ignore-errors", "no-cfi-directives",
+                            "skip-function-analysis", "with-souffle-relations", "souffle-relations",
+                            "binary-souffle-relations", "interpreter"})
+    {
+        if(Vars.count(Name))
+        {
+            Description << Name;
+            if(Vars[Name].value().type() == typeid(std::string))
+            {
+                Description << "=" << Vars[Name].as<std::string>();
+            }
+            Description << "\n";
+        }
+    }
+    return Description.str();
+}
+
+static void runPipeline(AnalysisPipeline &Pipeline, GtirbBuilder::GTIRB &GTIRB)
+{
+    for(auto &Module : GTIRB.IR->modules())
+    {
+        Pipeline.run(*GTIRB.Context, Module);
+
+        // Remove provisional AuxData tables.
+        Module.removeAuxData<gtirb::schema::Relocations>();
+        Module.removeAuxData<gtirb::schema::SectionIndex>();
+    }
+}
+
+static uint64_t getModuleSize(const gtirb::Module &Module)
+{
+    uint64_t Size = 0;
+    for(const auto &ByteInterval : Module.byte_intervals())
+    {
+        Size += ByteInterval.getSize();
+    }
+    return Size;
+}
+
+/**
+Analyze the modules of GTIRB on Jobs threads.
+
+Each thread has its own pipeline, and thus its own Souffle program instances,
+and its own FunctorContext. The Datalog analyses of different modules run
+concurrently, each with a single thread, while the load and transform phases,
+which use the shared gtirb::Context, are serialized.
+
+AddListeners is called from each thread to add listeners to its pipeline.
+*/
+static void runPipelinesConcurrently(
+    const po::variables_map &Vars, GtirbBuilder::GTIRB &GTIRB, unsigned int Jobs,
+    const std::function<void(AnalysisPipeline &)> &AddListeners)
+{
+    std::vector<gtirb::Module *> Modules;
+    for(auto &Module : GTIRB.IR->modules())
+    {
+        Modules.push_back(&Module);
+    }
+    // Start with the largest modules so that their analyses overlap the rest.
+    std::stable_sort(Modules.begin(), Modules.end(), [](gtirb::Module *A, gtirb::Module *B) {
+        return getModuleSize(*A) > getModuleSize(*B);
+    });
+
+    std::atomic<size_t> Next{0};
+    std::mutex ContextMutex;
+    std::mutex ErrorMutex;
+    std::exception_ptr Error;
+
+    auto Worker = [&]() {
+        try
+        {
+            FunctorContextManager Functors;
+            FunctorContextScope Scope(Functors);
+
+            AnalysisPipeline Pipeline;
+            auto Listener = std::make_shared<DDisasmPipelineListener>(true);
+            Pipeline.addListener(Listener);
+            configurePipeline(Pipeline, Vars, true);
+            AddListeners(Pipeline);
+            Pipeline.setDatalogThreadCount(1);
+            Pipeline.setContextMutex(ContextMutex);
+
+            for(size_t I = Next++; I < Modules.size(); I = Next++)
+            {
+                Pipeline.run(*GTIRB.Context, *Modules[I]);
+
+                // Remove provisional AuxData tables.
+                Modules[I]->removeAuxData<gtirb::schema::Relocations>();
+                Modules[I]->removeAuxData<gtirb::schema::SectionIndex>();
+
+                Listener->flush();
+            }
+        }
+        catch(...)
+        {
+            std::lock_guard<std::mutex> Lock(ErrorMutex);
+            if(!Error)
+            {
+                Error = std::current_exception();
+            }
+            // Stop the other threads after their current module.
+            Next = Modules.size();
+        }
+    };
+
+    std::vector<std::thread> Threads;
+    for(unsigned int I = 0; I < Jobs; I++)
+    {
+        Threads.emplace_back(Worker);
+    }
+    for(std::thread &Thread : Threads)
+    {
+        Thread.join();
+    }
+    if(Error)
+    {
+        std::rethrow_exception(Error);
+    }
+}
+
+static void printModule(gtirb_pprint::PrettyPrinter &Printer, gtirb::Context &Context,
+                        gtirb::Module &Module, const po::variables_map &Vars, std::ostream &Out)
+{
+    std::string ListingMode = Vars.count("debug") != 0 ? "debug" : "";
+    const std::string &format = gtirb_pprint::getModuleFileFormat(Module);
+    const std::string &isa = gtirb_pprint::getModuleISA(Module);
+    const std::string &syntax =
+        gtirb_pprint::getDefaultSyntax(format, isa, ListingMode).value_or("");
+    auto target = std::make_tuple(format, isa, syntax);
+    Printer.setTarget(std::move(target));
+
+    // Apply pre-print transforms provided by the pretty-printer library.
+    // This MODIFIES the GTIRB, so it's important to do this *after*
+    // writing the GTIRB output to disk if we're doing both.
+    gtirb_pprint::applyFixups(Context, Module, Printer);
+
+    if(Vars.count("debug") != 0)
+    {
+        Printer.setListingMode("debug");
+    }
+
+    if(Vars.count("keep-functions") != 0)
+    {
+        for(auto keep : Vars["keep-functions"].as<std::vector<std::string>>())
+        {
+            Printer.symbolPolicy().keep(keep);
+        }
+    }
+
+    Printer.print(Out, Context, Module);
+}
+
+/**
+Serve a single `--serve' request: disassemble the binary at Path and write
+the requested output (Format is "ir" or "asm") to Out.
+
+Returns false after writing an error message to Out if the binary cannot be
+loaded or the output cannot be produced.
+*/
+static bool serveRequest(const po::variables_map &Vars, const std::string &Format,
+                         const std::string &Path, std::ostream &Out)
+{
+    auto GTIRB = GtirbBuilder::read(Path);
+    if(!GTIRB)
+    {
+        Out << Path << ": " << GTIRB.getError().message();
+        return false;
+    }
+
+    auto Modules = GTIRB->IR->modules();
+    unsigned int ModuleCount = std::distance(std::begin(Modules), std::end(Modules));
+    if(Format == "asm" && ModuleCount != 1)
+    {
+        Out << Path << ": asm output requires a binary with a single module";
+        return false;
+    }
+
+    GTIRB->IR->addAuxData<gtirb::schema::DdisasmVersion>(DDISASM_FULL_VERSION_STRING);
+
+    if(Vars.count("no-analysis") == 0)
+    {
+        AnalysisPipeline Pipeline;
+        Pipeline.addListener(std::make_shared<DDisasmPipelineListener>());
+        configurePipeline(Pipeline, Vars, ModuleCount > 1);
+        runPipeline(Pipeline, *GTIRB);
+    }
+
+    if(Format == "ir")
+    {
+        GTIRB->IR->save(Out);
+    }
+    else
+    {
+        gtirb_pprint::PrettyPrinter Printer;
+        printModule(Printer, *GTIRB->Context, *Modules.begin(), Vars, Out);
+    }
+    return true;
+}
+
+/**
+Run as a persistent worker process.
+
+Each request is a single line on stdin of the form "<ir|asm> <path>".
+Each response written to stdout is a header line "ok <size>" or
+"error <size>" followed by exactly <size> bytes of payload: the serialized
+GTIRB or assembly listing on success, and an error message otherwise.
+Progress is reported on stderr as usual.
+*/
+static int serve(const po::variables_map &Vars)
+{
+    setStdoutToBinary();
+
+    std::string Line;
+    while(std::getline(std::cin, Line))
+    {
+        if(!Line.empty() && Line.back() == '\r')
+        {
+            Line.pop_back();
+        }
+
+        std::ostringstream Out;
+        bool Success = false;
+        size_t Split = Line.find(' ');
+        std::string Format = Line.substr(0, Split);
+        if(Split == std::string::npos || (Format != "ir" && Format != "asm"))
+        {
+            Out << "malformed request: " << Line;
+        }
+        else
+        {
+            Success = serveRequest(Vars, Format, Line.substr(Split + 1), Out);
+        }
+
+        const std::string Payload = Out.str();
+        std::cout << (Success ? "ok " : "error ") << Payload.size() << "\n"
+                  << Payload << std::flush;
+    }
+    return EXIT_SUCCESS;
+}
+
 int main(int argc, char **argv)
 {
     registerAuxDataTypes();
@@ -150,6 +476,13 @@ int main(int argc, char **argv)
         "skip-function-analysis,F",
         "Skip additional analyses to compute more precise function boundaries.")(
         "with-souffle-relations", "Package facts/output relations into an AuxData table.")(
+        "souffle-relations", po::value<std::string>(),
+        "Like `--with-souffle-relations', but only package the relations matching a "
+        "comma-separated list of glob patterns, e.g. `disassembly.stack_def_use.*'. Names are "
+        "namespaced with the name of the analysis pass. Also applies to `--debug-dir'.")(
+        "binary-souffle-relations",
+        "Write the relations of `--with-souffle-relations' and `--debug-dir' in a compact binary "
+        "format instead of CSV.")(
         "no-cfi-directives",
         "Do not produce cfi directives. Instead it produces symbolic expressions in .eh_frame.")(
         "threads,j", po::value<unsigned int>()->default_value(1), "Number of cores to use.")(
@@ -162,7 +495,28 @@ int main(int argc, char **argv)
         "library-dir,L", po::value<std::string>(),
         "Directory from which extra libraries are loaded when running the interpreter")(
         "profile", po::value<std::string>()->default_value(""),
-        "Generate Souffle profiling information in the specified directory.");
+        "Generate Souffle profiling information in the specified directory.")(
+        "stats-json", po::value<std::string>(),
+        "Write the run time, CPU time, peak memory growth and relation sizes of each analysis "
+        "pass to the specified JSON file.")(
+        "trace-events", po::value<std::string>(),
+        "Write a timeline of the analysis passes and their phases to the specified file in the "
+        "Chrome Trace Event format.")(
+        "module-jobs", po::value<unsigned int>()->default_value(1),
+        "Number of modules of a static archive to analyze concurrently. Each module is analyzed "
+        "with a single thread.")(
+        "checkpoint-dir", po::value<std::string>(),
+        "Save the GTIRB to the specified directory after each analysis pass.")(
+        "resume-from", po::value<std::string>(),
+        "Instead of disassembling the input file, load the checkpoint saved after the specified "
+        "analysis pass from the `--checkpoint-dir' directory and run the remaining passes.")(
+        "incremental-dir", po::value<std::string>(),
+        "Keep the checkpoints of the analysis passes in the specified directory and, on later "
+        "runs, only rerun the passes after the last one whose input file, options and hints are "
+        "unchanged.")(
+        "serve",
+        "Run as a persistent worker: read \"<ir|asm> <path>\" requests from stdin and write "
+        "length-prefixed results to stdout.");
 
     po::positional_options_description pd;
     pd.add("input-file", -1);
@@ -193,7 +547,7 @@ int main(int argc, char **argv)
         return 1;
     }
 
-    if(vm.count("input-file") < 1)
+    if(vm.count("input-file") < 1 && vm.count("serve") == 0 && vm.count("resume-from") == 0)
     {
         std::cerr << "Error: missing input file\nTry '" << argv[0]
                   << " --help' for more information.\n";
@@ -207,23 +561,90 @@ int main(int argc, char **argv)
         return 1;
     }
 
-    const std::string &ProfileDir = vm["profile"].as<std::string>();
 #if !defined(DDISASM_SOUFFLE_PROFILING)
-    if(!ProfileDir.empty() && !vm.count("interpreter"))
+    if(!vm["profile"].as<std::string>().empty() && !vm.count("interpreter"))
     {
         std::cerr << "Error: missing `--interpreter' argument required by `--profile'\n";
         return 1;
     }
 #endif
 
+    if(vm.count("resume-from") && !vm.count("checkpoint-dir"))
+    {
+        std::cerr << "Error: missing `--checkpoint-dir' argument required by `--resume-from'\n";
+        return 1;
+    }
+
+    if(vm.count("incremental-dir") && (vm.count("checkpoint-dir") || vm.count("resume-from")))
+    {
+        std::cerr << "Error: `--incremental-dir' cannot be used with `--checkpoint-dir' or "
+                     "`--resume-from'\n";
+        return 1;
+    }
+
+    if(vm["module-jobs"].as<unsigned int>() > 1
+       && (vm.count("interpreter") || !vm["profile"].as<std::string>().empty()))
+    {
+        std::cerr << "Error: `--module-jobs' cannot be used with `--interpreter' or `--profile'\n";
+        return 1;
+    }
+
+    if(vm.count("serve"))
+    {
+        return serve(vm);
+    }
+
     checkOutputParamIsWritable(vm, "ir");
     checkOutputParamIsWritable(vm, "json");
+    checkOutputParamIsWritable(vm, "stats-json");
+    checkOutputParamIsWritable(vm, "trace-events");
+
+    if(vm.count("trace-events"))
+    {
+        TraceRecorder::instance().enable();
+    }
+
+    // With `--incremental-dir', configure the pipeline before loading the input, to find the
+    // last checkpoint of the previous run that is still valid.
+    std::unique_ptr<AnalysisPipeline> IncrementalPipeline;
+    std::optional<std::string> ReusedPass;
+    if(vm.count("incremental-dir") && !vm.count("no-analysis"))
+    {
+        IncrementalPipeline = std::make_unique<AnalysisPipeline>();
+        configurePipeline(*IncrementalPipeline, vm, false);
+        ReusedPass = IncrementalPipeline->setIncrementalDir(
+            vm["incremental-dir"].as<std::string>(),
+            AnalysisPipeline::getInputKey(vm["input-file"].as<std::string>(),
+                                          describeAnalysisOptions(vm)));
+    }
 
     // Parse and build a GTIRB module from a supported binary object file.
-    std::cerr << "Building the initial gtirb representation " << std::flush;
+    std::string Filename;
+    if(ReusedPass)
+    {
+        // Skip the passes whose results are unchanged since the previous run.
+        Filename = AnalysisPipeline::getCheckpointPath(vm["incremental-dir"].as<std::string>(),
+                                                       *ReusedPass)
+                       .string();
+        std::cerr << "Reusing the checkpoint " << Filename << " " << std::flush;
+    }
+    else if(vm.count("resume-from"))
+    {
+        // Resume from a GTIRB checkpoint instead.
+        Filename = AnalysisPipeline::getCheckpointPath(vm["checkpoint-dir"].as<std::string>(),
+                                                       vm["resume-from"].as<std::string>())
+                       .string();
+        std::cerr << "Loading the checkpoint " << Filename << " " << std::flush;
+    }
+    else
+    {
+        Filename = vm["input-file"].as<std::string>();
+        std::cerr << "Building the initial gtirb representation " << std::flush;
+    }
     auto StartBuildZeroIR = std::chrono::high_resolution_clock::now();
-    std::string Filename = vm["input-file"].as<std::string>();
+    std::optional<TraceSpan> BuildSpan(std::in_place, "build", "ddisasm", "");
     auto GTIRB = GtirbBuilder::read(Filename);
+    BuildSpan.reset();
     if(!GTIRB)
     {
         std::cerr << "\nERROR: " << Filename << ": " << GTIRB.getError().message() << "\n";
@@ -244,6 +665,16 @@ int main(int argc, char **argv)
         }
     }
 
+    for(const char *Option : {"checkpoint-dir", "incremental-dir"})
+    {
+        if(vm.count(Option) && ModuleCount > 1)
+        {
+            std::cerr << "\nError: `--" << Option
+                      << "' is not supported for inputs with multiple modules\n";
+            return 1;
+        }
+    }
+
     // Add `ddisasmVersion' aux data table.
     GTIRB->IR->addAuxData<gtirb::schema::DdisasmVersion>(DDISASM_FULL_VERSION_STRING);
     printElapsedTimeSince(StartBuildZeroIR);
@@ -272,57 +703,74 @@ int main(int argc, char **argv)
         return 0;
     }
 
-    AnalysisPipeline Pipeline;
-    Pipeline.addListener(std::make_shared<DDisasmPipelineListener>());
-    Pipeline.push<DisassemblyPass>(vm.count("self-diagnose") != 0, vm.count("ignore-errors") != 0,
-                                   vm.count("no-cfi-directives") != 0);
-
-    if(vm.count("skip-function-analysis") == 0)
-    {
-        Pipeline.push<SccPass>();
-        Pipeline.push<NoReturnPass>();
-        Pipeline.push<FunctionInferencePass>();
-    }
-
-    Pipeline.setDatalogThreadCount(vm["threads"].as<unsigned int>());
-    if(!ProfileDir.empty())
-    {
-        fs::create_directories(ProfileDir);
-        Pipeline.setDatalogProfileDir(ProfileDir);
-    }
+    unsigned int ModuleJobs = std::min(vm["module-jobs"].as<unsigned int>(), ModuleCount);
 
-    if(vm.count("debug-dir"))
-    {
-        Pipeline.configureDebugDir(vm["debug-dir"].as<std::string>(), ModuleCount > 1);
-    }
+    std::mutex ListenersMutex;
+    std::vector<std::shared_ptr<PipelineStatsListener>> StatsListeners;
+    std::vector<std::shared_ptr<TraceEventsListener>> TraceListeners;
+    auto AddListeners = [&](AnalysisPipeline &Pipeline) {
+        std::lock_guard<std::mutex> Lock(ListenersMutex);
+        if(vm.count("stats-json"))
+        {
+            // Concurrent modules are each analyzed by a single thread: measure the CPU time of
+            // that thread rather than of the whole process.
+            StatsListeners.push_back(std::make_shared<PipelineStatsListener>(ModuleJobs > 1));
+            Pipeline.addListener(StatsListeners.back());
+        }
+        if(vm.count("trace-events"))
+        {
+            TraceListeners.push_back(std::make_shared<TraceEventsListener>());
+            Pipeline.addListener(TraceListeners.back());
+        }
+    };
 
-    if(vm.count("interpreter"))
+    if(ModuleJobs > 1)
     {
-        Pipeline.configureSouffleInterpreter(
-            vm["interpreter"].as<std::string>(),
-            vm.count("library-dir") ? vm["library-dir"].as<std::string>() : std::string());
+        runPipelinesConcurrently(vm, *GTIRB, ModuleJobs, AddListeners);
     }
-
-    // TODO: currently, hints files have no support for static archives containing multiple modules;
-    // all hints are used when processing each module, which is most likely not desirable.
-    if(vm.count("hints"))
+    else
     {
-        Pipeline.loadHints(vm["hints"].as<std::string>());
+        std::unique_ptr<AnalysisPipeline> PipelinePtr = std::move(IncrementalPipeline);
+        if(!PipelinePtr)
+        {
+            PipelinePtr = std::make_unique<AnalysisPipeline>();
+            configurePipeline(*PipelinePtr, vm, ModuleCount > 1);
+        }
+        AnalysisPipeline &Pipeline = *PipelinePtr;
+        Pipeline.addListener(std::make_shared<DDisasmPipelineListener>());
+        AddListeners(Pipeline);
+        if(vm.count("checkpoint-dir"))
+        {
+            Pipeline.setCheckpointDir(vm["checkpoint-dir"].as<std::string>());
+        }
+        if(vm.count("resume-from") && !Pipeline.resumeAfter(vm["resume-from"].as<std::string>()))
+        {
+            std::cerr << "Error: no analysis pass named `" << vm["resume-from"].as<std::string>()
+                      << "'. Valid passes are:";
+            for(const std::string &Slug : Pipeline.getPassSlugs(false))
+            {
+                std::cerr << " " << Slug;
+            }
+            std::cerr << "\n";
+            return 1;
+        }
+        runPipeline(Pipeline, *GTIRB);
     }
 
-    if(vm.count("with-souffle-relations"))
+    for(auto &TraceListener : TraceListeners)
     {
-        Pipeline.enableSouffleOutputs();
+        TraceListener->finish();
     }
 
-    for(auto &Module : Modules)
+    if(!StatsListeners.empty())
     {
-        std::cerr << "Processing module: " << Module.getName() << "\n";
-        Pipeline.run(*GTIRB->Context, Module);
-
-        // Remove provisional AuxData tables.
-        Module.removeAuxData<gtirb::schema::Relocations>();
-        Module.removeAuxData<gtirb::schema::SectionIndex>();
+        PipelineStatsListener Stats;
+        for(auto &StatsListener : StatsListeners)
+        {
+            Stats.merge(*StatsListener);
+        }
+        std::ofstream Out(vm["stats-json"].as<std::string>());
+        Stats.writeJson(Out, DDISASM_FULL_VERSION_STRING);
     }
 
     // Output GTIRB
@@ -378,34 +826,8 @@ int main(int argc, char **argv)
     // Pretty-print
     if(vm.count("asm") != 0 || (vm.count("ir") == 0 && vm.count("json") == 0))
     {
-        std::string ListingMode = vm.count("debug") != 0 ? "debug" : "";
         for(auto &Module : Modules)
         {
-            const std::string &format = gtirb_pprint::getModuleFileFormat(Module);
-            const std::string &isa = gtirb_pprint::getModuleISA(Module);
-            const std::string &syntax =
-                gtirb_pprint::getDefaultSyntax(format, isa, ListingMode).value_or("");
-            auto target = std::make_tuple(format, isa, syntax);
-            pprinter.setTarget(std::move(target));
-
-            // Apply pre-print transforms provided by the pretty-printer library.
-            // This MODIFIES the GTIRB, so it's important to do this *after*
-            // writing the GTIRB output to disk if we're doing both.
-            gtirb_pprint::applyFixups(*GTIRB->Context, Module, pprinter);
-
-            if(vm.count("debug") != 0)
-            {
-                pprinter.setListingMode("debug");
-            }
-
-            if(vm.count("keep-functions") != 0)
-            {
-                for(auto keep : vm["keep-functions"].as<std::vector<std::string>>())
-                {
-                    pprinter.symbolPolicy().keep(keep);
-                }
-            }
-
             fs::path AsmPath;
             std::ofstream AsmFileStream;
             bool UseStdout = true;
@@ -440,12 +862,22 @@ int main(int argc, char **argv)
 
             std::cerr << "Printing assembler " << std::flush;
             auto StartPrinting = std::chrono::high_resolution_clock::now();
-            pprinter.print(UseStdout ? std::cout : AsmFileStream, *GTIRB->Context, Module);
+            {
+                TraceSpan Span("print", "ddisasm", Module.getName());
+                printModule(pprinter, *GTIRB->Context, Module, vm,
+                            UseStdout ? std::cout : AsmFileStream);
+            }
             printElapsedTimeSince(StartPrinting);
             std::cerr << "\n";
         }
     }
 
+    if(vm.count("trace-events"))
+    {
+        std::ofstream Out(vm["trace-events"].as<std::string>());
+        writeTraceEvents(Out);
+    }
+
     if(GTIRB)
     {
         GTIRB->Context->ForgetAllocations();
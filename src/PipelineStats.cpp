@@ -0,0 +1,212 @@
+//===- PipelineStats.cpp -----------------------------------------*- C++ -*-===//
+//
+//  Copyright (C) 2023 GrammaTech, Inc.
+//
+//  This code is licensed under the GNU Affero General Public License
+//  as published by the Free Software Foundation, either version 3 of
+//  the License, or (at your option) any later version. See the
+//  LICENSE.txt file in the project root for license terms or visit
+//  https://www.gnu.org/licenses/agpl.txt.
+//
+//  This program is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU Affero General Public License for more details.
+//
+//  This project is sponsored by the Office of Naval Research, One Liberty
+//  Center, 875 N. Randolph Street, Arlington, VA 22203 under contract #
+//  N68335-17-C-0700.  The content of the information does not necessarily
+//  reflect the position or policy of the Government and no official
+//  endorsement should be inferred.
+//
+//===----------------------------------------------------------------------===//
+#include "PipelineStats.h"
+
+#include <iomanip>
+
+#include "passes/DatalogAnalysisPass.h"
+
+#if defined(_MSC_VER)
+// clang-format off
+#include <windows.h>
+#include <psapi.h>
+// clang-format on
+#else
+#include <sys/resource.h>
+#endif
+
+ResourceUsage ResourceUsage::current([[maybe_unused]] bool ThreadCpuTime)
+{
+    ResourceUsage Usage;
+#if defined(_MSC_VER)
+    FILETIME Creation, Exit, Kernel, User;
+    if(ThreadCpuTime)
+    {
+        GetThreadTimes(GetCurrentThread(), &Creation, &Exit, &Kernel, &User);
+    }
+    else
+    {
+        GetProcessTimes(GetCurrentProcess(), &Creation, &Exit, &Kernel, &User);
+    }
+    auto Seconds = [](const FILETIME& Time) {
+        ULARGE_INTEGER Ticks;
+        Ticks.LowPart = Time.dwLowDateTime;
+        Ticks.HighPart = Time.dwHighDateTime;
+        // FILETIME counts 100-nanosecond intervals.
+        return static_cast<double>(Ticks.QuadPart) * 1e-7;
+    };
+    Usage.CpuTime = std::chrono::duration<double>(Seconds(Kernel) + Seconds(User));
+
+    PROCESS_MEMORY_COUNTERS Counters;
+    if(GetProcessMemoryInfo(GetCurrentProcess(), &Counters, sizeof(Counters)))
+    {
+        Usage.PeakRss = Counters.PeakWorkingSetSize;
+    }
+#else
+    struct rusage RUsage;
+    getrusage(RUSAGE_SELF, &RUsage);
+    auto Seconds = [](const struct timeval& Time) {
+        return static_cast<double>(Time.tv_sec) + static_cast<double>(Time.tv_usec) * 1e-6;
+    };
+    struct rusage CpuUsage = RUsage;
+#if defined(RUSAGE_THREAD)
+    if(ThreadCpuTime)
+    {
+        getrusage(RUSAGE_THREAD, &CpuUsage);
+    }
+#endif
+    Usage.CpuTime =
+        std::chrono::duration<double>(Seconds(CpuUsage.ru_utime) + Seconds(CpuUsage.ru_stime));
+#if defined(__APPLE__)
+    // ru_maxrss is in bytes on macOS...
+    Usage.PeakRss = static_cast<uint64_t>(RUsage.ru_maxrss);
+#else
+    // ...and in kilobytes on Linux.
+    Usage.PeakRss = static_cast<uint64_t>(RUsage.ru_maxrss) * 1024;
+#endif
+#endif
+    return Usage;
+}
+
+void writeJsonString(std::ostream& Out, const std::string& Value)
+{
+    Out << '"';
+    for(char C : Value)
+    {
+        switch(C)
+        {
+            case '"':
+                Out << "\\\"";
+                break;
+            case '\\':
+                Out << "\\\\";
+                break;
+            case '\n':
+                Out << "\\n";
+                break;
+            case '\t':
+                Out << "\\t";
+                break;
+            default:
+                if(static_cast<unsigned char>(C) < 0x20)
+                {
+                    Out << "\\u" << std::hex << std::setw(4) << std::setfill('0')
+                        << static_cast<int>(C) << std::dec << std::setfill(' ');
+                }
+                else
+                {
+                    Out << C;
+                }
+        }
+    }
+    Out << '"';
+}
+
+static const char* phaseName(AnalysisPassPhase Phase)
+{
+    switch(Phase)
+    {
+        case AnalysisPassPhase::LOAD:
+            return "load";
+        case AnalysisPassPhase::ANALYZE:
+            return "analyze";
+        case AnalysisPassPhase::TRANSFORM:
+            return "transform";
+    }
+    return "";
+}
+
+void PipelineStatsListener::notifyModuleBegin(const gtirb::Module& Module)
+{
+    CurrentModule = Module.getName();
+}
+
+void PipelineStatsListener::notifyPassBegin(const AnalysisPass& Pass)
+{
+    Passes.push_back({CurrentModule, Pass.getName(), {}, {}});
+}
+
+void PipelineStatsListener::notifyPassEnd(const AnalysisPass& Pass)
+{
+    if(auto* DatalogPass = dynamic_cast<const DatalogAnalysisPass*>(&Pass))
+    {
+        Passes.back().Relations = DatalogPass->getRelationSizes();
+    }
+}
+
+void PipelineStatsListener::notifyPassPhase([[maybe_unused]] AnalysisPassPhase Phase,
+                                            bool HasPhase)
+{
+    if(HasPhase)
+    {
+        PhaseStart = ResourceUsage::current(ThreadCpuTime);
+    }
+}
+
+void PipelineStatsListener::notifyPassResult(AnalysisPassPhase Phase,
+                                             const AnalysisPassResult& Result)
+{
+    ResourceUsage End = ResourceUsage::current(ThreadCpuTime);
+    Passes.back().Phases.push_back({Phase, Result.RunTime.count(),
+                                    (End.CpuTime - PhaseStart.CpuTime).count(),
+                                    End.PeakRss - PhaseStart.PeakRss});
+}
+
+void PipelineStatsListener::merge(const PipelineStatsListener& Other)
+{
+    Passes.insert(Passes.end(), Other.Passes.begin(), Other.Passes.end());
+}
+
+void PipelineStatsListener::writeJson(std::ostream& Out, const std::string& Version) const
+{
+    Out << "{\n  \"ddisasm_version\": ";
+    writeJsonString(Out, Version);
+    Out << ",\n  \"passes\": [";
+    for(size_t I = 0; I < Passes.size(); I++)
+    {
+        const PassStats& Pass = Passes[I];
+        Out << (I ? ",\n" : "\n") << "    {\"module\": ";
+        writeJsonString(Out, Pass.Module);
+        Out << ", \"pass\": ";
+        writeJsonString(Out, Pass.Pass);
+        Out << ",\n     \"phases\": [";
+        for(size_t J = 0; J < Pass.Phases.size(); J++)
+        {
+            const PhaseStats& Phase = Pass.Phases[J];
+            Out << (J ? ", " : "") << "{\"phase\": \"" << phaseName(Phase.Phase)
+                << "\", \"wall_time\": " << Phase.WallTime << ", \"cpu_time\": " << Phase.CpuTime
+                << ", \"peak_rss_delta\": " << Phase.PeakRssDelta << "}";
+        }
+        Out << "],\n     \"relations\": {";
+        bool First = true;
+        for(const auto& [Name, Size] : Pass.Relations)
+        {
+            Out << (First ? "" : ", ");
+            writeJsonString(Out, Name);
+            Out << ": " << Size;
+            First = false;
+        }
+        Out << "}}";
+    }
+    Out << "\n  ]\n}\n";
+}
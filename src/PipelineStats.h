@@ -0,0 +1,119 @@
+//===- PipelineStats.h -------------------------------------------*- C++ -*-===//
+//
+//  Copyright (C) 2023 GrammaTech, Inc.
+//
+//  This code is licensed under the GNU Affero General Public License
+//  as published by the Free Software Foundation, either version 3 of
+//  the License, or (at your option) any later version. See the
+//  LICENSE.txt file in the project root for license terms or visit
+//  https://www.gnu.org/licenses/agpl.txt.
+//
+//  This program is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU Affero General Public License for more details.
+//
+//  This project is sponsored by the Office of Naval Research, One Liberty
+//  Center, 875 N. Randolph Street, Arlington, VA 22203 under contract #
+//  N68335-17-C-0700.  The content of the information does not necessarily
+//  reflect the position or policy of the Government and no official
+//  endorsement should be inferred.
+//
+//===----------------------------------------------------------------------===//
+#ifndef _PIPELINE_STATS_H_
+#define _PIPELINE_STATS_H_
+
+#include <chrono>
+#include <cstdint>
+#include <map>
+#include <ostream>
+#include <string>
+#include <vector>
+
+#include "AnalysisPipeline.h"
+
+/**
+Resource usage of the current process at a point in time.
+
+Peak RSS is always that of the whole process. CPU time is that of the whole
+process too, unless `ThreadCpuTime' is requested: then it is the CPU time of
+the calling thread on platforms that report it (Linux and Windows), and of
+the whole process elsewhere.
+*/
+struct ResourceUsage
+{
+    std::chrono::duration<double> CpuTime;
+    uint64_t PeakRss = 0; // bytes
+
+    static ResourceUsage current(bool ThreadCpuTime = false);
+};
+
+/**
+Write a string as a quoted and escaped JSON string.
+*/
+void writeJsonString(std::ostream& Out, const std::string& Value);
+
+/**
+A PipelineStatsListener records machine-readable statistics for each pass.
+
+For each phase of each pass it records wall time, CPU time and the growth of
+the process' peak resident set size, and for Datalog passes the number of
+tuples in each relation.
+
+When several modules are analyzed concurrently, each by a single thread,
+`ThreadCpuTime' makes the listener record the CPU time of the thread running
+the pipeline, so that it does not include the work of the other modules. The
+peak resident set size is process-wide and does include it.
+*/
+class PipelineStatsListener : public AnalysisPipelineListener
+{
+public:
+    explicit PipelineStatsListener(bool ThreadCpuTime = false) : ThreadCpuTime(ThreadCpuTime)
+    {
+    }
+
+    virtual ~PipelineStatsListener()
+    {
+    }
+
+    virtual void notifyModuleBegin(const gtirb::Module& Module);
+    virtual void notifyPassBegin(const AnalysisPass& Pass);
+    virtual void notifyPassEnd(const AnalysisPass& Pass);
+    virtual void notifyPassPhase(AnalysisPassPhase Phase, bool HasPhase);
+    virtual void notifyPassResult(AnalysisPassPhase Phase, const AnalysisPassResult& Result);
+
+    /**
+    Append the statistics recorded by another listener, e.g. the listener of
+    a pipeline that analyzed other modules concurrently.
+    */
+    void merge(const PipelineStatsListener& Other);
+
+    /**
+    Write the recorded statistics as a JSON document.
+    */
+    void writeJson(std::ostream& Out, const std::string& Version) const;
+
+private:
+    struct PhaseStats
+    {
+        AnalysisPassPhase Phase;
+        double WallTime;
+        double CpuTime;
+        uint64_t PeakRssDelta;
+    };
+
+    struct PassStats
+    {
+        std::string Module;
+        std::string Pass;
+        std::vector<PhaseStats> Phases;
+        std::map<std::string, size_t> Relations;
+    };
+
+    bool ThreadCpuTime;
+    std::string CurrentModule;
+    std::vector<PassStats> Passes;
+    ResourceUsage PhaseStart;
+};
+
+#endif /* _PIPELINE_STATS_H_ */
@@ -75,6 +75,7 @@ void registerAuxDataTypes()
     gtirb::AuxDataContainer::registerAuxDataType<PeDebugData>();
     gtirb::AuxDataContainer::registerAuxDataType<SouffleFacts>();
     gtirb::AuxDataContainer::registerAuxDataType<SouffleOutputs>();
+    gtirb::AuxDataContainer::registerAuxDataType<SouffleSymbols>();
     gtirb::AuxDataContainer::registerAuxDataType<RawEntries>();
     gtirb::AuxDataContainer::registerAuxDataType<Overlay>();
 }
@@ -0,0 +1,105 @@
+//===- TraceEvents.cpp -------------------------------------------*- C++ -*-===//
+//
+//  Copyright (C) 2023 GrammaTech, Inc.
+//
+//  This code is licensed under the GNU Affero General Public License
+//  as published by the Free Software Foundation, either version 3 of
+//  the License, or (at your option) any later version. See the
+//  LICENSE.txt file in the project root for license terms or visit
+//  https://www.gnu.org/licenses/agpl.txt.
+//
+//  This program is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU Affero General Public License for more details.
+//
+//  This project is sponsored by the Office of Naval Research, One Liberty
+//  Center, 875 N. Randolph Street, Arlington, VA 22203 under contract #
+//  N68335-17-C-0700.  The content of the information does not necessarily
+//  reflect the position or policy of the Government and no official
+//  endorsement should be inferred.
+//
+//===----------------------------------------------------------------------===//
+#include "TraceEvents.h"
+
+#include "PipelineStats.h"
+
+static const char* phaseName(AnalysisPassPhase Phase)
+{
+    switch(Phase)
+    {
+        case AnalysisPassPhase::LOAD:
+            return "load";
+        case AnalysisPassPhase::ANALYZE:
+            return "analyze";
+        case AnalysisPassPhase::TRANSFORM:
+            return "transform";
+    }
+    return "";
+}
+
+void TraceEventsListener::notifyModuleBegin(const gtirb::Module& Module)
+{
+    finish();
+    CurrentModule = Module.getName();
+    ModuleStart = Clock::now();
+}
+
+void TraceEventsListener::notifyPassBegin([[maybe_unused]] const AnalysisPass& Pass)
+{
+    PassStart = Clock::now();
+}
+
+void TraceEventsListener::notifyPassEnd(const AnalysisPass& Pass)
+{
+    TraceRecorder::instance().record(Pass.getName(), "pass", CurrentModule, PassStart,
+                                     Clock::now());
+}
+
+void TraceEventsListener::notifyPassPhase([[maybe_unused]] AnalysisPassPhase Phase,
+                                          [[maybe_unused]] bool HasPhase)
+{
+    PhaseStart = Clock::now();
+}
+
+void TraceEventsListener::notifyPassResult(AnalysisPassPhase Phase,
+                                           [[maybe_unused]] const AnalysisPassResult& Result)
+{
+    TraceRecorder::instance().record(phaseName(Phase), "phase", CurrentModule, PhaseStart,
+                                     Clock::now());
+}
+
+void TraceEventsListener::finish()
+{
+    if(!CurrentModule.empty())
+    {
+        TraceRecorder::instance().record(CurrentModule, "module", CurrentModule, ModuleStart,
+                                         Clock::now());
+        CurrentModule.clear();
+    }
+}
+
+void writeTraceEvents(std::ostream& Out)
+{
+    TraceRecorder& Recorder = TraceRecorder::instance();
+    auto Micros = [&Recorder](TraceRecorder::Clock::time_point Time) {
+        return std::chrono::duration<double, std::micro>(Time - Recorder.getOrigin()).count();
+    };
+
+    Out << "{\"displayTimeUnit\": \"ms\", \"traceEvents\": [";
+    bool First = true;
+    for(const TraceEvent& Event : Recorder.getEvents())
+    {
+        Out << (First ? "\n" : ",\n") << "{\"ph\": \"X\", \"pid\": 1, \"tid\": " << Event.ThreadId
+            << ", \"ts\": " << Micros(Event.Start)
+            << ", \"dur\": " << Micros(Event.End) - Micros(Event.Start) << ", \"name\": ";
+        writeJsonString(Out, Event.Name);
+        Out << ", \"cat\": ";
+        writeJsonString(Out, Event.Category);
+        Out << ", \"args\": {\"module\": ";
+        writeJsonString(Out, Event.Module);
+        Out << "}}";
+        First = false;
+    }
+    Out << "\n]}\n";
+}
@@ -0,0 +1,69 @@
+//===- TraceEvents.h ---------------------------------------------*- C++ -*-===//
+//
+//  Copyright (C) 2023 GrammaTech, Inc.
+//
+//  This code is licensed under the GNU Affero General Public License
+//  as published by the Free Software Foundation, either version 3 of
+//  the License, or (at your option) any later version. See the
+//  LICENSE.txt file in the project root for license terms or visit
+//  https://www.gnu.org/licenses/agpl.txt.
+//
+//  This program is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU Affero General Public License for more details.
+//
+//  This project is sponsored by the Office of Naval Research, One Liberty
+//  Center, 875 N. Randolph Street, Arlington, VA 22203 under contract #
+//  N68335-17-C-0700.  The content of the information does not necessarily
+//  reflect the position or policy of the Government and no official
+//  endorsement should be inferred.
+//
+//===----------------------------------------------------------------------===//
+#ifndef _TRACE_EVENTS_H_
+#define _TRACE_EVENTS_H_
+
+#include <ostream>
+#include <string>
+
+#include "AnalysisPipeline.h"
+#include "passes/Tracing.h"
+
+/**
+A TraceEventsListener records modules, passes and pass phases as spans in the
+process-wide TraceRecorder.
+*/
+class TraceEventsListener : public AnalysisPipelineListener
+{
+public:
+    virtual ~TraceEventsListener()
+    {
+    }
+
+    virtual void notifyModuleBegin(const gtirb::Module& Module);
+    virtual void notifyPassBegin(const AnalysisPass& Pass);
+    virtual void notifyPassEnd(const AnalysisPass& Pass);
+    virtual void notifyPassPhase(AnalysisPassPhase Phase, bool HasPhase);
+    virtual void notifyPassResult(AnalysisPassPhase Phase, const AnalysisPassResult& Result);
+
+    /**
+    Close the span of the module currently being analyzed.
+    */
+    void finish();
+
+private:
+    using Clock = TraceRecorder::Clock;
+
+    std::string CurrentModule;
+    Clock::time_point ModuleStart;
+    Clock::time_point PassStart;
+    Clock::time_point PhaseStart;
+};
+
+/**
+Write all events of the TraceRecorder in the Chrome Trace Event JSON format,
+which can be viewed with chrome://tracing or Perfetto.
+*/
+void writeTraceEvents(std::ostream& Out);
+
+#endif /* _TRACE_EVENTS_H_ */
@@ -27,9 +27,235 @@
 #include <souffle/profile/ProfileEvent.h>
 #endif
 
+#include <cstring>
 #include <fstream>
 #include <list>
 #include <map>
+#include <stdexcept>
+
+namespace
+{
+    // Headers of the binary relation and symbol table formats.
+    const std::string BinaryRelationMagic("\0SRB\1", 5);
+    const std::string BinarySymbolsMagic("\0SRS\1", 5);
+
+    const std::list<std::string> &getRecordFieldTypes(const std::string &AttrType)
+    {
+        // There is no way to look up record type information from the Datalog. We
+        // have to keep a map of definitions here.
+        static const std::map<std::string, std::list<std::string>> RecordTypeMap = {
+            {"r:stack_var", {"s:register", "i:number"}},
+        };
+
+        auto It = RecordTypeMap.find(AttrType);
+        if(It == RecordTypeMap.end())
+        {
+            throw std::logic_error("Serialization for datalog record type " + AttrType
+                                   + " not defined");
+        }
+        return It->second;
+    }
+
+    void appendLE(std::string &Buffer, uint64_t Value, size_t Size)
+    {
+        for(size_t I = 0; I < Size; I++)
+        {
+            Buffer.push_back(static_cast<char>((Value >> (8 * I)) & 0xff));
+        }
+    }
+
+    class BinaryReader
+    {
+    public:
+        explicit BinaryReader(const std::string &Data) : Data(Data)
+        {
+        }
+
+        uint64_t read(size_t Size)
+        {
+            check(Size);
+            uint64_t Value = 0;
+            for(size_t I = 0; I < Size; I++)
+            {
+                Value |= static_cast<uint64_t>(static_cast<uint8_t>(Data[Pos + I])) << (8 * I);
+            }
+            Pos += Size;
+            return Value;
+        }
+
+        std::string readString(size_t Size)
+        {
+            check(Size);
+            std::string Value = Data.substr(Pos, Size);
+            Pos += Size;
+            return Value;
+        }
+
+        bool readMagic(const std::string &Magic)
+        {
+            if(Data.compare(Pos, Magic.size(), Magic) != 0)
+            {
+                return false;
+            }
+            Pos += Magic.size();
+            return true;
+        }
+
+    private:
+        void check(size_t Size)
+        {
+            if(Pos + Size > Data.size())
+            {
+                throw std::out_of_range("Truncated binary relation data");
+            }
+        }
+
+        const std::string &Data;
+        size_t Pos = 0;
+    };
+
+    void encodeAttribute(std::string &Buffer, souffle::SouffleProgram &Program,
+                         const std::string &AttrType, souffle::RamDomain Data,
+                         DatalogIO::SymbolIndex &Symbols)
+    {
+        switch(AttrType[0])
+        {
+            case 's':
+                appendLE(Buffer, Symbols.index(Program, Data), 4);
+                break;
+            case 'u':
+                appendLE(Buffer, souffle::ramBitCast<souffle::RamUnsigned>(Data), 8);
+                break;
+            case 'i':
+            {
+                int64_t Value = souffle::ramBitCast<souffle::RamSigned>(Data);
+                appendLE(Buffer, static_cast<uint64_t>(Value), 8);
+                break;
+            }
+            case 'f':
+            {
+                double Value = souffle::ramBitCast<souffle::RamFloat>(Data);
+                uint64_t Bits;
+                std::memcpy(&Bits, &Value, sizeof(Bits));
+                appendLE(Buffer, Bits, 8);
+                break;
+            }
+            case 'r':
+            {
+                const std::list<std::string> &FieldTypes = getRecordFieldTypes(AttrType);
+                const souffle::RamDomain *Record =
+                    Program.getRecordTable().unpack(Data, FieldTypes.size());
+                unsigned int I = 0;
+                for(const std::string &FieldType : FieldTypes)
+                {
+                    encodeAttribute(Buffer, Program, FieldType, Record[I++], Symbols);
+                }
+                break;
+            }
+            default:
+                throw std::logic_error("Serialization for datalog type " + AttrType
+                                       + " not defined");
+        }
+    }
+
+    souffle::RamDomain decodeAttribute(BinaryReader &Reader, souffle::SouffleProgram &Program,
+                                       const std::string &AttrType,
+                                       const std::vector<std::string> &Symbols)
+    {
+        switch(AttrType[0])
+        {
+            case 's':
+            {
+                uint64_t Index = Reader.read(4);
+                if(Index >= Symbols.size())
+                {
+                    throw std::out_of_range("Symbol index out of range");
+                }
+                return Program.getSymbolTable().encode(Symbols[Index]);
+            }
+            case 'u':
+                return souffle::ramBitCast(static_cast<souffle::RamUnsigned>(Reader.read(8)));
+            case 'i':
+                return souffle::ramBitCast(static_cast<souffle::RamSigned>(Reader.read(8)));
+            case 'f':
+            {
+                uint64_t Bits = Reader.read(8);
+                double Value;
+                std::memcpy(&Value, &Bits, sizeof(Value));
+                return souffle::ramBitCast(static_cast<souffle::RamFloat>(Value));
+            }
+            case 'r':
+            {
+                std::vector<souffle::RamDomain> RecordData;
+                for(const std::string &FieldType : getRecordFieldTypes(AttrType))
+                {
+                    RecordData.push_back(decodeAttribute(Reader, Program, FieldType, Symbols));
+                }
+                return Program.getRecordTable().pack(RecordData.data(), RecordData.size());
+            }
+            default:
+                throw std::logic_error("Deserialization for datalog type " + AttrType
+                                       + " not defined");
+        }
+    }
+
+    std::string readFile(const std::string &Path)
+    {
+        std::ifstream File(Path, std::ios::in | std::ios::binary);
+        if(!File)
+        {
+            throw std::runtime_error("could not open " + Path);
+        }
+        std::stringstream Buffer;
+        Buffer << File.rdbuf();
+        return Buffer.str();
+    }
+} // namespace
+
+bool DatalogIO::matchesGlob(const std::string &Pattern, const std::string &Name)
+{
+    // Backtrack to the last `*' on a mismatch.
+    size_t P = 0, N = 0;
+    size_t Star = std::string::npos, StarMatch = 0;
+    while(N < Name.size())
+    {
+        if(P < Pattern.size() && (Pattern[P] == '?' || Pattern[P] == Name[N]))
+        {
+            P++;
+            N++;
+        }
+        else if(P < Pattern.size() && Pattern[P] == '*')
+        {
+            Star = P++;
+            StarMatch = N;
+        }
+        else if(Star != std::string::npos)
+        {
+            P = Star + 1;
+            N = ++StarMatch;
+        }
+        else
+        {
+            return false;
+        }
+    }
+    while(P < Pattern.size() && Pattern[P] == '*')
+    {
+        P++;
+    }
+    return P == Pattern.size();
+}
+
+uint32_t DatalogIO::SymbolIndex::index(souffle::SouffleProgram &Program,
+                                       souffle::RamDomain Symbol)
+{
+    auto [It, Inserted] = Indices.try_emplace(Symbol, static_cast<uint32_t>(Symbols.size()));
+    if(Inserted)
+    {
+        Symbols.push_back(Program.getSymbolTable().unsafeDecode(Symbol));
+    }
+    return It->second;
+}
 
 /**
 Create a record from a string and return the record ID.
@@ -248,24 +474,13 @@ void DatalogIO::serializeAttribute(std::ostream &Stream, souffle::SouffleProgram
 void DatalogIO::serializeRecord(std::ostream &Stream, souffle::SouffleProgram &Program,
                                 const std::string &AttrType, souffle::RamDomain RecordId)
 {
-    // There is no way to look up record type information from the Datalog. We
-    // have to keep a map of definitions here.
-    static const std::map<std::string, std::list<std::string>> RecordTypeMap = {
-        {"r:stack_var", {"s:register", "i:number"}},
-    };
-
-    auto It = RecordTypeMap.find(AttrType);
-    if(It == RecordTypeMap.end())
-    {
-        throw std::logic_error("Serialization for datalog record type " + AttrType
-                               + " not defined");
-    }
+    const std::list<std::string> &FieldTypes = getRecordFieldTypes(AttrType);
 
-    const souffle::RamDomain *Record = Program.getRecordTable().unpack(RecordId, It->second.size());
+    const souffle::RamDomain *Record = Program.getRecordTable().unpack(RecordId, FieldTypes.size());
 
     Stream << "[";
     unsigned int I = 0;
-    for(const std::string &RecordAttr : It->second)
+    for(const std::string &RecordAttr : FieldTypes)
     {
         if(I > 0)
         {
@@ -306,43 +521,190 @@ void DatalogIO::writeRelation(std::ostream &Stream, souffle::SouffleProgram &Pro
     }
 }
 
+void DatalogIO::writeRelationBinary(std::ostream &Stream, souffle::SouffleProgram &Program,
+                                    const souffle::Relation *Relation, SymbolIndex &Symbols)
+{
+    size_t Arity = Relation->getArity();
+    std::vector<std::string> Columns(Arity);
+    uint64_t Count = 0;
+    for(souffle::tuple Tuple : *Relation)
+    {
+        for(size_t I = 0; I < Arity; I++)
+        {
+            encodeAttribute(Columns[I], Program, Relation->getAttrType(I), Tuple[I], Symbols);
+        }
+        Count++;
+    }
+
+    std::string Header(BinaryRelationMagic);
+    appendLE(Header, Arity, 4);
+    appendLE(Header, Count, 8);
+    Stream << Header;
+    for(const std::string &Column : Columns)
+    {
+        Stream << Column;
+    }
+}
+
+bool DatalogIO::readRelationBinary(const std::string &Data, souffle::SouffleProgram &Program,
+                                   souffle::Relation *Relation,
+                                   const std::vector<std::string> &Symbols)
+{
+    BinaryReader Reader(Data);
+    if(!Reader.readMagic(BinaryRelationMagic))
+    {
+        std::cerr << "Relation " << Relation->getName() << " is not in the binary format"
+                  << std::endl;
+        return false;
+    }
+
+    size_t Arity = Relation->getArity();
+    std::vector<std::vector<souffle::RamDomain>> Columns(Arity);
+    uint64_t Count;
+    try
+    {
+        if(Reader.read(4) != Arity)
+        {
+            std::cerr << "Relation " << Relation->getName() << " has a different arity"
+                      << std::endl;
+            return false;
+        }
+        Count = Reader.read(8);
+        for(size_t I = 0; I < Arity; I++)
+        {
+            const std::string AttrType = Relation->getAttrType(I);
+            Columns[I].reserve(Count);
+            for(uint64_t J = 0; J < Count; J++)
+            {
+                Columns[I].push_back(decodeAttribute(Reader, Program, AttrType, Symbols));
+            }
+        }
+    }
+    catch(std::out_of_range &e)
+    {
+        std::cerr << "Failed to read relation " << Relation->getName() << ": " << e.what()
+                  << std::endl;
+        return false;
+    }
+
+    for(uint64_t J = 0; J < Count; J++)
+    {
+        souffle::tuple T(Relation);
+        for(size_t I = 0; I < Arity; I++)
+        {
+            T[I] = Columns[I][J];
+        }
+        Relation->insert(T);
+    }
+    return true;
+}
+
+bool DatalogIO::isBinaryRelation(const std::string &Data)
+{
+    // Text relations cannot start with a NUL character.
+    return Data.compare(0, BinaryRelationMagic.size(), BinaryRelationMagic) == 0;
+}
+
+void DatalogIO::writeSymbols(std::ostream &Stream, const std::vector<std::string> &Symbols)
+{
+    std::string Buffer(BinarySymbolsMagic);
+    appendLE(Buffer, Symbols.size(), 8);
+    for(const std::string &Symbol : Symbols)
+    {
+        appendLE(Buffer, Symbol.size(), 4);
+        Buffer += Symbol;
+    }
+    Stream << Buffer;
+}
+
+std::vector<std::string> DatalogIO::readSymbols(const std::string &Data)
+{
+    BinaryReader Reader(Data);
+    if(!Reader.readMagic(BinarySymbolsMagic))
+    {
+        throw std::invalid_argument("Symbol table is not in the binary format");
+    }
+    std::vector<std::string> Symbols(Reader.read(8));
+    for(std::string &Symbol : Symbols)
+    {
+        Symbol = Reader.readString(Reader.read(4));
+    }
+    return Symbols;
+}
+
 void DatalogIO::writeRelations(const std::string &Directory, const std::string &FileExtension,
                                souffle::SouffleProgram &Program,
-                               const std::vector<souffle::Relation *> &Relations)
+                               const std::vector<souffle::Relation *> &Relations,
+                               SymbolIndex *Symbols)
 {
     std::ios_base::openmode FileMask = std::ios::out;
+    if(Symbols)
+    {
+        FileMask |= std::ios::binary;
+    }
     for(souffle::Relation *Relation : Relations)
     {
-        std::ofstream File(Directory + Relation->getName() + FileExtension, FileMask);
-        writeRelation(File, Program, Relation);
-        File.close();
+        if(Symbols)
+        {
+            std::ofstream File(Directory + Relation->getName() + FileExtension + ".bin",
+                               FileMask);
+            writeRelationBinary(File, Program, Relation, *Symbols);
+        }
+        else
+        {
+            std::ofstream File(Directory + Relation->getName() + FileExtension, FileMask);
+            writeRelation(File, Program, Relation);
+        }
     }
 }
 
-void DatalogIO::writeFacts(const std::string &Directory, souffle::SouffleProgram &Program)
+void DatalogIO::writeFacts(const std::string &Directory, souffle::SouffleProgram &Program,
+                           SymbolIndex *Symbols)
 {
-    writeRelations(Directory, ".facts", Program, Program.getInputRelations());
+    writeRelations(Directory, ".facts", Program, Program.getInputRelations(), Symbols);
 }
 
-void DatalogIO::writeRelations(const std::string &Directory, souffle::SouffleProgram &Program)
+void DatalogIO::writeRelations(const std::string &Directory, souffle::SouffleProgram &Program,
+                               SymbolIndex *Symbols)
 {
     std::string FileExtension = ".csv";
-    writeRelations(Directory, FileExtension, Program, Program.getInternalRelations());
-    writeRelations(Directory, FileExtension, Program, Program.getOutputRelations());
+    writeRelations(Directory, FileExtension, Program, Program.getInternalRelations(), Symbols);
+    writeRelations(Directory, FileExtension, Program, Program.getOutputRelations(), Symbols);
+}
+
+void DatalogIO::writeSymbols(const std::string &Directory, const SymbolIndex &Symbols)
+{
+    std::ofstream File(Directory + "symbols.bin", std::ios::out | std::ios::binary);
+    writeSymbols(File, Symbols.symbols());
 }
 
-void DatalogIO::readRelations(souffle::SouffleProgram &Program, const std::string &Directory)
+void DatalogIO::readRelations(souffle::SouffleProgram &Program, const std::string &Directory,
+                              bool Binary)
 {
+    std::vector<std::string> Symbols;
+    if(Binary)
+    {
+        Symbols = readSymbols(readFile(Directory + "/symbols.bin"));
+    }
+
     // Load output relations into synthesized SouffleProgram.
     for(souffle::Relation *Relation : Program.getOutputRelations())
     {
-        const std::string Path = Directory + "/" + Relation->getName() + ".csv";
-        std::ifstream CSV(Path);
+        const std::string Path =
+            Directory + "/" + Relation->getName() + (Binary ? ".csv.bin" : ".csv");
+        std::ifstream CSV(Path, Binary ? std::ios::in | std::ios::binary : std::ios::in);
         if(!CSV)
         {
             std::cerr << "Error: missing output relation `" << Path << "'\n";
             continue;
         }
+        if(Binary)
+        {
+            std::stringstream Data;
+            Data << CSV.rdbuf();
+            readRelationBinary(Data.str(), Program, Relation, Symbols);
+            continue;
+        }
         std::string Line;
         while(std::getline(CSV, Line))
         {
@@ -351,6 +713,32 @@ void DatalogIO::readRelations(souffle::SouffleProgram &Program, const std::strin
     }
 }
 
+void DatalogIO::readRelations(souffle::SouffleProgram &Program, const RelationMap &Relations,
+                              const std::string &Namespace,
+                              const std::vector<std::string> &Symbols)
+{
+    for(souffle::Relation *Relation : Program.getAllRelations())
+    {
+        auto It = Relations.find(Namespace + "." + Relation->getName());
+        if(It == Relations.end())
+        {
+            continue;
+        }
+        const std::string &Data = std::get<1>(It->second);
+        if(isBinaryRelation(Data))
+        {
+            readRelationBinary(Data, Program, Relation, Symbols);
+            continue;
+        }
+        std::stringstream Stream(Data);
+        std::string Line;
+        while(std::getline(Stream, Line))
+        {
+            DatalogIO::insertTuple(Line, Program, Relation);
+        }
+    }
+}
+
 void DatalogIO::setProfilePath(const std::string &ProfilePath)
 {
 #if defined(DDISASM_SOUFFLE_PROFILING)
@@ -26,13 +26,80 @@
 #include <souffle/CompiledSouffle.h>
 #include <souffle/SouffleInterface.h>
 
+#include <map>
 #include <memory>
 #include <sstream>
 #include <string>
 #include <tuple>
+#include <unordered_map>
+#include <vector>
 
 namespace DatalogIO
 {
+    /**
+    Relations by name, with their type signature and their tuples in the text or
+    binary format, as stored in the souffleFacts and souffleOutputs AuxData.
+    */
+    using RelationMap = std::map<std::string, std::tuple<std::string, std::string>>;
+
+    /**
+    Symbol table of relations written in the binary format.
+
+    Symbols are numbered in the order they are first written, so that one table
+    can be shared by all relations of a program.
+    */
+    class SymbolIndex
+    {
+    public:
+        uint32_t index(souffle::SouffleProgram& Program, souffle::RamDomain Symbol);
+
+        const std::vector<std::string>& symbols() const
+        {
+            return Symbols;
+        }
+
+    private:
+        std::unordered_map<souffle::RamDomain, uint32_t> Indices;
+        std::vector<std::string> Symbols;
+    };
+
+    /**
+    Stream buffer that appends to a string, to write relations directly into
+    AuxData without an intermediate copy.
+    */
+    class StringAppendBuffer : public std::streambuf
+    {
+    public:
+        explicit StringAppendBuffer(std::string& Output) : Output(Output)
+        {
+        }
+
+    protected:
+        int_type overflow(int_type C) override
+        {
+            if(!traits_type::eq_int_type(C, traits_type::eof()))
+            {
+                Output.push_back(traits_type::to_char_type(C));
+            }
+            return traits_type::not_eof(C);
+        }
+
+        std::streamsize xsputn(const char* S, std::streamsize N) override
+        {
+            Output.append(S, static_cast<size_t>(N));
+            return N;
+        }
+
+    private:
+        std::string& Output;
+    };
+
+    /**
+    Check whether a relation name matches a glob pattern, where `*' matches any
+    sequence of characters and `?' matches any single character.
+    */
+    bool matchesGlob(const std::string& Pattern, const std::string& Name);
+
     void serializeRecord(std::ostream& Stream, souffle::SouffleProgram& Program,
                          const std::string& AttrType, souffle::RamDomain RecordId);
     void serializeAttribute(std::ostream& Stream, souffle::SouffleProgram& Program,
@@ -48,14 +115,65 @@ namespace DatalogIO
     void writeRelation(std::ostream& Stream, souffle::SouffleProgram& Program,
                        const souffle::Relation* Relation);
 
+    /**
+    Write the tuples of a relation in the binary format: a header followed by one
+    column of little-endian values per attribute. Numbers take 8 bytes, symbols
+    are 4-byte indices in Symbols, and records are the concatenation of their
+    fields.
+    */
+    void writeRelationBinary(std::ostream& Stream, souffle::SouffleProgram& Program,
+                             const souffle::Relation* Relation, SymbolIndex& Symbols);
+
+    /**
+    Insert the tuples of a relation written by writeRelationBinary.
+    */
+    bool readRelationBinary(const std::string& Data, souffle::SouffleProgram& Program,
+                            souffle::Relation* Relation, const std::vector<std::string>& Symbols);
+
+    /**
+    Check whether relation data is in the binary format rather than text.
+    */
+    bool isBinaryRelation(const std::string& Data);
+
+    void writeSymbols(std::ostream& Stream, const std::vector<std::string>& Symbols);
+    std::vector<std::string> readSymbols(const std::string& Data);
+
+    /**
+    Write relations to Directory, one file per relation. If Symbols is given,
+    relations are written in the binary format, with ".bin" appended to
+    FileExtension.
+    */
     void writeRelations(const std::string& Directory, const std::string& FileExtension,
                         souffle::SouffleProgram& Program,
-                        const std::vector<souffle::Relation*>& Relations);
+                        const std::vector<souffle::Relation*>& Relations,
+                        SymbolIndex* Symbols = nullptr);
+
+    void writeFacts(const std::string& Direcory, souffle::SouffleProgram& Program,
+                    SymbolIndex* Symbols = nullptr);
+    void writeRelations(const std::string& Directory, souffle::SouffleProgram& Program,
+                        SymbolIndex* Symbols = nullptr);
+
+    /**
+    Write the symbol table of the relations written in the binary format to
+    Directory, as "symbols.bin".
+    */
+    void writeSymbols(const std::string& Directory, const SymbolIndex& Symbols);
 
-    void writeFacts(const std::string& Direcory, souffle::SouffleProgram& Program);
-    void writeRelations(const std::string& Directory, souffle::SouffleProgram& Program);
+    /**
+    Load the output relations written to Directory, in the binary format if
+    Binary is set.
+    */
+    void readRelations(souffle::SouffleProgram& Program, const std::string& Directory,
+                       bool Binary = false);
 
-    void readRelations(souffle::SouffleProgram& Program, const std::string& Directory);
+    /**
+    Load the relations of the program stored under Namespace in a souffleFacts
+    or souffleOutputs AuxData table, in either format. Symbols is the symbol
+    table of the namespace for relations in the binary format.
+    */
+    void readRelations(souffle::SouffleProgram& Program, const RelationMap& Relations,
+                       const std::string& Namespace,
+                       const std::vector<std::string>& Symbols = {});
 
     void setProfilePath(const std::string& ProfilePath);
     std::string clearProfileDB();
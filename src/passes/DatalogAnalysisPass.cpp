@@ -33,9 +33,21 @@ namespace fs = boost::filesystem;
 
 AnalysisPassResult DatalogAnalysisPass::analyze(const gtirb::Module& Module)
 {
+    // The interpreter reads the facts from the debug directory, so they must be
+    // in the text format.
+    DatalogIO::SymbolIndex Symbols;
+    DatalogIO::SymbolIndex* DebugSymbols =
+        BinaryRelations && ExecutionMode != DatalogExecutionMode::INTERPRETED ? &Symbols
+                                                                               : nullptr;
+
     if(!DebugDirRoot.empty())
     {
-        DatalogIO::writeFacts(getDebugDir(Module) + "/", *Program);
+        // The interpreter also needs the facts that are not selected.
+        DatalogIO::writeRelations(getDebugDir(Module) + "/", ".facts", *Program,
+                                  ExecutionMode == DatalogExecutionMode::INTERPRETED
+                                      ? Program->getInputRelations()
+                                      : selectRelations(Program->getInputRelations()),
+                                  DebugSymbols);
     }
 
     if(ExecutionMode == DatalogExecutionMode::SYNTHESIZED)
@@ -47,7 +59,15 @@ AnalysisPassResult DatalogAnalysisPass::analyze(const gtirb::Module& Module)
 
     if(!DebugDirRoot.empty())
     {
-        DatalogIO::writeRelations(getDebugDir(Module) + "/", *Program);
+        std::string Directory = getDebugDir(Module) + "/";
+        DatalogIO::writeRelations(Directory, ".csv", *Program,
+                                  selectRelations(Program->getInternalRelations()), DebugSymbols);
+        DatalogIO::writeRelations(Directory, ".csv", *Program,
+                                  selectRelations(Program->getOutputRelations()), DebugSymbols);
+        if(DebugSymbols)
+        {
+            DatalogIO::writeSymbols(Directory, *DebugSymbols);
+        }
     }
 
     if(ExecutionMode == DatalogExecutionMode::SYNTHESIZED)
@@ -75,7 +95,7 @@ void DatalogAnalysisPass::analyzeImpl(AnalysisPassResult& Result, const gtirb::M
     {
         // Disassemble with the compiled, synthesized program.
         Program->setNumThreads(ThreadCount);
-        bool pruneImdtRels = !WriteSouffleOutputs && DebugDirRoot.empty();
+        bool pruneImdtRels = !keepsInternalRelations();
         try
         {
             Program->runAll("", "", false, pruneImdtRels);
@@ -87,10 +107,53 @@ void DatalogAnalysisPass::analyzeImpl(AnalysisPassResult& Result, const gtirb::M
     }
 }
 
+std::vector<souffle::Relation*> DatalogAnalysisPass::selectRelations(
+    const std::vector<souffle::Relation*>& Relations) const
+{
+    if(RelationPatterns.empty())
+    {
+        return Relations;
+    }
+    std::vector<souffle::Relation*> Selected;
+    const std::string Namespace = getNameSlug();
+    for(souffle::Relation* Relation : Relations)
+    {
+        const std::string Name = Namespace + "." + Relation->getName();
+        for(const std::string& Pattern : RelationPatterns)
+        {
+            if(DatalogIO::matchesGlob(Pattern, Name))
+            {
+                Selected.push_back(Relation);
+                break;
+            }
+        }
+    }
+    return Selected;
+}
+
+bool DatalogAnalysisPass::keepsInternalRelations() const
+{
+    if(!WriteSouffleOutputs && DebugDirRoot.empty())
+    {
+        return false;
+    }
+    return !selectRelations(Program->getInternalRelations()).empty();
+}
+
+template <typename Schema>
+static typename Schema::Type& getOrAddAuxData(gtirb::Module& Module)
+{
+    if(!Module.getAuxData<Schema>())
+    {
+        Module.addAuxData<Schema>({});
+    }
+    return *Module.getAuxData<Schema>();
+}
+
 void addRelationsToMap(souffle::SouffleProgram& Program,
                        const std::vector<souffle::Relation*>& Relations,
-                       std::map<std::string, std::tuple<std::string, std::string>>& Map,
-                       const std::string& Namespace)
+                       DatalogIO::RelationMap& Map, const std::string& Namespace,
+                       DatalogIO::SymbolIndex* Symbols)
 {
     for(souffle::Relation* Relation : Relations)
     {
@@ -102,27 +165,45 @@ void addRelationsToMap(souffle::SouffleProgram& Program,
         std::stringstream Type;
         DatalogIO::serializeType(Type, Relation);
 
-        // Write CSV to buffer.
-        std::stringstream Csv;
-        DatalogIO::writeRelation(Csv, Program, Relation);
+        // Write CSV, or the binary format, directly into the AuxData entry.
+        auto& Entry = Map[Namespace + "." + Relation->getName()];
+        Entry = {Type.str(), ""};
+        DatalogIO::StringAppendBuffer Buffer(std::get<1>(Entry));
+        std::ostream Data(&Buffer);
+        if(Symbols)
+        {
+            DatalogIO::writeRelationBinary(Data, Program, Relation, *Symbols);
+        }
+        else
+        {
+            DatalogIO::writeRelation(Data, Program, Relation);
+        }
 
         // TODO: Compress CSV.
-        Map[Namespace + "." + Relation->getName()] = {Type.str(), Csv.str()};
     }
 }
 
 void writeRelationAuxdata(souffle::SouffleProgram& Program, gtirb::Module& Module,
-                          const std::string& Namespace)
+                          const std::string& Namespace,
+                          const std::vector<souffle::Relation*>& FactRelations,
+                          const std::vector<souffle::Relation*>& OutputRelations, bool Binary)
 {
-    auto Facts = aux_data::util::getOrDefault<gtirb::schema::SouffleFacts>(Module);
-    auto Outputs = aux_data::util::getOrDefault<gtirb::schema::SouffleOutputs>(Module);
+    // Update the AuxData tables in place rather than copying the relations of
+    // the previous passes.
+    auto& Facts = getOrAddAuxData<gtirb::schema::SouffleFacts>(Module);
+    auto& Outputs = getOrAddAuxData<gtirb::schema::SouffleOutputs>(Module);
+
+    // Facts and outputs of the program share one symbol table.
+    DatalogIO::SymbolIndex Symbols;
+    DatalogIO::SymbolIndex* BinarySymbols = Binary ? &Symbols : nullptr;
 
-    addRelationsToMap(Program, Program.getInputRelations(), Facts, Namespace);
-    addRelationsToMap(Program, Program.getInternalRelations(), Outputs, Namespace);
-    addRelationsToMap(Program, Program.getOutputRelations(), Outputs, Namespace);
+    addRelationsToMap(Program, FactRelations, Facts, Namespace, BinarySymbols);
+    addRelationsToMap(Program, OutputRelations, Outputs, Namespace, BinarySymbols);
 
-    Module.addAuxData<gtirb::schema::SouffleFacts>(std::move(Facts));
-    Module.addAuxData<gtirb::schema::SouffleOutputs>(std::move(Outputs));
+    if(Binary)
+    {
+        getOrAddAuxData<gtirb::schema::SouffleSymbols>(Module)[Namespace] = Symbols.symbols();
+    }
 }
 
 void DatalogAnalysisPass::transformImpl(AnalysisPassResult& Result, gtirb::Context& Context,
@@ -130,8 +211,31 @@ void DatalogAnalysisPass::transformImpl(AnalysisPassResult& Result, gtirb::Conte
 {
     if(WriteSouffleOutputs)
     {
-        writeRelationAuxdata(*Program, Module, getNameSlug());
+        std::vector<souffle::Relation*> Outputs = selectRelations(Program->getInternalRelations());
+        for(souffle::Relation* Relation : selectRelations(Program->getOutputRelations()))
+        {
+            Outputs.push_back(Relation);
+        }
+        writeRelationAuxdata(*Program, Module, getNameSlug(),
+                             selectRelations(Program->getInputRelations()), Outputs,
+                             BinaryRelations);
+    }
+}
+
+std::map<std::string, size_t> DatalogAnalysisPass::getRelationSizes() const
+{
+    std::map<std::string, size_t> Sizes;
+    if(Program)
+    {
+        for(souffle::Relation* Relation : Program->getAllRelations())
+        {
+            if(size_t Size = Relation->size())
+            {
+                Sizes[Relation->getName()] = Size;
+            }
+        }
     }
+    return Sizes;
 }
 
 void DatalogAnalysisPass::clear()
@@ -29,6 +29,7 @@
 #include <list>
 #include <optional>
 #include <string>
+#include <vector>
 
 #include "../gtirb-decoder/DatalogIO.h"
 #include "AnalysisPass.h"
@@ -63,6 +64,20 @@ public:
     {
         WriteSouffleOutputs = Enable;
     }
+    void enableBinaryRelations(bool Enable = true)
+    {
+        BinaryRelations = Enable;
+    }
+
+    /**
+    Only write the relations whose name, namespaced with the name of the pass
+    (e.g. `disassembly.block_points'), matches one of the glob Patterns to the
+    souffleFacts and souffleOutputs AuxData and to the debug directory.
+    */
+    void setRelationFilter(const std::vector<std::string>& Patterns)
+    {
+        RelationPatterns = Patterns;
+    }
     void readHints(const std::string& Filename);
 
     souffle::SouffleProgram& getProgram()
@@ -70,6 +85,11 @@ public:
         return *Program;
     };
 
+    /**
+    Get the number of tuples in each non-empty relation of the program.
+    */
+    std::map<std::string, size_t> getRelationSizes() const;
+
     virtual bool hasLoad(void) override
     {
         return true;
@@ -85,6 +105,17 @@ protected:
     */
     virtual std::string getSourceFilename() const = 0;
 
+    /**
+    Select the relations that match the relation filter, if any.
+    */
+    std::vector<souffle::Relation*> selectRelations(
+        const std::vector<souffle::Relation*>& Relations) const;
+
+    /**
+    Check whether intermediate relations must be kept to be written out.
+    */
+    bool keepsInternalRelations() const;
+
     std::string InterpreterPath;
     std::string LibDir;
     std::string ProfilePath;
@@ -93,6 +124,8 @@ protected:
 
     std::unique_ptr<souffle::SouffleProgram> Program;
     bool WriteSouffleOutputs = false;
+    bool BinaryRelations = false;
+    std::vector<std::string> RelationPatterns;
 };
 
 #endif /* _DATALOG_ANALYSIS_PASS_H_ */
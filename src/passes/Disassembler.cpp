@@ -28,6 +28,7 @@
 
 #include "../AuxDataSchema.h"
 #include "../gtirb-decoder/Relations.h"
+#include "Tracing.h"
 
 using ImmOp = relations::ImmOp;
 using IndirectOp = relations::IndirectOp;
@@ -1517,29 +1518,36 @@ void buildArchInfo(gtirb::Module &Module, souffle::SouffleProgram &Program)
 void disassembleModule(gtirb::Context &Context, gtirb::Module &Module,
                        souffle::SouffleProgram &Program, bool SelfDiagnose)
 {
-    removeSectionSymbols(Context, Module);
-    removeEntryPoint(Module);
-    buildInferredSymbols(Context, Module, Program);
-    buildSymbolForwarding(Context, Module, Program);
-    buildCodeBlocks(Context, Module, Program);
-    buildDataBlocks(Context, Module, Program);
-    buildCodeSymbolicInformation(Module, Program);
-    buildCfiDirectives(Module, Program);
-    buildSehTable(Module, Program);
-    expandSymbolForwarding(Module, Program);
-    buildFunctions(Module, Program);
+    const std::string ModuleName = Module.getName();
+    // Run one step of the GTIRB construction inside a trace span.
+    auto Step = [&ModuleName](const char *Name, auto &&F) {
+        TraceSpan Span(Name, "disassembleModule", ModuleName);
+        F();
+    };
+
+    Step("removeSectionSymbols", [&] { removeSectionSymbols(Context, Module); });
+    Step("removeEntryPoint", [&] { removeEntryPoint(Module); });
+    Step("buildInferredSymbols", [&] { buildInferredSymbols(Context, Module, Program); });
+    Step("buildSymbolForwarding", [&] { buildSymbolForwarding(Context, Module, Program); });
+    Step("buildCodeBlocks", [&] { buildCodeBlocks(Context, Module, Program); });
+    Step("buildDataBlocks", [&] { buildDataBlocks(Context, Module, Program); });
+    Step("buildCodeSymbolicInformation", [&] { buildCodeSymbolicInformation(Module, Program); });
+    Step("buildCfiDirectives", [&] { buildCfiDirectives(Module, Program); });
+    Step("buildSehTable", [&] { buildSehTable(Module, Program); });
+    Step("expandSymbolForwarding", [&] { expandSymbolForwarding(Module, Program); });
+    Step("buildFunctions", [&] { buildFunctions(Module, Program); });
     // This should be done after creating all the symbols.
-    connectSymbolsToBlocks(Context, Module, Program);
+    Step("connectSymbolsToBlocks", [&] { connectSymbolsToBlocks(Context, Module, Program); });
     // These functions should not create additional symbols.
-    buildCFG(Context, Module, Program);
-    buildPadding(Module, Program);
-    buildComments(Module, Program, SelfDiagnose);
-    updateEntryPoint(Module, Program);
-    removeSymbolVersionsFromNames(Module);
-    buildArchInfo(Module, Program);
+    Step("buildCFG", [&] { buildCFG(Context, Module, Program); });
+    Step("buildPadding", [&] { buildPadding(Module, Program); });
+    Step("buildComments", [&] { buildComments(Module, Program, SelfDiagnose); });
+    Step("updateEntryPoint", [&] { updateEntryPoint(Module, Program); });
+    Step("removeSymbolVersionsFromNames", [&] { removeSymbolVersionsFromNames(Module); });
+    Step("buildArchInfo", [&] { buildArchInfo(Module, Program); });
     if(Module.getISA() == gtirb::ISA::ARM)
     {
-        shiftThumbBlocks(Module);
+        Step("shiftThumbBlocks", [&] { shiftThumbBlocks(Module); });
     }
 }
 
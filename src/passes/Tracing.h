@@ -0,0 +1,143 @@
+//===- Tracing.h -------------------------------------------------*- C++ -*-===//
+//
+//  Copyright (C) 2023 GrammaTech, Inc.
+//
+//  This code is licensed under the GNU Affero General Public License
+//  as published by the Free Software Foundation, either version 3 of
+//  the License, or (at your option) any later version. See the
+//  LICENSE.txt file in the project root for license terms or visit
+//  https://www.gnu.org/licenses/agpl.txt.
+//
+//  This program is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU Affero General Public License for more details.
+//
+//  This project is sponsored by the Office of Naval Research, One Liberty
+//  Center, 875 N. Randolph Street, Arlington, VA 22203 under contract #
+//  N68335-17-C-0700.  The content of the information does not necessarily
+//  reflect the position or policy of the Government and no official
+//  endorsement should be inferred.
+//
+//===----------------------------------------------------------------------===//
+#ifndef _TRACING_H_
+#define _TRACING_H_
+
+#include <atomic>
+#include <chrono>
+#include <map>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+/**
+A timed span of work, in the sense of a Chrome Trace Event "complete" event.
+*/
+struct TraceEvent
+{
+    using Clock = std::chrono::steady_clock;
+
+    std::string Name;
+    std::string Category;
+    std::string Module;
+    Clock::time_point Start;
+    Clock::time_point End;
+    size_t ThreadId;
+};
+
+/**
+Process-wide collector of trace events.
+
+Recording is disabled by default; TraceSpans are then nearly free. Events may
+be recorded from any thread.
+*/
+class TraceRecorder
+{
+public:
+    using Clock = TraceEvent::Clock;
+
+    static TraceRecorder& instance()
+    {
+        static TraceRecorder Recorder;
+        return Recorder;
+    }
+
+    void enable()
+    {
+        Origin = Clock::now();
+        Enabled = true;
+    }
+
+    bool isEnabled() const
+    {
+        return Enabled;
+    }
+
+    Clock::time_point getOrigin() const
+    {
+        return Origin;
+    }
+
+    void record(const std::string& Name, const std::string& Category, const std::string& Module,
+                Clock::time_point Start, Clock::time_point End)
+    {
+        std::lock_guard<std::mutex> Lock(Mutex);
+        // Number threads in order of appearance to keep trace ids small.
+        auto [It, Inserted] = ThreadIds.try_emplace(std::this_thread::get_id(), ThreadIds.size());
+        Events.push_back({Name, Category, Module, Start, End, It->second});
+    }
+
+    std::vector<TraceEvent> getEvents()
+    {
+        std::lock_guard<std::mutex> Lock(Mutex);
+        return Events;
+    }
+
+private:
+    TraceRecorder() = default;
+
+    std::atomic<bool> Enabled{false};
+    Clock::time_point Origin;
+    std::mutex Mutex;
+    std::vector<TraceEvent> Events;
+    std::map<std::thread::id, size_t> ThreadIds;
+};
+
+/**
+Record the lifetime of a TraceSpan as a trace event if tracing is enabled.
+*/
+class TraceSpan
+{
+public:
+    TraceSpan(const char* Name, const char* Category, const std::string& Module)
+        : Name(Name), Category(Category), Module(Module)
+    {
+        if(TraceRecorder::instance().isEnabled())
+        {
+            Enabled = true;
+            Start = TraceRecorder::Clock::now();
+        }
+    }
+
+    ~TraceSpan()
+    {
+        if(Enabled)
+        {
+            TraceRecorder::instance().record(Name, Category, Module, Start,
+                                             TraceRecorder::Clock::now());
+        }
+    }
+
+    TraceSpan(const TraceSpan&) = delete;
+    TraceSpan& operator=(const TraceSpan&) = delete;
+
+private:
+    const char* Name;
+    const char* Category;
+    std::string Module;
+    bool Enabled = false;
+    TraceRecorder::Clock::time_point Start;
+};
+
+#endif /* _TRACING_H_ */
@@ -72,3 +72,119 @@ TEST(DatalogIOTest, TestInsertTuple)
     // Confirm that the output matches the input.
     ASSERT_EQ(TupleText, OutputStream.str());
 }
+
+TEST(DatalogIOTest, TestBinaryRelation)
+{
+    auto Program = std::unique_ptr<souffle::SouffleProgram>(
+        souffle::ProgramFactory::newInstance("souffle_disasm_arm64"));
+
+    souffle::Relation *Relation = Program->getRelation("stack_def_use.def_used");
+    std::string TupleText("0x778\t[SP, 16]\t0x7ac\t[SP, 16]\t1\n"
+                          "0x7b0\t[X29, -8]\t0x7c4\t[X29, -8]\t2\n");
+    std::stringstream Input(TupleText);
+    std::string Line;
+    while(std::getline(Input, Line))
+    {
+        DatalogIO::insertTuple(Line, *Program, Relation);
+    }
+
+    DatalogIO::SymbolIndex Symbols;
+    std::stringstream Binary;
+    DatalogIO::writeRelationBinary(Binary, *Program, Relation, Symbols);
+    ASSERT_TRUE(DatalogIO::isBinaryRelation(Binary.str()));
+    ASSERT_FALSE(DatalogIO::isBinaryRelation(TupleText));
+
+    // Symbols are stored once.
+    ASSERT_EQ(Symbols.symbols(), std::vector<std::string>({"SP", "X29"}));
+
+    // Header, then two tuples of three 8-byte numbers and two records of a
+    // 4-byte symbol index and an 8-byte number.
+    ASSERT_EQ(Binary.str().size(), 17 + 2 * (3 * 8 + 2 * 12));
+
+    // Round-trip the symbol table.
+    std::stringstream SymbolStream;
+    DatalogIO::writeSymbols(SymbolStream, Symbols.symbols());
+    std::vector<std::string> SymbolTable = DatalogIO::readSymbols(SymbolStream.str());
+    ASSERT_EQ(SymbolTable, Symbols.symbols());
+
+    // Read the relation into a new program.
+    auto Copy = std::unique_ptr<souffle::SouffleProgram>(
+        souffle::ProgramFactory::newInstance("souffle_disasm_arm64"));
+    souffle::Relation *CopyRelation = Copy->getRelation("stack_def_use.def_used");
+    ASSERT_TRUE(DatalogIO::readRelationBinary(Binary.str(), *Copy, CopyRelation, SymbolTable));
+    ASSERT_EQ(CopyRelation->size(), 2);
+
+    std::stringstream OutputStream("");
+    DatalogIO::writeRelation(OutputStream, *Copy, CopyRelation);
+    ASSERT_EQ(TupleText, OutputStream.str());
+
+    // Truncated data is rejected.
+    auto Truncated = std::unique_ptr<souffle::SouffleProgram>(
+        souffle::ProgramFactory::newInstance("souffle_disasm_arm64"));
+    souffle::Relation *TruncatedRelation = Truncated->getRelation("stack_def_use.def_used");
+    std::string Data = Binary.str();
+    ASSERT_FALSE(DatalogIO::readRelationBinary(Data.substr(0, Data.size() - 1), *Truncated,
+                                               TruncatedRelation, SymbolTable));
+    ASSERT_EQ(TruncatedRelation->size(), 0);
+}
+
+TEST(DatalogIOTest, TestReadRelationMap)
+{
+    auto Program = std::unique_ptr<souffle::SouffleProgram>(
+        souffle::ProgramFactory::newInstance("souffle_disasm_arm64"));
+    souffle::Relation *Relation = Program->getRelation("stack_def_use.def_used");
+    std::string TupleText("0x778\t[SP, 16]\t0x7ac\t[SP, 16]\t1\n");
+    DatalogIO::insertTuple(TupleText, *Program, Relation);
+
+    DatalogIO::SymbolIndex Symbols;
+    std::stringstream Type;
+    DatalogIO::serializeType(Type, Relation);
+    std::stringstream Binary;
+    DatalogIO::writeRelationBinary(Binary, *Program, Relation, Symbols);
+
+    for(const std::string &Data : {TupleText, Binary.str()})
+    {
+        DatalogIO::RelationMap Relations = {
+            {"disassembly.stack_def_use.def_used", {Type.str(), Data}}};
+
+        auto Copy = std::unique_ptr<souffle::SouffleProgram>(
+            souffle::ProgramFactory::newInstance("souffle_disasm_arm64"));
+        DatalogIO::readRelations(*Copy, Relations, "disassembly", Symbols.symbols());
+
+        souffle::Relation *CopyRelation = Copy->getRelation("stack_def_use.def_used");
+        std::stringstream OutputStream("");
+        DatalogIO::writeRelation(OutputStream, *Copy, CopyRelation);
+        ASSERT_EQ(TupleText, OutputStream.str());
+    }
+}
+
+TEST(DatalogIOTest, TestMatchesGlob)
+{
+    EXPECT_TRUE(DatalogIO::matchesGlob("disassembly.block_points", "disassembly.block_points"));
+    EXPECT_FALSE(DatalogIO::matchesGlob("disassembly.block_points", "disassembly.block"));
+    EXPECT_TRUE(DatalogIO::matchesGlob("disassembly.stack_def_use.*",
+                                       "disassembly.stack_def_use.def_used"));
+    EXPECT_FALSE(
+        DatalogIO::matchesGlob("disassembly.stack_def_use.*", "disassembly.reg_def_use.def_used"));
+    EXPECT_TRUE(DatalogIO::matchesGlob("*.def_used", "disassembly.reg_def_use.def_used"));
+    EXPECT_TRUE(DatalogIO::matchesGlob("*def*use*", "disassembly.reg_def_use.def_used"));
+    EXPECT_TRUE(DatalogIO::matchesGlob("scc.?cc*", "scc.scc_id"));
+    EXPECT_TRUE(DatalogIO::matchesGlob("*", ""));
+    EXPECT_FALSE(DatalogIO::matchesGlob("?", ""));
+}
+
+TEST(DatalogIOTest, TestStringAppendBuffer)
+{
+    auto Program = std::unique_ptr<souffle::SouffleProgram>(
+        souffle::ProgramFactory::newInstance("souffle_disasm_arm64"));
+    souffle::Relation *Relation = Program->getRelation("stack_def_use.def_used");
+    std::string TupleText("0x778\t[SP, 16]\t0x7ac\t[SP, 16]\t1\n");
+    DatalogIO::insertTuple(TupleText, *Program, Relation);
+
+    // Relations are appended to the existing contents of the string.
+    std::string Output("header\n");
+    DatalogIO::StringAppendBuffer Buffer(Output);
+    std::ostream Stream(&Buffer);
+    DatalogIO::writeRelation(Stream, *Program, Relation);
+    ASSERT_EQ(Output, "header\n" + TupleText);
+}
@@ -2,6 +2,8 @@
 
 #include <fstream>
 #include <gtirb/gtirb.hpp>
+#include <thread>
+#include <vector>
 
 #include "../Functors.h"
 
@@ -19,3 +21,116 @@ TEST(Thumb32BranchOffsetTest, read_branch_offset)
     //
     EXPECT_EQ(functor_thumb32_branch_offset(0xfffef7ff), -4);
 }
+
+static gtirb::Module* createDataModule(gtirb::Context& Context, gtirb::ByteOrder ByteOrder,
+                                       const std::vector<uint8_t>& Bytes)
+{
+    gtirb::Module* Module = gtirb::Module::Create(Context, "TestModule");
+    Module->setByteOrder(ByteOrder);
+
+    gtirb::Section* S = Module->addSection(Context, ".data");
+    S->addByteInterval(Context, gtirb::Addr(0x1000), Bytes.begin(), Bytes.end(), Bytes.size(),
+                       Bytes.size());
+    S->addFlag(gtirb::SectionFlag::Loaded);
+    S->addFlag(gtirb::SectionFlag::Initialized);
+    return Module;
+}
+
+TEST(FunctorContextScopeTest, thread_context)
+{
+    gtirb::Context Context;
+    std::vector<uint8_t> Bytes = {0x12, 0x34};
+    gtirb::Module* Little = createDataModule(Context, gtirb::ByteOrder::Little, Bytes);
+    gtirb::Module* Big = createDataModule(Context, gtirb::ByteOrder::Big, Bytes);
+
+    FunctorContext.useModule(Little);
+    EXPECT_EQ(functor_data_u16(0x1000), 0x3412);
+    {
+        FunctorContextManager ThreadContext;
+        FunctorContextScope Scope(ThreadContext);
+        FunctorContextManager::current().useModule(Big);
+        EXPECT_EQ(functor_data_u16(0x1000), 0x1234);
+
+        // Other threads still use the global context.
+        uint64_t Value = 0;
+        std::thread Thread([&Value]() { Value = functor_data_u16(0x1000); });
+        Thread.join();
+        EXPECT_EQ(Value, 0x3412);
+    }
+    EXPECT_EQ(functor_data_u16(0x1000), 0x3412);
+}
+
+TEST(FunctorContextManagerTest, data_ranges)
+{
+    gtirb::Context Context;
+    gtirb::Module* Module = gtirb::Module::Create(Context, "TestModule");
+    Module->setByteOrder(gtirb::ByteOrder::Little);
+
+    // Two byte intervals, the second with an uninitialized tail.
+    std::vector<uint8_t> Bytes = {0x01, 0x02, 0x03, 0x04};
+    gtirb::Section* Data = Module->addSection(Context, ".data");
+    Data->addFlag(gtirb::SectionFlag::Loaded);
+    Data->addFlag(gtirb::SectionFlag::Initialized);
+    Data->addByteInterval(Context, gtirb::Addr(0x1000), Bytes.begin(), Bytes.end(), Bytes.size(),
+                          Bytes.size());
+    Data->addByteInterval(Context, gtirb::Addr(0x2000), Bytes.begin(), Bytes.end(), 8,
+                          Bytes.size());
+
+    // Sections that are not loaded are not readable.
+    gtirb::Section* Comment = Module->addSection(Context, ".comment");
+    Comment->addFlag(gtirb::SectionFlag::Initialized);
+    Comment->addByteInterval(Context, gtirb::Addr(0x3000), Bytes.begin(), Bytes.end(),
+                             Bytes.size(), Bytes.size());
+
+    FunctorContextManager Manager;
+    FunctorContextScope Scope(Manager);
+    Manager.useModule(Module);
+
+    EXPECT_EQ(functor_data_u32(0x1000), 0x04030201);
+    EXPECT_EQ(functor_data_u8(0x1003), 0x04);
+    EXPECT_EQ(functor_data_valid(0x1002, 2), 1);
+    EXPECT_EQ(functor_data_valid(0x1002, 4), 0);
+    EXPECT_EQ(functor_data_u16(0x1003), 0);
+    EXPECT_EQ(functor_data_valid(0xfff, 1), 0);
+
+    EXPECT_EQ(functor_data_u16(0x2002), 0x0403);
+    EXPECT_EQ(functor_data_valid(0x2004, 1), 0);
+    EXPECT_EQ(functor_data_valid(0x3000, 1), 0);
+    EXPECT_EQ(functor_data_valid(UINT64_MAX, 8), 0);
+
+    // Reading again after a cached lookup in another range.
+    EXPECT_EQ(functor_data_u8(0x1001), 0x02);
+    EXPECT_EQ(functor_data_u8(0x2001), 0x02);
+    EXPECT_EQ(Manager.getByteInterval(0x2001, 1),
+              &*Data->findByteIntervalsOn(gtirb::Addr(0x2000)).begin());
+}
+
+TEST(FunctorContextManagerTest, overlapping_ranges)
+{
+    gtirb::Context Context;
+    gtirb::Module* Module = gtirb::Module::Create(Context, "TestModule");
+    Module->setByteOrder(gtirb::ByteOrder::Little);
+
+    std::vector<uint8_t> Low = {0x11, 0x11, 0x11, 0x11, 0x11, 0x11, 0x11, 0x11};
+    std::vector<uint8_t> High = {0x22, 0x22};
+    gtirb::Section* Text = Module->addSection(Context, ".text");
+    Text->addFlag(gtirb::SectionFlag::Loaded);
+    Text->addFlag(gtirb::SectionFlag::Executable);
+    Text->addByteInterval(Context, gtirb::Addr(0x1000), Low.begin(), Low.end(), Low.size(),
+                          Low.size());
+    gtirb::Section* Data = Module->addSection(Context, ".data");
+    Data->addFlag(gtirb::SectionFlag::Loaded);
+    Data->addFlag(gtirb::SectionFlag::Initialized);
+    Data->addByteInterval(Context, gtirb::Addr(0x1004), High.begin(), High.end(), High.size(),
+                          High.size());
+
+    FunctorContextManager Manager;
+    FunctorContextScope Scope(Manager);
+    Manager.useModule(Module);
+
+    // Where ranges overlap, the range that starts first is used.
+    EXPECT_EQ(functor_data_u8(0x1004), 0x11);
+    EXPECT_EQ(functor_data_u8(0x1006), 0x11);
+    EXPECT_EQ(functor_data_u8(0x1005), 0x11);
+    EXPECT_EQ(functor_data_u32(0x1004), 0x11111111);
+}
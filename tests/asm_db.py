@@ -1,11 +1,132 @@
+import argparse
+import atexit
 import os
 import hashlib
+import json
 import platform
+import queue
+import re
+import sys
+import threading
+import zlib
 from enum import Enum
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Tables used by `upload'. They are created, and older databases extended in
+# place, by the separate `asm_db.py --create-schema' step: uploaders never
+# change the schema, so they neither need to own the tables nor take the
+# locks that ALTER TABLE holds.
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS assembly (
+        assembly_id {id},
+        checksum TEXT UNIQUE NOT NULL,
+        content TEXT NOT NULL,
+        chunked BOOLEAN NOT NULL DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS assembly_chunk (
+        checksum TEXT PRIMARY KEY,
+        compression TEXT NOT NULL,
+        data {blob} NOT NULL,
+        size INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS assembly_chunk_ref (
+        assembly_id INTEGER
+            REFERENCES assembly (assembly_id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        checksum TEXT NOT NULL REFERENCES assembly_chunk (checksum),
+        PRIMARY KEY (assembly_id, position)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS disassembled (
+        disassembled_id {id},
+        name TEXT NOT NULL,
+        assembly_id INTEGER REFERENCES assembly (assembly_id),
+        compiler TEXT,
+        compiler_args TEXT,
+        platform TEXT,
+        distro TEXT,
+        ci_job_image TEXT,
+        ci_pipeline_id TEXT,
+        ci_commit_sha TEXT,
+        ci_commit_before_sha TEXT,
+        ci_commit_branch TEXT,
+        ci_commit_ref_slug TEXT,
+        strip BOOLEAN,
+        wall_time REAL,
+        peak_rss BIGINT,
+        binary_size BIGINT,
+        instruction_count BIGINT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pass_timing (
+        disassembled_id INTEGER
+            REFERENCES disassembled (disassembled_id) ON DELETE CASCADE,
+        module TEXT,
+        pass TEXT NOT NULL,
+        phase TEXT NOT NULL,
+        wall_time REAL,
+        cpu_time REAL,
+        peak_rss_delta BIGINT
+    )
+    """,
+]
+
+# Rows are written in batches of up to this many uploads.
+BATCH_SIZE = 100
+
+# Uploads queued beyond this are dropped rather than slowing down the tests.
+MAX_PENDING = 1000
+
+# Seconds to wait for pending uploads at exit.
+FLUSH_TIMEOUT = 60
+
+# Columns added to existing tables after their creation.
+ADDED_COLUMNS = [
+    ("assembly", "chunked", "BOOLEAN NOT NULL DEFAULT FALSE"),
+    ("disassembled", "wall_time", "REAL"),
+    ("disassembled", "peak_rss", "BIGINT"),
+    ("disassembled", "binary_size", "BIGINT"),
+    ("disassembled", "instruction_count", "BIGINT"),
+]
+
+# Listings are stored in chunks that start at a line matching this: section
+# and function headers, in the syntaxes printed by ddisasm.
+CHUNK_START = re.compile(
+    r"#[-=]{5,}\s*$"
+    r"|\s*\.(section|text|data|bss)\b"
+    r"|\s*\.type\s+\S+,\s*@function"
+    r"|\S+\s+(PROC|SEGMENT)\b"
+)
+
+# Lines that may follow a chunk start line and still belong to the header.
+CHUNK_HEADER = re.compile(r"\s*(\.|#[-=]{5,}\s*$|$)")
+
+# Compression level of the chunks, if zstandard is available. Higher levels
+# are many times slower for little gain on assembly listings.
+ZSTD_LEVEL = 6
 
 
 class DB:
-    """Singleton database connection wrapper."""
+    """Singleton database connection wrapper.
+
+    DATABASE_URL is either a PostgreSQL connection URI or, for local use,
+    sqlite:///<path>.
+    """
 
     class State(Enum):
         NEW = 1
@@ -14,85 +135,536 @@ class DB:
 
     conn = None
     state = State.NEW
+    sqlite = False
 
     def __new__(cls):
         if cls.state == DB.State.NEW:
-            connect_uri = os.environ.get("DATABASE_URL")
+            cls.conn = connect()
+            cls.state = DB.State.CONNECTED if cls.conn else DB.State.ERROR
+        return cls.conn
 
-            if not connect_uri:
-                cls.state = DB.State.ERROR
-                return None
+    @classmethod
+    def query(cls, sql):
+        """Adapt a query using %s parameters to the connected database."""
+        return sql.replace("%s", "?") if cls.sqlite else sql
 
-            try:
-                psycopg2 = __import__("psycopg2")
-                cls.conn = psycopg2.connect(connect_uri)
-                cls.state = DB.State.CONNECTED
-            except ImportError as ex:
-                print("ERROR:", ex)
-                cls.state = DB.State.ERROR
-            except psycopg2.Error as ex:
-                print("ERROR:", ex)
-                cls.state = DB.State.ERROR
 
-        return cls.conn
+def connect():
+    """
+    Open a new connection to DATABASE_URL. Returns None if the database is
+    not available. The schema must have been created with `create_schema'.
 
+    Connections may only be used by the thread that opened them: the
+    singleton of DB serves the main thread.
+    """
+    connect_uri = os.environ.get("DATABASE_URL")
+    if not connect_uri:
+        return None
 
-def upload(name, asm, compilers, compiler_args, strip):
-    conn = DB()
-    if conn:
-        cursor = conn.cursor()
-
-        # Upsert assembly contents to the `assembly' table.
-        with open(asm, "r") as f:
-            contents = f.read()
-            checksum = hashlib.md5(contents.encode("utf-8")).hexdigest()
-            cursor.execute(
-                """
-                INSERT INTO assembly (checksum, content)
-                VALUES (%s, %s)
-                ON CONFLICT (checksum)
-                DO UPDATE SET updated_at = NOW()
-                RETURNING assembly_id
-            """,
-                (checksum, contents),
-            )
-            assembly_id = cursor.fetchone()[0]
+    if connect_uri.startswith("sqlite:///"):
+        import sqlite3
 
-        # Insert disassembly details into the `disassembled' table.
-        cursor.execute(
+        DB.sqlite = True
+        try:
+            return sqlite3.connect(connect_uri[len("sqlite:///") :])
+        except sqlite3.Error as ex:
+            print("ERROR:", ex)
+            return None
+
+    try:
+        psycopg2 = __import__("psycopg2")
+        return psycopg2.connect(connect_uri)
+    except ImportError as ex:
+        print("ERROR:", ex)
+    except psycopg2.Error as ex:
+        print("ERROR:", ex)
+    return None
+
+
+def create_schema(conn, sqlite):
+    """
+    Create or extend the tables used by `upload'.
+
+    On PostgreSQL this requires owning the tables, and ALTER TABLE locks
+    them even if the column exists: run it once before uploading, not from
+    every uploader.
+    """
+    cursor = conn.cursor()
+    id_type = "INTEGER PRIMARY KEY" if sqlite else "SERIAL PRIMARY KEY"
+    blob_type = "BLOB" if sqlite else "BYTEA"
+    for statement in SCHEMA:
+        cursor.execute(statement.format(id=id_type, blob=blob_type))
+    for table, column, sql_type in ADDED_COLUMNS:
+        if sqlite:
+            # SQLite has no ADD COLUMN IF NOT EXISTS.
+            cursor.execute("PRAGMA table_info({})".format(table))
+            if any(row[1] == column for row in cursor.fetchall()):
+                continue
+            statement = "ALTER TABLE {} ADD COLUMN {} {}"
+        else:
+            statement = "ALTER TABLE {} ADD COLUMN IF NOT EXISTS {} {}"
+        cursor.execute(statement.format(table, column, sql_type))
+    conn.commit()
+
+
+def split_listing(contents: str) -> List[str]:
+    """
+    Split an assembly listing into chunks that start at section and
+    function headers.
+
+    Chunk boundaries only depend on the neighboring lines, so a change in
+    one function does not change the chunks of the others.
+    """
+    chunks = []
+    current = []
+    in_header = False
+    for line in contents.splitlines(keepends=True):
+        if CHUNK_START.match(line):
+            if not in_header and current:
+                chunks.append("".join(current))
+                current = []
+            in_header = True
+        elif in_header:
+            in_header = bool(CHUNK_HEADER.match(line))
+        current.append(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def make_compressor():
+    """Create a zstd compressor to share between calls of `compress'."""
+    if zstandard is None:
+        return None
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+
+
+def compress(data: bytes, compressor=None) -> Tuple[str, bytes]:
+    """Compress a chunk, with zstd if available; return the codec too."""
+    if zstandard is not None:
+        compressor = compressor or make_compressor()
+        return "zstd", compressor.compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress(compression: str, data: bytes) -> bytes:
+    if compression == "zlib":
+        return zlib.decompress(data)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this chunk")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError("unknown compression: {}".format(compression))
+
+
+def get_assembly(assembly_id, conn=None) -> Optional[str]:
+    """Reconstruct the listing stored in an `assembly' row."""
+    conn = conn or DB()
+    cursor = conn.cursor()
+    cursor.execute(
+        DB.query(
+            "SELECT content, chunked FROM assembly WHERE assembly_id = %s"
+        ),
+        (assembly_id,),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    content, chunked = row
+    if not chunked:
+        return content
+
+    cursor.execute(
+        DB.query(
             """
-            INSERT INTO disassembled (
-                name,
-                assembly_id,
-                compiler,
-                compiler_args,
-                platform,
-                distro,
-                ci_job_image,
-                ci_pipeline_id,
-                ci_commit_sha,
-                ci_commit_before_sha,
-                ci_commit_branch,
-                ci_commit_ref_slug,
-                strip
+            SELECT c.compression, c.data
+            FROM assembly_chunk_ref r
+            JOIN assembly_chunk c ON r.checksum = c.checksum
+            WHERE r.assembly_id = %s
+            ORDER BY r.position
+        """
+        ),
+        (assembly_id,),
+    )
+    return "".join(
+        decompress(compression, bytes(data)).decode("utf-8")
+        for compression, data in cursor.fetchall()
+    )
+
+
+def load_stats(path):
+    """
+    Load the pass timings written by `ddisasm --stats-json' and count the
+    instructions found by the disassembly pass.
+    """
+    with open(path) as f:
+        stats = json.load(f)
+    timings = []
+    instruction_count = 0
+    for entry in stats["passes"]:
+        for phase in entry["phases"]:
+            timings.append(
+                (
+                    entry["module"],
+                    entry["pass"],
+                    phase["phase"],
+                    phase["wall_time"],
+                    phase["cpu_time"],
+                    phase["peak_rss_delta"],
+                )
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """,
-            (
-                name,
-                assembly_id,
-                " ".join(compilers),
-                " ".join(compiler_args),
-                platform.system(),
-                platform.platform(),
-                os.environ.get("CI_JOB_IMAGE"),
-                os.environ.get("CI_PIPELINE_ID"),
-                os.environ.get("CI_COMMIT_SHA"),
-                os.environ.get("CI_COMMIT_BEFORE_SHA"),
-                os.environ.get("CI_COMMIT_BRANCH"),
-                os.environ.get("CI_COMMIT_REF_SLUG"),
-                strip,
+        if entry["pass"] == "disassembly":
+            instruction_count += entry["relations"].get("code_in_block", 0)
+    return timings, instruction_count
+
+
+class Upload(NamedTuple):
+    """The rows written for one disassembled example."""
+
+    checksum: str
+    content: str
+    disassembled: Tuple[Any, ...]
+    pass_timings: List[Tuple[Any, ...]]
+
+
+def make_upload(
+    name,
+    asm,
+    compilers,
+    compiler_args,
+    strip,
+    wall_time=None,
+    peak_rss=None,
+    binary=None,
+    stats=None,
+):
+    """Read the files of a disassembled example into an Upload."""
+    with open(asm, "r") as f:
+        contents = f.read()
+    checksum = hashlib.md5(contents.encode("utf-8")).hexdigest()
+
+    binary_size = os.path.getsize(binary) if binary else None
+    timings, instruction_count = [], None
+    if stats and os.path.exists(stats):
+        timings, instruction_count = load_stats(stats)
+
+    disassembled = (
+        name,
+        " ".join(compilers),
+        " ".join(compiler_args),
+        platform.system(),
+        platform.platform(),
+        os.environ.get("CI_JOB_IMAGE"),
+        os.environ.get("CI_PIPELINE_ID"),
+        os.environ.get("CI_COMMIT_SHA"),
+        os.environ.get("CI_COMMIT_BEFORE_SHA"),
+        os.environ.get("CI_COMMIT_BRANCH"),
+        os.environ.get("CI_COMMIT_REF_SLUG"),
+        strip,
+        wall_time,
+        peak_rss,
+        binary_size,
+        instruction_count,
+    )
+    return Upload(checksum, contents, disassembled, timings)
+
+
+INSERT_ASSEMBLY = """
+    INSERT INTO assembly (checksum, content, chunked)
+    VALUES %s
+    ON CONFLICT (checksum)
+    DO UPDATE SET updated_at = CURRENT_TIMESTAMP
+    RETURNING checksum, assembly_id
+"""
+
+INSERT_CHUNK = """
+    INSERT INTO assembly_chunk (checksum, compression, data, size)
+    VALUES %s
+    ON CONFLICT (checksum) DO NOTHING
+"""
+
+INSERT_CHUNK_REF = """
+    INSERT INTO assembly_chunk_ref (assembly_id, position, checksum)
+    VALUES %s
+    ON CONFLICT (assembly_id, position) DO NOTHING
+"""
+
+INSERT_DISASSEMBLED = """
+    INSERT INTO disassembled (
+        assembly_id,
+        name,
+        compiler,
+        compiler_args,
+        platform,
+        distro,
+        ci_job_image,
+        ci_pipeline_id,
+        ci_commit_sha,
+        ci_commit_before_sha,
+        ci_commit_branch,
+        ci_commit_ref_slug,
+        strip,
+        wall_time,
+        peak_rss,
+        binary_size,
+        instruction_count
+    )
+    VALUES %s
+    RETURNING disassembled_id
+"""
+
+INSERT_PASS_TIMING = """
+    INSERT INTO pass_timing (
+        disassembled_id,
+        module,
+        pass,
+        phase,
+        wall_time,
+        cpu_time,
+        peak_rss_delta
+    )
+    VALUES %s
+"""
+
+
+def _values(count):
+    return "({})".format(", ".join(["%s"] * count))
+
+
+def _insert(cursor, statement, rows, fetch=False):
+    """Insert rows with a statement whose VALUES are given by %s."""
+    if not DB.sqlite:
+        from psycopg2.extras import execute_values
+
+        return execute_values(cursor, statement, rows, fetch=fetch)
+
+    # SQLite is local: insert row by row.
+    results = []
+    for row in rows:
+        cursor.execute(DB.query(statement % _values(len(row))), row)
+        if fetch:
+            results.append(cursor.fetchone())
+    return results
+
+
+def _existing_chunks(cursor, checksums) -> Set[str]:
+    checksums = list(checksums)
+    if not DB.sqlite:
+        cursor.execute(
+            "SELECT checksum FROM assembly_chunk WHERE checksum = ANY(%s)",
+            (checksums,),
+        )
+        return {checksum for checksum, in cursor.fetchall()}
+
+    existing = set()
+    for i in range(0, len(checksums), 500):
+        part = checksums[i : i + 500]
+        cursor.execute(
+            DB.query(
+                "SELECT checksum FROM assembly_chunk WHERE checksum IN "
+                + _values(len(part))
             ),
+            part,
+        )
+        existing.update(checksum for checksum, in cursor.fetchall())
+    return existing
+
+
+def store_chunks(cursor, assembly_ids: Dict[str, int], contents):
+    """
+    Store the listings in 'contents', by checksum, as chunks of the
+    `assembly' rows in 'assembly_ids'. Only chunks that are not in the
+    database yet are compressed and sent.
+    """
+    chunks = {}
+    refs = []
+    for checksum, content in contents.items():
+        for position, chunk in enumerate(split_listing(content)):
+            data = chunk.encode("utf-8")
+            chunk_checksum = hashlib.md5(data).hexdigest()
+            chunks[chunk_checksum] = data
+            refs.append((assembly_ids[checksum], position, chunk_checksum))
+
+    missing = sorted(set(chunks) - _existing_chunks(cursor, chunks))
+    compressor = make_compressor()
+    rows = [
+        (
+            checksum,
+            *compress(chunks[checksum], compressor),
+            len(chunks[checksum]),
+        )
+        for checksum in missing
+    ]
+    if rows:
+        _insert(cursor, INSERT_CHUNK, rows)
+    if refs:
+        _insert(cursor, INSERT_CHUNK_REF, refs)
+
+
+def write_batch(conn, uploads):
+    """Write a batch of uploads in a single transaction."""
+    cursor = conn.cursor()
+
+    # Each checksum may only be upserted once per statement.
+    contents = {u.checksum: u.content for u in uploads}
+    assembly_ids = dict(
+        _insert(
+            cursor,
+            INSERT_ASSEMBLY,
+            [(checksum, "", True) for checksum in contents],
+            fetch=True,
         )
+    )
+    store_chunks(cursor, assembly_ids, contents)
+
+    disassembled_ids = _insert(
+        cursor,
+        INSERT_DISASSEMBLED,
+        [(assembly_ids[u.checksum],) + u.disassembled for u in uploads],
+        fetch=True,
+    )
+    pass_timings = [
+        (disassembled_id,) + timing
+        for (disassembled_id,), upload in zip(disassembled_ids, uploads)
+        for timing in upload.pass_timings
+    ]
+    if pass_timings:
+        _insert(cursor, INSERT_PASS_TIMING, pass_timings)
+    conn.commit()
+
+
+class UploadQueue:
+    """
+    Write uploads to the database from a background thread.
+
+    Uploads are batched and committed together. The writer opens its own
+    connection, which it keeps between batches, so that its transactions
+    never mix with queries of the main thread. If the database is down, slow
+    or the queue is full, uploads are dropped: the tests never wait on the
+    database, except for at most FLUSH_TIMEOUT seconds at exit.
+    """
+
+    _STOP = None
+
+    def __init__(self):
+        self._queue = queue.Queue(MAX_PENDING)
+        self._dropped = 0
+        self._conn = None
+        self._unavailable = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, upload):
+        try:
+            self._queue.put_nowait(upload)
+        except queue.Full:
+            self._dropped += 1
+            if self._dropped == 1:
+                print("WARNING: database upload queue full; dropping uploads")
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Write the pending uploads and stop the writer."""
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if self._STOP in batch:
+                stopping = True
+                batch = [
+                    upload for upload in batch if upload is not self._STOP
+                ]
+            if batch:
+                self._write(batch)
+        if self._conn is not None:
+            self._conn.close()
+
+    def _write(self, batch):
+        if self._conn is None:
+            if self._unavailable:
+                return
+            self._conn = connect()
+            if self._conn is None:
+                self._unavailable = True
+                return
+        try:
+            write_batch(self._conn, batch)
+        except Exception as ex:
+            print("ERROR: failed to upload {} rows:".format(len(batch)), ex)
+            try:
+                self._conn.rollback()
+            except Exception:
+                # Reconnect for the next batch.
+                self._conn = None
+
+
+_upload_queue: Optional[UploadQueue] = None
+_upload_queue_lock = threading.Lock()
+
+
+def upload(*args, **kwargs):
+    """
+    Queue the assembly of a disassembled example for upload and return
+    immediately; see `make_upload' for the arguments.
+
+    The files are read before returning, so they may be removed afterwards.
+    """
+    global _upload_queue
+    if not os.environ.get("DATABASE_URL") or DB.state == DB.State.ERROR:
+        return
+    item = make_upload(*args, **kwargs)
+    with _upload_queue_lock:
+        if _upload_queue is None:
+            _upload_queue = UploadQueue()
+            atexit.register(flush)
+        _upload_queue.put(item)
+
+
+def flush():
+    """Write the pending uploads, waiting at most FLUSH_TIMEOUT seconds."""
+    global _upload_queue
+    with _upload_queue_lock:
+        upload_queue, _upload_queue = _upload_queue, None
+    if upload_queue is not None:
+        upload_queue.flush()
+
+
+def reset():
+    """
+    Forget the connection and upload queue inherited by a forked process.
+    """
+    global _upload_queue, _upload_queue_lock
+    DB.conn = None
+    DB.state = DB.State.NEW
+    _upload_queue = None
+    _upload_queue_lock = threading.Lock()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Manage the database of disassembled examples."
+    )
+    parser.add_argument(
+        "--create-schema",
+        action="store_true",
+        help="create the tables used by uploads, or add missing columns",
+    )
+    args = parser.parse_args()
+    if not args.create_schema:
+        parser.error("nothing to do; see --help")
 
-        conn.commit()
+    conn = connect()
+    if not conn:
+        sys.exit("ERROR: no database; set DATABASE_URL")
+    create_schema(conn, DB.sqlite)
+    conn.close()
@@ -0,0 +1,144 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import asm_db
+
+LISTING = """\
+#===================================
+.text
+.intel_syntax noprefix
+#===================================
+
+.type f, @function
+#-----------------------------------
+f:
+    mov eax, 1
+    ret
+.type g, @function
+#-----------------------------------
+g:
+    mov eax, {}
+    ret
+.type h, @function
+#-----------------------------------
+h:
+    mov eax, 3
+    ret
+"""
+
+
+class AsmDbTest(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+
+        url = "sqlite:///" + os.path.join(self.dir, "asm.db")
+        patchers = [
+            mock.patch.dict(os.environ, {"DATABASE_URL": url}),
+            mock.patch.object(asm_db.DB, "sqlite", False),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        asm_db.reset()
+        self.addCleanup(asm_db.reset)
+
+    def create_schema(self):
+        subprocess.run(
+            [sys.executable, asm_db.__file__, "--create-schema"], check=True
+        )
+
+    def upload(self, name, contents):
+        asm = os.path.join(self.dir, name + ".s")
+        with open(asm, "w") as f:
+            f.write(contents)
+        asm_db.upload(name, asm, ["gcc", "g++"], ["-O0"], False)
+
+    def test_split_listing(self):
+        chunks = asm_db.split_listing(LISTING.format(2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual("".join(chunks), LISTING.format(2))
+        self.assertTrue(chunks[1].startswith(".type g, @function"))
+        self.assertTrue(chunks[2].startswith(".type h, @function"))
+
+    def test_round_trip(self):
+        """
+        Listings that differ in one function share the chunks of the others.
+        """
+        first, second = LISTING.format(2), LISTING.format(4)
+        self.create_schema()
+        self.upload("first", first)
+        asm_db.flush()
+
+        conn = asm_db.DB()
+        cursor = conn.cursor()
+        cursor.execute("SELECT checksum FROM assembly_chunk")
+        first_chunks = {checksum for checksum, in cursor.fetchall()}
+        self.assertEqual(len(first_chunks), 3)
+
+        self.upload("second", second)
+        self.upload("first again", first)
+        asm_db.flush()
+
+        cursor.execute("SELECT checksum FROM assembly_chunk")
+        chunks = {checksum for checksum, in cursor.fetchall()}
+        self.assertEqual(len(chunks), 4)
+        self.assertTrue(first_chunks < chunks)
+
+        cursor.execute(
+            "SELECT d.name, a.assembly_id, a.content, a.chunked"
+            " FROM disassembled d"
+            " JOIN assembly a ON d.assembly_id = a.assembly_id"
+            " ORDER BY d.disassembled_id"
+        )
+        rows = cursor.fetchall()
+        self.assertEqual(
+            [row[0] for row in rows], ["first", "second", "first again"]
+        )
+        self.assertEqual(rows[0][1], rows[2][1])
+        for _, _, content, chunked in rows:
+            self.assertEqual(content, "")
+            self.assertTrue(chunked)
+        self.assertEqual(asm_db.get_assembly(rows[0][1]), first)
+        self.assertEqual(asm_db.get_assembly(rows[1][1]), second)
+        self.assertIsNone(asm_db.get_assembly(rows[1][1] + 1))
+
+    def test_create_schema(self):
+        """
+        Connecting does not change the schema; --create-schema does, and
+        may be run again.
+        """
+        tables = "SELECT name FROM sqlite_master WHERE type = 'table'"
+        conn = asm_db.connect()
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute(tables).fetchall(), [])
+
+        self.create_schema()
+        self.create_schema()
+        self.assertEqual(
+            {name for name, in conn.execute(tables)},
+            {
+                "assembly",
+                "assembly_chunk",
+                "assembly_chunk_ref",
+                "disassembled",
+                "pass_timing",
+            },
+        )
+
+    def test_compression(self):
+        data = LISTING.format(2).encode()
+        compression, compressed = asm_db.compress(data)
+        self.assertIn(compression, ("zstd", "zlib"))
+        self.assertEqual(asm_db.decompress(compression, compressed), data)
+        with self.assertRaises(ValueError):
+            asm_db.decompress("lzma", compressed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable
+
+# Suffixes of the files that the test harness writes next to a built binary
+# (the ddisasm output, the reassembled object and the stripped copies).
+DERIVED_SUFFIXES = (".s", ".gtirb", ".o", ".stripped", ".sstripped")
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot(directory: Path) -> Dict[str, str]:
+    """
+    Map the relative path of each file under 'directory' to the SHA-256 of
+    its contents (or to the target of a symbolic link).
+    """
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = Path(root) / name
+            rel_path = path.relative_to(directory).as_posix()
+            if path.is_symlink():
+                files[rel_path] = "link:" + os.readlink(path)
+            elif path.is_file():
+                files[rel_path] = _hash_file(path)
+    return files
+
+
+class BuildCache:
+    """
+    A content-addressed cache of example builds on disk.
+
+    An entry holds the files that `make` created or modified in an example
+    directory, and is keyed on the files of the cleaned directory and the
+    toolchain description given by the caller. Entries are written
+    atomically, so several processes may share one directory.
+
+    Files that the harness derives from a previous build (e.g. 'ex.s' for a
+    binary 'ex') are not part of the key, since `make clean` does not
+    always remove them. The outputs of each Makefile are recorded the first
+    time it is built for this purpose, before the key of that first build
+    is computed, so that later runs find it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        (self.directory / "builds").mkdir(parents=True, exist_ok=True)
+        (self.directory / "outputs").mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _makefile_id(files: Dict[str, str]) -> str:
+        makefiles = sorted(
+            (path, digest)
+            for path, digest in files.items()
+            if Path(path).name.startswith("Makefile")
+        )
+        return hashlib.sha256(json.dumps(makefiles).encode()).hexdigest()
+
+    def _outputs_path(self, files: Dict[str, str]) -> Path:
+        return (
+            self.directory / "outputs" / (self._makefile_id(files) + ".json")
+        )
+
+    def _known_outputs(self, files: Dict[str, str]) -> Iterable[str]:
+        try:
+            with open(self._outputs_path(files)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def inputs(self, files: Dict[str, str]) -> Dict[str, str]:
+        """
+        Select the files of a snapshot of a cleaned example directory that
+        may affect its build.
+        """
+        files = dict(files)
+        for output in self._known_outputs(files):
+            files.pop(output, None)
+            for suffix in DERIVED_SUFFIXES:
+                files.pop(output + suffix, None)
+            files.pop(Path(output).with_suffix(".o").as_posix(), None)
+        return files
+
+    def key(self, inputs: Dict[str, str], toolchain: Dict[str, Any]) -> str:
+        """
+        Compute the cache key for the given inputs and toolchain.
+        """
+        description = json.dumps([inputs, toolchain], sort_keys=True)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / "builds" / key
+
+    def restore(self, key: str, directory: Path) -> bool:
+        """
+        Copy the files built for 'key' into 'directory'.
+
+        The copies get the current time as their modification time, so that
+        make considers them up to date with respect to the sources.
+
+        Returns False on a cache miss.
+        """
+        entry = self._entry(key)
+        if not entry.is_dir():
+            return False
+        for root, _, names in os.walk(entry):
+            for name in names:
+                path = Path(root) / name
+                target = directory / path.relative_to(entry)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if target.is_symlink() or target.exists():
+                    target.unlink()
+                shutil.copy(path, target, follow_symlinks=False)
+        return True
+
+    def store(
+        self,
+        directory: Path,
+        before: Dict[str, str],
+        toolchain: Dict[str, Any],
+    ):
+        """
+        Save the files that were created or modified in 'directory' since
+        the snapshot 'before' was taken, for the given toolchain.
+        """
+        after = snapshot(directory)
+        outputs = sorted(
+            path
+            for path, digest in after.items()
+            if before.get(path) != digest
+        )
+
+        outputs_path = self._outputs_path(before)
+        tmp_path = outputs_path.with_name(".tmp-{}".format(os.getpid()))
+        with open(tmp_path, "w") as f:
+            json.dump(outputs, f)
+        os.replace(tmp_path, outputs_path)
+
+        # Now that the outputs are known, they are left out of the key even
+        # if they were in the directory before the build.
+        entry = self._entry(self.key(self.inputs(before), toolchain))
+        tmp_dir = Path(
+            tempfile.mkdtemp(dir=self.directory / "builds", prefix=".tmp-")
+        )
+        try:
+            for output in outputs:
+                target = tmp_dir / output
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(directory / output, target, follow_symlinks=False)
+            tmp_dir.rename(entry)
+        except OSError:
+            # Another process may have stored the same build meanwhile.
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not entry.is_dir():
+                raise
@@ -0,0 +1,96 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+from build_cache import BuildCache, snapshot
+
+MAKEFILE = """\
+all: prog
+prog: prog.c
+\tcp prog.c prog
+clean:
+\trm -f prog
+"""
+
+TOOLCHAIN = {"CC": "cc", "compilers": ["cc 1.0"]}
+
+
+@unittest.skipUnless(shutil.which("make"), "This test requires make.")
+class BuildCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        self.cache = BuildCache(str(self.root / "cache"))
+
+    def example(self, name: str) -> Path:
+        """
+        Create an example whose source is older than now, with a listing
+        left over by a previous run of the harness.
+        """
+        directory = self.root / name
+        directory.mkdir()
+        (directory / "Makefile").write_text(MAKEFILE)
+        (directory / "prog.c").write_text("int main() {}\n")
+        (directory / "prog.s").write_text("stale listing of " + name)
+        os.utime(directory / "prog.c", (1000, 1000))
+        return directory
+
+    def build(self, directory: Path) -> bool:
+        """
+        Build the example like `compile' does; return whether the build was
+        restored from the cache.
+        """
+        subprocess.run(["make", "clean"], cwd=directory, check=True)
+        before = snapshot(directory)
+        key = self.cache.key(self.cache.inputs(before), TOOLCHAIN)
+        if self.cache.restore(key, directory):
+            return True
+        subprocess.run(["make"], cwd=directory, check=True)
+        self.cache.store(directory, before, TOOLCHAIN)
+        return False
+
+    def test_first_build_is_reused(self):
+        """
+        The build stored by the first run is found by the next ones, even
+        though leftover files were in the directory the first time.
+        """
+        self.assertFalse(self.build(self.example("first")))
+        second = self.example("second")
+        self.assertTrue(self.build(second))
+        self.assertEqual((second / "prog").read_text(), "int main() {}\n")
+        self.assertTrue(self.build(self.example("third")))
+
+    def test_restored_files_are_up_to_date(self):
+        """
+        Files restored from an entry older than the sources are not rebuilt.
+        """
+        self.build(self.example("first"))
+        for root, _, names in os.walk(self.root / "cache" / "builds"):
+            for name in names:
+                os.utime(Path(root) / name, (500, 500))
+        second = self.example("second")
+        self.assertTrue(self.build(second))
+        self.assertGreater(
+            (second / "prog").stat().st_mtime,
+            (second / "prog.c").stat().st_mtime,
+        )
+        completed = subprocess.run(["make", "-q"], cwd=second)
+        self.assertEqual(completed.returncode, 0)
+
+    def test_toolchain(self):
+        self.build(self.example("first"))
+        second = self.example("second")
+        subprocess.run(["make", "clean"], cwd=second, check=True)
+        inputs = self.cache.inputs(snapshot(second))
+        other = dict(TOOLCHAIN, CC="clang")
+        self.assertFalse(
+            self.cache.restore(self.cache.key(inputs, other), second)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,262 +1,383 @@
 #!/usr/bin/env python3
 import argparse
+import bisect
+import concurrent.futures
 import gtirb
-from typing import List, Union
+import json
+import os
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Union
 import sys
 
 
-def lookup_sym(node: gtirb.Block) -> Union[str, None]:
-    """
-    Find a symbol name that describes the node.
-    """
-    for sym in node.module.symbols:
-        if sym._payload == node:
-            return sym.name
-
+SKIPPED_SECTIONS = {
+    ".plt",
+    ".init",
+    ".fini",
+    ".MIPS.stubs",
+}
 
-def node_str(node: gtirb.Block) -> str:
-    """
-    Generate a string that uniquely identifies the node
-    """
-    if isinstance(node, gtirb.ProxyBlock):
-        return lookup_sym(node) or node.uuid
-    else:
-        return hex(node.address)
+SKIPPED_FUNCTIONS = {
+    "__do_global_ctors_aux",
+    "__do_global_dtors_aux",
+    "__libc_csu_fini",
+    "__libc_csu_init",
+    "_dl_relocate_static_pie",
+    "_start",
+    "deregister_tm_clones",
+    "frame_dummy",
+    "register_tm_clones",
+}
 
 
-def has_undefined_branch(branches: List[gtirb.Edge]) -> bool:
+def _aux_data(module: gtirb.Module, name: str) -> dict:
     """
-    Determine if any of the branches are not resolved to a target.
+    Get the contents of an AuxData table, or an empty dict if it is missing.
     """
-    for branch in branches:
-        if isinstance(branch.target, gtirb.ProxyBlock) and not lookup_sym(
-            branch.target
-        ):
-            return True
-    return False
+    table = module.aux_data.get(name)
+    return table.data if table is not None else {}
 
 
-def has_symbolic_branch(branches: List[gtirb.Edge]) -> bool:
+class ModuleIndex:
     """
-    Determine if any of the branches are to a defined symbol.
-    """
-    for branch in branches:
-        if lookup_sym(branch.target):
-            return True
-    return False
-
+    Lookup tables for the queries made by the checks, built once per module.
 
-def is_skipped_section(node: gtirb.CodeBlock) -> bool:
+    Without them, each query rescans the module's symbols, functions,
+    padding or sections, which makes the checks quadratic in module size.
     """
-    Determine if the node is part of an uninteresting section.
-    """
-    skipped_sections = [
-        ".plt",
-        ".init",
-        ".fini",
-        ".MIPS.stubs",
-    ]
 
-    for section in node.module.sections:
-        if section.name not in skipped_sections:
-            continue
+    def __init__(self, module: gtirb.Module):
+        self.module = module
 
-        for interval in section.byte_intervals:
-            start = interval.address
-            end = interval.address + interval.size
+        # The first symbol referring to each block.
+        self.symbols: Dict[object, str] = {}
+        for sym in module.symbols:
+            self.symbols.setdefault(sym._payload, sym.name)
 
-            if start <= node.address and node.address < end:
-                return True
-    return False
+        function_names = _aux_data(module, "functionNames")
+        function_entries = _aux_data(module, "functionEntries")
+        function_blocks = _aux_data(module, "functionBlocks")
 
+        self.function_entries: Dict[gtirb.CodeBlock, str] = {}
+        for key, value in function_names.items():
+            for block in function_entries.get(key, ()):
+                self.function_entries.setdefault(block, value.name)
 
-def get_func_entry_name(node: gtirb.CodeBlock) -> Union[str, None]:
-    """
-    If the node is the entry point to a function, return the function name.
+        self.skipped_function_blocks: Set[gtirb.CodeBlock] = set()
+        for key, value in function_names.items():
+            if value.name in SKIPPED_FUNCTIONS:
+                self.skipped_function_blocks.update(
+                    function_blocks.get(key, ())
+                )
 
-    Otherwise returns None
+        self.padding_addresses: Set[int] = {
+            key.element_id.address + key.displacement
+            for key in _aux_data(module, "padding")
+        }
+
+        # Address ranges of the skipped sections, sorted and merged so that
+        # a lookup is a binary search.
+        ranges = sorted(
+            (interval.address, interval.address + interval.size)
+            for section in module.sections
+            if section.name in SKIPPED_SECTIONS
+            for interval in section.byte_intervals
+            if interval.address is not None
+        )
+        self._skipped_starts: List[int] = []
+        self._skipped_ends: List[int] = []
+        for start, end in ranges:
+            if self._skipped_ends and start <= self._skipped_ends[-1]:
+                self._skipped_ends[-1] = max(self._skipped_ends[-1], end)
+            else:
+                self._skipped_starts.append(start)
+                self._skipped_ends.append(end)
+
+    def lookup_sym(self, node: gtirb.Block) -> Union[str, None]:
+        """
+        Find a symbol name that describes the node.
+        """
+        return self.symbols.get(node)
+
+    def node_str(self, node: gtirb.Block) -> str:
+        """
+        Generate a string that uniquely identifies the node
+        """
+        if isinstance(node, gtirb.ProxyBlock):
+            return self.lookup_sym(node) or node.uuid
+        else:
+            return hex(node.address)
+
+    def has_undefined_branch(self, branches: List[gtirb.Edge]) -> bool:
+        """
+        Determine if any of the branches are not resolved to a target.
+        """
+        return any(
+            isinstance(branch.target, gtirb.ProxyBlock)
+            and not self.lookup_sym(branch.target)
+            for branch in branches
+        )
+
+    def has_symbolic_branch(self, branches: List[gtirb.Edge]) -> bool:
+        """
+        Determine if any of the branches are to a defined symbol.
+        """
+        return any(self.lookup_sym(branch.target) for branch in branches)
+
+    def is_skipped_section(self, node: gtirb.CodeBlock) -> bool:
+        """
+        Determine if the node is part of an uninteresting section.
+        """
+        i = bisect.bisect_right(self._skipped_starts, node.address) - 1
+        return i >= 0 and node.address < self._skipped_ends[i]
+
+    def get_func_entry_name(self, node: gtirb.CodeBlock) -> Union[str, None]:
+        """
+        If the node is the entry point to a function, return the function
+        name.
+
+        Otherwise returns None
+        """
+        return self.function_entries.get(node)
+
+    def belongs_to_skipped_func(self, node: gtirb.CodeBlock) -> bool:
+        """
+        Determine if a CFG node belongs to a function or section that is not
+        checked.
+        """
+        return node in self.skipped_function_blocks or self.is_skipped_section(
+            node
+        )
+
+    def is_padding(self, node: gtirb.CodeBlock) -> bool:
+        """
+        Determine if a CFG node is padding
+        """
+        return node.address in self.padding_addresses
+
+
+class CfgNodeView:
+    """
+    A CFG node as seen by the checks, with the data that several checks need
+    computed at most once.
     """
-    for key, value in node.module.aux_data["functionNames"].data.items():
-        if node in node.module.aux_data["functionEntries"].data[key]:
-            return value.name
-
 
-def belongs_to_skipped_func(node: gtirb.CodeBlock) -> bool:
+    def __init__(self, index: ModuleIndex, node: gtirb.Block):
+        self.index = index
+        self.node = node
+        self.outgoing_edges = list(node.outgoing_edges)
+        self._is_checked_code = None
+
+    @property
+    def is_checked_code(self) -> bool:
+        """
+        Whether the node is a CodeBlock that is neither padding nor part of a
+        skipped function or section.
+        """
+        if self._is_checked_code is None:
+            self._is_checked_code = (
+                isinstance(self.node, gtirb.CodeBlock)
+                and not self.index.belongs_to_skipped_func(self.node)
+                and not self.index.is_padding(self.node)
+            )
+        return self._is_checked_code
+
+
+class Finding(NamedTuple):
     """
-    Determine if a CFG node is
+    A problem reported by a check.
     """
-    skipped_funcs = [
-        "__do_global_ctors_aux",
-        "__do_global_dtors_aux",
-        "__libc_csu_fini",
-        "__libc_csu_init",
-        "_dl_relocate_static_pie",
-        "_start",
-        "deregister_tm_clones",
-        "frame_dummy",
-        "register_tm_clones",
-    ]
 
-    for name in skipped_funcs:
-        for key, value in node.module.aux_data["functionNames"].data.items():
-            if value.name == name:
-                if node in node.module.aux_data["functionBlocks"].data[key]:
-                    return True
+    check: str
+    module: str
+    severity: str  # "error" or "warning"
+    address: Optional[int]
+    message: str
 
-    return is_skipped_section(node)
+    def __str__(self) -> str:
+        return f"{self.severity.upper()}: {self.message}"
 
 
-def is_padding(node: gtirb.CodeBlock) -> bool:
+class Check:
     """
-    Determine if a CFG node is padding
-    """
-    for key, padding_size in node.module.aux_data["padding"].data.items():
-        padding_addr = key.element_id.address + key.displacement
-
-        if padding_addr == node.address:
-            return True
-
-    return False
+    A check of a GTIRB module.
 
+    Checks do not walk the module themselves: they override the visit methods
+    for the elements they inspect, and CheckEngine calls them while it walks
+    the module once for all checks. Problems are recorded with `report`.
+    """
 
-def check_unreachable(module: gtirb.Module) -> int:
+    name = ""
+
+    def __init__(self, index: ModuleIndex):
+        self.index = index
+        self.findings: List[Finding] = []
+
+    @property
+    def error_count(self) -> int:
+        return sum(1 for f in self.findings if f.severity == "error")
+
+    def report(
+        self, severity: str, message: str, node: Optional[gtirb.Block] = None
+    ) -> None:
+        """
+        Record a problem, optionally located at a block.
+        """
+        self.findings.append(
+            Finding(
+                self.name,
+                self.index.module.name,
+                severity,
+                getattr(node, "address", None),
+                message,
+            )
+        )
+
+    def visit_cfg_node(self, view: CfgNodeView) -> None:
+        pass
+
+    def visit_symbol(self, symbol: gtirb.Symbol) -> None:
+        pass
+
+    def visit_code_block(self, block: gtirb.CodeBlock) -> None:
+        pass
+
+    def finish(self) -> None:
+        """
+        Called after the whole module has been visited.
+        """
+        pass
+
+
+class UnreachableCheck(Check):
     """
     Check a GTIRB module for unexpected unreachable code
     """
-    error_count = 0
 
-    for node in module.cfg_nodes:
-        if (
-            not isinstance(node, gtirb.CodeBlock)
-            or belongs_to_skipped_func(node)
-            or is_padding(node)
-        ):
-            continue
+    name = "unreachable"
 
-        func = get_func_entry_name(node)
-        if len(list(node.incoming_edges)) == 0 and func != "main":
+    def visit_cfg_node(self, view: CfgNodeView) -> None:
+        node = view.node
+        if not view.is_checked_code:
+            return
 
+        func = self.index.get_func_entry_name(node)
+        if func != "main" and next(node.incoming_edges, None) is None:
+            node_str = self.index.node_str(node)
             if func:
                 # In some cases in our examples, function call sites are
                 # optimized away, but the function is left in the binary.
                 # We warn for these - if this code isn't being run, we're not
                 # testing whether ddisasm disassembled it well, and we may want
                 # to consider reworking those examples.
-                print(
-                    'WARNING: unreachable function "{}" at {}'.format(
-                        func, node_str(node)
-                    )
+                self.report(
+                    "warning",
+                    f'unreachable function "{func}" at {node_str}',
+                    node,
                 )
             else:
                 # Unreachable code that is not a function entry is likely to
                 # be an error, such as jump table where not all possible
                 # targets were discovered.
-                print("ERROR: unreachable code at", node_str(node))
-                error_count += 1
-
-    return error_count
+                self.report("error", f"unreachable code at {node_str}", node)
 
 
-def check_unresolved_branch(module: gtirb.Module) -> int:
+class UnresolvedBranchCheck(Check):
     """
     Check a GTIRB module for unresolved branches
     """
-    error_count = 0
 
-    for node in module.cfg_nodes:
-        if (
-            not isinstance(node, gtirb.CodeBlock)
-            or belongs_to_skipped_func(node)
-            or is_padding(node)
-        ):
-            continue
+    name = "unresolved_branch"
 
-        branches = []
+    def visit_cfg_node(self, view: CfgNodeView) -> None:
+        if not view.is_checked_code:
+            return
 
-        for edge in node.outgoing_edges:
-            if edge.label.type not in (
-                gtirb.Edge.Type.Return,
-                gtirb.Edge.Type.Fallthrough,
-            ):
-                branches.append(edge)
+        branches = [
+            edge
+            for edge in view.outgoing_edges
+            if edge.label.type
+            not in (gtirb.Edge.Type.Return, gtirb.Edge.Type.Fallthrough)
+        ]
 
         # Calls to PLT functions seem to have a branch to a ProxyBlock for
         # that symbol and a branch to the original PLT function.
-        if has_undefined_branch(branches) and not has_symbolic_branch(
+        if self.index.has_undefined_branch(
             branches
-        ):
-            print("ERROR: unresolved jump in", node_str(node))
-            error_count += 1
-
-    return error_count
+        ) and not self.index.has_symbolic_branch(branches):
+            node_str = self.index.node_str(view.node)
+            self.report("error", f"unresolved jump in {node_str}", view.node)
 
 
-def check_cfg_empty(module: gtirb.Module) -> int:
+class CfgEmptyCheck(Check):
     """
     Check if a GTIRB module has an empty CFG
     """
-    if len(list(module.cfg_nodes)) == 0:
-        print("ERROR: CFG has no nodes")
-        return 1
 
-    return 0
+    name = "cfg_empty"
+
+    def __init__(self, index: ModuleIndex):
+        super().__init__(index)
+        self.node_count = 0
+
+    def visit_cfg_node(self, view: CfgNodeView) -> None:
+        self.node_count += 1
 
+    def finish(self) -> None:
+        if self.node_count == 0:
+            self.report("error", "CFG has no nodes")
 
-def check_main_is_code(module: gtirb.Module) -> int:
+
+class MainIsCodeCheck(Check):
     """
     Check a GTIRB module for a `main` symbol that is not a CodeBlock.
-
-    Returns the number of errors found.
     """
-    error_count = 0
 
-    for sym in module.symbols:
-        if sym.name == "main":
-            if not isinstance(sym.referent, gtirb.CodeBlock):
-                print("ERROR: main is not code")
-                error_count += 1
+    name = "main_is_code"
 
-    return error_count
+    def visit_symbol(self, symbol: gtirb.Symbol) -> None:
+        if symbol.name == "main":
+            if not isinstance(symbol.referent, gtirb.CodeBlock):
+                self.report("error", "main is not code")
 
 
-def check_decode_mode_matches_arch(module: gtirb.Module) -> int:
+class DecodeModeMatchesArchCheck(Check):
     """
     Ensure a GTIRB only uses DecodeMode values that match the architecture
-
-    Returns the number of errors found.
     """
-    error_count = 0
+
+    name = "decode_mode_matches_arch"
 
     # if a new mode is added, we will raise a KeyError unless it is added
     # to this dictionary.
-    mode_to_arch = {
+    MODE_TO_ARCH = {
         gtirb.CodeBlock.DecodeMode.Thumb: gtirb.module.Module.ISA.ARM
     }
 
-    for block in module.code_blocks:
+    def visit_code_block(self, block: gtirb.CodeBlock) -> None:
         if block.decode_mode == gtirb.CodeBlock.DecodeMode.Default:
             # "Default" is correct on every arch
-            continue
-
-        if module.isa != mode_to_arch[block.decode_mode]:
-            print(f"ERROR: {module.isa} does not support {block.decode_mode}")
-            error_count += 1
+            return
 
-    return error_count
+        isa = self.index.module.isa
+        if isa != self.MODE_TO_ARCH[block.decode_mode]:
+            self.report(
+                "error", f"{isa} does not support {block.decode_mode}", block
+            )
 
 
-def check_outgoing_edges(module: gtirb.Module) -> int:
+class OutgoingEdgesCheck(Check):
     """
     Check outgoing edges for invalid configurations
     """
-    error_count = 0
 
-    for node in module.cfg_nodes:
+    name = "outgoing_edges"
+
+    def visit_cfg_node(self, view: CfgNodeView) -> None:
         fallthrough_count = 0
         direct_call_count = 0
         direct_jump_count = 0
 
-        for edge in node.outgoing_edges:
+        for edge in view.outgoing_edges:
 
             if edge.label.direct and edge.label.type == gtirb.Edge.Type.Call:
                 direct_call_count += 1
@@ -267,54 +388,159 @@ def check_outgoing_edges(module: gtirb.Module) -> int:
             elif edge.label.type == gtirb.Edge.Type.Fallthrough:
                 fallthrough_count += 1
 
+        node = view.node
+        node_str = self.index.node_str(node)
         if fallthrough_count > 1:
-            print("ERROR: multiple fallthrough from ", node_str(node))
-            error_count += 1
+            self.report("error", f"multiple fallthrough from {node_str}", node)
         if direct_call_count > 1:
-            print("ERROR: multiple direct call from ", node_str(node))
-            error_count += 1
+            self.report("error", f"multiple direct call from {node_str}", node)
         if direct_jump_count > 1:
-            print("ERROR: multiple direct jump from ", node_str(node))
-            error_count += 1
-
-    return error_count
+            self.report("error", f"multiple direct jump from {node_str}", node)
 
 
 CHECKS = {
-    "unreachable": check_unreachable,
-    "unresolved_branch": check_unresolved_branch,
-    "cfg_empty": check_cfg_empty,
-    "main_is_code": check_main_is_code,
-    "decode_mode_matches_arch": check_decode_mode_matches_arch,
-    "outgoing_edges": check_outgoing_edges,
+    check.name: check
+    for check in (
+        UnreachableCheck,
+        UnresolvedBranchCheck,
+        CfgEmptyCheck,
+        MainIsCodeCheck,
+        DecodeModeMatchesArchCheck,
+        OutgoingEdgesCheck,
+    )
 }
 
 
+class CheckEngine:
+    """
+    Run several checks in a single walk over a module.
+
+    Each CFG node, symbol and code block is visited once and dispatched to
+    every check that overrides the corresponding visit method, so the cost
+    of the walk does not grow with the number of checks.
+    """
+
+    def __init__(self, index: ModuleIndex, checks: List[Check]):
+        self.index = index
+        self.checks = checks
+
+    def _callbacks(self, name: str) -> List[Callable]:
+        return [
+            getattr(check, name)
+            for check in self.checks
+            if getattr(type(check), name) is not getattr(Check, name)
+        ]
+
+    def run(self) -> List[Finding]:
+        """
+        Run the checks and return the problems they found.
+        """
+        module = self.index.module
+
+        node_callbacks = self._callbacks("visit_cfg_node")
+        if node_callbacks:
+            for node in module.cfg_nodes:
+                view = CfgNodeView(self.index, node)
+                for callback in node_callbacks:
+                    callback(view)
+
+        symbol_callbacks = self._callbacks("visit_symbol")
+        if symbol_callbacks:
+            for symbol in module.symbols:
+                for callback in symbol_callbacks:
+                    callback(symbol)
+
+        block_callbacks = self._callbacks("visit_code_block")
+        if block_callbacks:
+            for block in module.code_blocks:
+                for callback in block_callbacks:
+                    callback(block)
+
+        for check in self.checks:
+            check.finish()
+        return [finding for check in self.checks for finding in check.findings]
+
+
 class NoSuchCheckError(Exception):
     """Indicates an invalid GTIRB check was specified"""
 
     pass
 
 
-def run_checks(module: gtirb.Module, selected_checks: List[str]):
+def find_problems(
+    module: gtirb.Module, selected_checks: List[str]
+) -> List[Finding]:
     """
-    Run specified checks
+    Run specified checks and return the problems found
 
     Raises NoSuchCheckError for unexpected names in selected_checks
     """
-    error_count = 0
     for selected_check in selected_checks:
         if selected_check not in CHECKS:
             raise NoSuchCheckError(f"No such check: {selected_check}")
 
-        error_count += CHECKS[selected_check](module)
+    index = ModuleIndex(module)
+    checks = [
+        CHECKS[selected_check](index) for selected_check in selected_checks
+    ]
+    return CheckEngine(index, checks).run()
+
+
+def run_checks(module: gtirb.Module, selected_checks: List[str]):
+    """
+    Run specified checks, print the problems found and return the number of
+    errors
+
+    Raises NoSuchCheckError for unexpected names in selected_checks
+    """
+    findings = find_problems(module, selected_checks)
+    for finding in findings:
+        print(finding)
+    return sum(1 for f in findings if f.severity == "error")
+
 
-    return error_count
+def check_file(path: str, selected_checks: List[str]) -> List[Finding]:
+    """
+    Run specified checks on every module of a GTIRB file
+    """
+    try:
+        ir = gtirb.IR.load_protobuf(path)
+    except Exception as e:
+        return [Finding("load", "", "error", None, f"cannot load IR: {e}")]
+
+    return [
+        finding
+        for module in ir.modules
+        for finding in find_problems(module, selected_checks)
+    ]
+
+
+def find_gtirb_files(paths: List[str]) -> List[str]:
+    """
+    Expand directories to the GTIRB files they contain
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in sorted(os.walk(path)):
+                files.extend(
+                    os.path.join(root, name)
+                    for name in sorted(names)
+                    if name.endswith(".gtirb")
+                )
+        else:
+            files.append(path)
+    return files
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("path")
+    parser.add_argument(
+        "paths",
+        metavar="path",
+        nargs="+",
+        help="GTIRB files, or directories to search for .gtirb files",
+    )
 
     check_names = list(CHECKS.keys())
     check_names.append("all")
@@ -325,12 +551,61 @@ def main():
         default="all",
         help="The name of the check to run",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of files to check in parallel (default: CPU count)",
+    )
+    parser.add_argument(
+        "--json-lines",
+        action="store_true",
+        help="Print each problem found as a line of JSON",
+    )
     args = parser.parse_args()
 
-    module = gtirb.IR.load_protobuf(args.path).modules[0]
     checks = list(CHECKS.keys()) if args.check == "all" else [args.check]
-    error_count = run_checks(module, checks)
-    sys.exit(error_count)
+    files = find_gtirb_files(args.paths)
+
+    if len(files) > 1 and args.jobs != 1:
+        executor = concurrent.futures.ProcessPoolExecutor(args.jobs)
+    else:
+        executor = None
+
+    def results():
+        if executor is None:
+            for path in files:
+                yield path, check_file(path, checks)
+            return
+        futures = {
+            executor.submit(check_file, path, checks): path for path in files
+        }
+        for future in concurrent.futures.as_completed(futures):
+            yield futures[future], future.result()
+
+    error_count = 0
+    try:
+        for path, findings in results():
+            for finding in findings:
+                if args.json_lines:
+                    record = {"file": path}
+                    record.update(finding._asdict())
+                    print(json.dumps(record), flush=True)
+                elif len(files) > 1:
+                    location = (
+                        [path, finding.module] if finding.module else [path]
+                    )
+                    print(": ".join(location + [str(finding)]))
+                else:
+                    print(finding)
+                if finding.severity == "error":
+                    error_count += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    sys.exit(min(error_count, 255))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import gtirb
+
+check_gtirb = Path(__file__).resolve().parent / "check_gtirb.py"
+
+
+def empty_module(ir: gtirb.IR, name: str) -> gtirb.Module:
+    return gtirb.Module(
+        name=name,
+        isa=gtirb.Module.ISA.X64,
+        file_format=gtirb.Module.FileFormat.ELF,
+        ir=ir,
+    )
+
+
+def data_main_module(ir: gtirb.IR, name: str) -> gtirb.Module:
+    """
+    Build a module whose `main' symbol refers to data.
+    """
+    module = empty_module(ir, name)
+    section = gtirb.Section(name=".data", module=module)
+    interval = gtirb.ByteInterval(
+        address=0x1000, contents=b"\0" * 4, section=section
+    )
+    block = gtirb.DataBlock(offset=0, size=4, byte_interval=interval)
+    gtirb.Symbol("main", payload=block, module=module)
+    return module
+
+
+class CheckGtirbBatchTest(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = Path(tmpdir.name)
+
+    def save(self, name: str, *builders) -> str:
+        ir = gtirb.IR()
+        for i, builder in enumerate(builders):
+            builder(ir, f"{Path(name).stem}{i}")
+        path = str(self.dir / name)
+        ir.save_protobuf(path)
+        return path
+
+    def check(self, *args) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, str(check_gtirb), "--json-lines"] + list(args),
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+    def test_json_lines(self):
+        """
+        Check the records printed for each problem found in a directory of
+        IRs, serially and in parallel, and the exit code.
+        """
+        empty = self.save("empty.gtirb", empty_module)
+        data_main = self.save("data_main.gtirb", data_main_module)
+        (self.dir / "notes.txt").write_text("not an IR")
+
+        expected = [
+            {
+                "file": data_main,
+                "check": "cfg_empty",
+                "module": "data_main0",
+                "severity": "error",
+                "address": None,
+                "message": "CFG has no nodes",
+            },
+            {
+                "file": data_main,
+                "check": "main_is_code",
+                "module": "data_main0",
+                "severity": "error",
+                "address": None,
+                "message": "main is not code",
+            },
+            {
+                "file": empty,
+                "check": "cfg_empty",
+                "module": "empty0",
+                "severity": "error",
+                "address": None,
+                "message": "CFG has no nodes",
+            },
+        ]
+
+        def key(record):
+            return record["file"], record["check"]
+
+        for jobs in ("1", "2"):
+            with self.subTest(jobs=jobs):
+                result = self.check("-j", jobs, str(self.dir))
+                records = [
+                    json.loads(line) for line in result.stdout.splitlines()
+                ]
+                self.assertEqual(sorted(records, key=key), expected)
+                self.assertEqual(result.returncode, 3)
+
+    def test_load_error(self):
+        bad = self.dir / "bad.gtirb"
+        bad.write_bytes(b"not an IR")
+        result = self.check(str(bad))
+        (record,) = [json.loads(line) for line in result.stdout.splitlines()]
+        self.assertEqual(record["file"], str(bad))
+        self.assertEqual(record["check"], "load")
+        self.assertEqual(record["severity"], "error")
+        self.assertEqual(result.returncode, 1)
+
+    def test_exit_code_limit(self):
+        """The exit code is the number of errors, up to 255."""
+        many = self.save("many.gtirb", *([empty_module] * 300))
+        result = self.check("--check", "cfg_empty", many)
+        self.assertEqual(len(result.stdout.splitlines()), 300)
+        self.assertEqual(result.returncode, 255)
+
+        result = self.check("--check", "main_is_code", many)
+        self.assertEqual(result.stdout, "")
+        self.assertEqual(result.returncode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
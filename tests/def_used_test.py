@@ -4,6 +4,8 @@ from disassemble_reassemble_check import compile, cd, disassemble
 from pathlib import Path
 import gtirb
 
+from souffle_relations import Relations
+
 
 ex_asm_dir = Path("./examples/") / "asm_examples"
 
@@ -54,18 +56,8 @@ class DefUsedTests(unittest.TestCase):
 
             # Confirm a def_used exists where it is defined in the `get_ptr`
             # function and used in `main`.
-            def_used = (
-                m.aux_data["souffleOutputs"]
-                .data["disassembly.reg_def_use.def_used"][1]
-                .strip()
-                .split("\n")
-            )
-            for tupl in def_used:
-                tupl = tupl.split("\t")
-
-                ea_def = int(tupl[0], 0)
-                ea_used = int(tupl[2], 0)
-
+            def_used = Relations(m)["disassembly.reg_def_use.def_used"]
+            for ea_def, _, ea_used, _ in def_used.rows():
                 if addr_in_function(m, ea_def, "get_ptr") and addr_in_function(
                     m, ea_used, "main"
                 ):
@@ -1,17 +1,27 @@
 import argparse
+import collections
+import concurrent.futures
 import contextlib
+import functools
 import gtirb
+import multiprocessing
+import multiprocessing.util
 import os
 import shlex
+import shutil
 import subprocess
+import sys
+import tempfile
+import threading
 from pathlib import Path
 from timeit import default_timer as timer
-from typing import List
+from typing import Any, Dict, List
 
 import platform
 
 import asm_db
 import check_gtirb
+from build_cache import BuildCache, snapshot
 
 
 class bcolors:
@@ -128,6 +138,40 @@ def build_chroot_wrapper() -> List[str]:
     return wrapper
 
 
+# Example builds are cached in this directory, if set.
+BUILD_CACHE_DIR = os.getenv("E2E_BUILD_CACHE", None)
+BUILD_CACHE = BuildCache(BUILD_CACHE_DIR) if BUILD_CACHE_DIR else None
+
+# Number of compiler and optimization pairs of an example that
+# disassemble_reassemble_test tests in parallel unless told otherwise. Tests
+# run serially by default; suites or users opt in to parallelism.
+CELL_JOBS = int(os.getenv("E2E_CELL_JOBS", "1"))
+
+# Environment variables that affect how the examples are built.
+BUILD_ENV_VARS = [
+    "CC",
+    "CXX",
+    "CFLAGS",
+    "CXXFLAGS",
+    "CPPFLAGS",
+    "LDFLAGS",
+    "TARGET_ARCH",
+]
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_identity(compiler):
+    """Get the version banner of a compiler, as run by the examples"""
+    completed_process = subprocess.run(
+        build_chroot_wrapper() + [compiler, "--version"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        encoding="utf-8",
+        errors="replace",
+    )
+    return completed_process.stdout
+
+
 def make(target=""):
     target = [] if target == "" else [target]
 
@@ -167,11 +211,89 @@ def compile(
     completedProcess = subprocess.run(
         make("clean"), env=env, stdout=subprocess.DEVNULL
     )
-    if completedProcess.returncode == 0:
+    if completedProcess.returncode != 0:
+        return False
+    if BUILD_CACHE is None:
         completedProcess = subprocess.run(
             make(), env=env, stdout=subprocess.DEVNULL
         )
-    return completedProcess.returncode == 0
+        return completedProcess.returncode == 0
+
+    toolchain = {var: env.get(var) for var in BUILD_ENV_VARS}
+    toolchain["compilers"] = [
+        compiler_identity(compiler),
+        compiler_identity(cxx_compiler),
+    ]
+    toolchain["platform"] = platform.system()
+    toolchain["chroot"] = MAKE_CHROOT
+    before = snapshot(Path.cwd())
+    key = BUILD_CACHE.key(BUILD_CACHE.inputs(before), toolchain)
+    if BUILD_CACHE.restore(key, Path.cwd()):
+        print("# restored build from cache\n")
+        return True
+
+    completedProcess = subprocess.run(
+        make(), env=env, stdout=subprocess.DEVNULL
+    )
+    if completedProcess.returncode != 0:
+        return False
+    BUILD_CACHE.store(Path.cwd(), before, toolchain)
+    return True
+
+
+def measure(cmd, timeout=None, stdout=None) -> Dict[str, Any]:
+    """
+    Run a command and return its exit code, wall time, user and system time
+    and peak RSS in bytes (if the platform reports them).
+
+    Raises subprocess.TimeoutExpired if the command does not finish within
+    'timeout' seconds.
+    """
+    start = timer()
+    process = subprocess.Popen(cmd, stdout=stdout)
+    if not hasattr(os, "wait4"):
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            raise
+        return dict(
+            returncode=process.returncode,
+            wall_time=timer() - start,
+            user_time=None,
+            sys_time=None,
+            peak_rss=None,
+        )
+
+    # Reap the child ourselves to collect its resource usage.
+    result = {}
+    waiter = threading.Thread(
+        target=lambda: result.update(wait4=os.wait4(process.pid, 0))
+    )
+    waiter.start()
+    waiter.join(timeout)
+    if waiter.is_alive():
+        process.kill()
+        waiter.join()
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    wall_time = timer() - start
+
+    _, status, usage = result["wait4"]
+    if os.WIFEXITED(status):
+        process.returncode = os.WEXITSTATUS(status)
+    else:
+        process.returncode = -os.WTERMSIG(status)
+
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return dict(
+        returncode=process.returncode,
+        wall_time=wall_time,
+        user_time=usage.ru_utime,
+        sys_time=usage.ru_stime,
+        peak_rss=usage.ru_maxrss * scale,
+    )
 
 
 def disassemble(
@@ -183,9 +305,13 @@ def disassemble(
     format="--asm",
     extra_args=[],
     extra_strip_flags=None,
+    stats=None,
 ):
     """
     Disassemble the binary 'binary' and generate ddisasm output 'output'
+
+    If 'stats' is a dict, it is updated with the measurements of ddisasm's
+    run (see `measure').
     """
     if output is None:
         if format == "--asm":
@@ -197,13 +323,14 @@ def disassemble(
         binary, strip_exe, strip, sstrip, extra_strip_flags=extra_strip_flags
     ) as target_binary:
         print("# Disassembling " + target_binary + "\n")
-        start = timer()
-        completedProcess = subprocess.run(
+        result = measure(
             ["ddisasm", target_binary, format, output, "-j", "1"] + extra_args,
             timeout=300,
         )
-        time_spent = timer() - start
-    if completedProcess.returncode == 0:
+        time_spent = result["wall_time"]
+    if stats is not None:
+        stats.update(result)
+    if result["returncode"] == 0:
         print(bcolors.okgreen("Disassembly succeed"))
         return True, time_spent
     else:
@@ -315,6 +442,176 @@ def test(exec_wrapper=None):
         return True
 
 
+# Serializes `make check' across the worker processes of
+# disassemble_reassemble_test: the example Makefiles compare their output
+# through a fixed path in /tmp.
+_test_lock = contextlib.nullcontext()
+
+
+def _init_worker(test_lock):
+    global _test_lock
+    _test_lock = test_lock
+    # Do not share a database connection inherited from the parent, and
+    # write the pending uploads before the worker exits.
+    asm_db.reset()
+    multiprocessing.util.Finalize(None, asm_db.flush, exitpriority=10)
+
+
+@contextlib.contextmanager
+def cell_pool(jobs):
+    """
+    Create a pool of 'jobs' processes that can run
+    disassemble_reassemble_cell concurrently in scratch copies.
+    """
+    with multiprocessing.Manager() as manager:
+        with concurrent.futures.ProcessPoolExecutor(
+            jobs, initializer=_init_worker, initargs=(manager.Lock(),)
+        ) as executor:
+            yield executor
+
+
+@contextlib.contextmanager
+def scratch_copy(make_dir: Path, tag: str):
+    """
+    Copy the project to a sibling directory that is removed on exit.
+
+    The copy is at the same depth as the original, so relative paths to the
+    repository still work from it.
+    """
+    work_dir = make_dir.parent / ".{}.{}.{}".format(
+        make_dir.name, os.getpid(), tag
+    )
+    shutil.rmtree(work_dir, ignore_errors=True)
+    shutil.copytree(make_dir, work_dir, symlinks=True)
+    try:
+        yield work_dir
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def disassemble_reassemble_cell(
+    make_dir,
+    binary,
+    compiler,
+    cxx_compiler,
+    optimization,
+    extra_compile_flags,
+    extra_reassemble_flags,
+    extra_link_flags,
+    reassembly_compiler,
+    linker,
+    strip_exe,
+    strip,
+    sstrip,
+    reassemble_function,
+    skip_test,
+    exec_wrapper,
+    arch,
+    extra_ddisasm_flags,
+    cfg_checks,
+    upload,
+    scratch=False,
+) -> collections.Counter:
+    """
+    Disassemble, reassemble and test an example with one compiler and
+    optimization.
+
+    If 'scratch' is true, the example is built in a private copy of
+    'make_dir' so that several cells can run at the same time.
+
+    Returns the number of errors of each kind.
+    """
+    errors = collections.Counter()
+    print(
+        bcolors.okblue(
+            "Project",
+            str(make_dir),
+            "with",
+            compiler,
+            "and",
+            optimization,
+            *extra_compile_flags,
+        )
+    )
+
+    make_dir = Path(make_dir).resolve()
+    if scratch:
+        work_dir = scratch_copy(make_dir, f"{compiler}{optimization}")
+    else:
+        work_dir = contextlib.nullcontext(make_dir)
+
+    with work_dir as path, cd(path):
+        if not compile(
+            compiler,
+            cxx_compiler,
+            optimization,
+            extra_compile_flags,
+            exec_wrapper,
+            arch,
+        ):
+            errors["compile"] += 1
+            return errors
+
+        gtirb_filename = binary + ".gtirb"
+        run = {}
+        # Statistics are only collected for upload to a database.
+        upload = upload and bool(os.environ.get("DATABASE_URL"))
+        with tempfile.TemporaryDirectory() as stats_dir:
+            stats_filename = os.path.join(stats_dir, "stats.json")
+            success, time = disassemble(
+                binary,
+                None,
+                strip_exe,
+                strip,
+                sstrip,
+                extra_args=["--ir", gtirb_filename]
+                + (["--stats-json", stats_filename] if upload else [])
+                + extra_ddisasm_flags,
+                stats=run,
+            )
+
+            # Do some GTIRB checks
+            module = gtirb.IR.load_protobuf(gtirb_filename).modules[0]
+            errors["gtirb"] += check_gtirb.run_checks(module, cfg_checks or [])
+
+            if upload:
+                asm_db.upload(
+                    make_dir.name,
+                    binary + ".s",
+                    [compiler, cxx_compiler],
+                    [optimization] + extra_compile_flags,
+                    strip,
+                    wall_time=time,
+                    peak_rss=run["peak_rss"],
+                    binary=binary,
+                    stats=stats_filename,
+                )
+        print("Time " + str(time))
+        if not success:
+            errors["disassembly"] += 1
+            return errors
+        if not reassemble_function(
+            reassembly_compiler, binary, extra_reassemble_flags
+        ):
+            errors["reassembly"] += 1
+            return errors
+        if linker and not link(
+            linker,
+            binary,
+            [Path(binary).with_suffix(".o").name],
+            extra_link_flags,
+        ):
+            errors["link"] += 1
+            return errors
+        if skip_test or reassemble_function == skip_reassemble:
+            print(bcolors.warning(" No testing"))
+            return errors
+        with _test_lock:
+            if not test(exec_wrapper):
+                errors["test"] += 1
+    return errors
+
+
 def disassemble_reassemble_test(
     make_dir,
     binary,
@@ -336,97 +633,66 @@ def disassemble_reassemble_test(
     extra_ddisasm_flags=[],
     cfg_checks=None,
     upload=True,
+    jobs=None,
+    scratch=False,
 ):
     """
     Disassemble, reassemble and test an example with the given compilers and
     optimizations.
+
+    Each compiler and optimization pair is built in its own copy of the
+    example, and up to 'jobs' of them (default: $E2E_CELL_JOBS or 1) are
+    tested at the same time. If 'jobs' is 1, the example is built in place,
+    unless 'scratch' is true.
     """
     assert len(c_compilers) == len(cxx_compilers)
-    compile_errors = 0
-    disassembly_errors = 0
-    reassembly_errors = 0
-    link_errors = 0
-    test_errors = 0
-    gtirb_errors = 0
-    with cd(make_dir):
-        for compiler, cxx_compiler in zip(c_compilers, cxx_compilers):
-            for optimization in optimizations:
-                print(
-                    bcolors.okblue(
-                        "Project",
-                        str(make_dir),
-                        "with",
-                        compiler,
-                        "and",
-                        optimization,
-                        *extra_compile_flags
-                    )
-                )
-                if not compile(
-                    compiler,
-                    cxx_compiler,
-                    optimization,
-                    extra_compile_flags,
-                    exec_wrapper,
-                    arch,
-                ):
-                    compile_errors += 1
-                    continue
-
-                gtirb_filename = binary + ".gtirb"
-                success, time = disassemble(
-                    binary,
-                    None,
-                    strip_exe,
-                    strip,
-                    sstrip,
-                    extra_args=["--ir", gtirb_filename] + extra_ddisasm_flags,
-                )
+    cells = [
+        (compiler, cxx_compiler, optimization)
+        for compiler, cxx_compiler in zip(c_compilers, cxx_compilers)
+        for optimization in optimizations
+    ]
+    options = dict(
+        extra_compile_flags=extra_compile_flags,
+        extra_reassemble_flags=extra_reassemble_flags,
+        extra_link_flags=extra_link_flags,
+        reassembly_compiler=reassembly_compiler,
+        linker=linker,
+        strip_exe=strip_exe,
+        strip=strip,
+        sstrip=sstrip,
+        reassemble_function=reassemble_function,
+        skip_test=skip_test,
+        exec_wrapper=exec_wrapper,
+        arch=arch,
+        extra_ddisasm_flags=extra_ddisasm_flags,
+        cfg_checks=cfg_checks,
+        upload=upload,
+    )
 
-                # Do some GTIRB checks
-                module = gtirb.IR.load_protobuf(gtirb_filename).modules[0]
-                gtirb_errors += check_gtirb.run_checks(
-                    module, cfg_checks or []
+    jobs = min(jobs or CELL_JOBS, len(cells))
+    errors = collections.Counter()
+    if jobs <= 1:
+        for cell in cells:
+            errors += disassemble_reassemble_cell(
+                make_dir, binary, *cell, **options, scratch=scratch
+            )
+    else:
+        with cell_pool(jobs) as executor:
+            futures = [
+                executor.submit(
+                    disassemble_reassemble_cell,
+                    make_dir,
+                    binary,
+                    *cell,
+                    **options,
+                    scratch=True,
                 )
+                for cell in cells
+            ]
+            for future in futures:
+                errors += future.result()
 
-                if upload:
-                    asm_db.upload(
-                        os.path.basename(make_dir),
-                        binary + ".s",
-                        [compiler, cxx_compiler],
-                        [optimization] + extra_compile_flags,
-                        strip,
-                    )
-                print("Time " + str(time))
-                if not success:
-                    disassembly_errors += 1
-                    continue
-                if not reassemble_function(
-                    reassembly_compiler, binary, extra_reassemble_flags
-                ):
-                    reassembly_errors += 1
-                    continue
-                if linker and not link(
-                    linker,
-                    binary,
-                    [Path(binary).with_suffix(".o").name],
-                    extra_link_flags,
-                ):
-                    link_errors += 1
-                    continue
-                if skip_test or reassemble_function == skip_reassemble:
-                    print(bcolors.warning(" No testing"))
-                    continue
-                if not test(exec_wrapper):
-                    test_errors += 1
-    total_errors = (
-        compile_errors
-        + gtirb_errors
-        + disassembly_errors
-        + reassembly_errors
-        + link_errors
-        + test_errors
-    )
+    total_errors = sum(errors.values())
     return total_errors == 0
 
 
@@ -460,6 +726,12 @@ if __name__ == "__main__":
     parser.add_argument(
         "--skip_reassemble", help="skip reassemble", action="store_true"
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="number of compiler and optimization pairs to test in parallel"
+        " (default: $E2E_CELL_JOBS or 1)",
+    )
 
     args = parser.parse_args()
     disassemble_reassemble_test(
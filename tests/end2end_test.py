@@ -1,17 +1,35 @@
+import argparse
+import concurrent.futures
+import json
 import os
+import statistics
 import sys
 import platform
 import unittest
 import subprocess
 from pathlib import Path
+from timeit import default_timer as timer
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 import yaml
 
 from disassemble_reassemble_check import (
+    cell_pool,
     disassemble_reassemble_test as drt,
     skip_reassemble,
 )
 
+# YAML configs to run (default: all) and scheduling options. These can also
+# be given on the command line.
+CONFIGS = []
+SHARD = os.getenv("E2E_SHARD", "1/1")
+JOBS = int(os.getenv("E2E_JOBS", "1"))
+DURATIONS = os.getenv("E2E_DURATIONS", None)
+
+# Expected duration of a case without a recorded duration if no durations
+# are recorded at all.
+DEFAULT_DURATION = 60.0
+
 
 def compatible_test(config, test):
     # Check the test case is compatible with this platform.
@@ -37,13 +55,173 @@ def compatible_test(config, test):
     return True
 
 
+class Case(NamedTuple):
+    """
+    One compiler and optimization of one test of a YAML config.
+    """
+
+    config: str
+    index: int
+    test: dict
+    compiler: str
+    cxx_compiler: str
+    optimization: str
+
+    @property
+    def id(self) -> str:
+        return ":".join(
+            (
+                Path(self.config).name,
+                str(self.index),
+                self.test["name"],
+                self.compiler,
+                self.optimization,
+            )
+        )
+
+
+def load_cases(
+    configs, skipped: Optional[List[str]] = None
+) -> Tuple[List[Case], Dict[str, dict]]:
+    """
+    Expand the YAML configs into the cases compatible with this host.
+
+    Returns the cases and the parsed configs, by path. If 'skipped' is a
+    list, the tests that are not compatible with this host are appended to
+    it, as "<config>:<index>:<name>".
+    """
+    cases = []
+    parsed = {}
+    for path in configs:
+        with open(str(path)) as f:
+            config = yaml.safe_load(f)
+        parsed[str(path)] = config
+        for index, test in enumerate(config["tests"]):
+            if not compatible_test(config, test):
+                if skipped is not None:
+                    skipped.append(
+                        ":".join((Path(path).name, str(index), test["name"]))
+                    )
+                continue
+            build = test["build"]
+            for compiler, cxx_compiler in zip(build["c"], build["cpp"]):
+                for optimization in build["optimizations"]:
+                    cases.append(
+                        Case(
+                            str(path),
+                            index,
+                            test,
+                            compiler,
+                            cxx_compiler,
+                            optimization,
+                        )
+                    )
+    return cases, parsed
+
+
+def load_durations(path) -> Dict[str, float]:
+    """
+    Load the case durations recorded by previous runs.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_durations(path, durations: Dict[str, float]):
+    """
+    Merge the given case durations into the file 'path'.
+    """
+    if not path:
+        return
+    recorded = load_durations(path)
+    recorded.update(durations)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(recorded, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def schedule(
+    cases: List[Case], shard: str, durations: Dict[str, float]
+) -> List[Case]:
+    """
+    Select the cases of the shard 'i/N', longest expected first.
+
+    Cases are assigned longest first to the least loaded of the N shards,
+    so that the shards take about the same time. All shards must use the
+    same recorded durations to agree on the assignment.
+    """
+    index, count = (int(n) for n in shard.split("/"))
+    if not 1 <= index <= count:
+        raise ValueError("invalid shard: {}".format(shard))
+
+    default = (
+        statistics.median(durations.values())
+        if durations
+        else DEFAULT_DURATION
+    )
+
+    def expected(case):
+        return durations.get(case.id, default)
+
+    cases = sorted(cases, key=lambda case: (-expected(case), case.id))
+    loads = [0.0] * count
+    selected = []
+    for case in cases:
+        shard_index = loads.index(min(loads))
+        loads[shard_index] += expected(case)
+        if shard_index == index - 1:
+            selected.append(case)
+    return selected
+
+
+def example_args(config):
+    """
+    Get the arguments of disassemble_reassemble_test for a test config.
+    """
+    args = {
+        "extra_compile_flags": config["build"]["flags"],
+        "extra_reassemble_flags": config["reassemble"]["flags"],
+        "extra_link_flags": config.get("link", {}).get("flags", []),
+        "linker": config.get("link", {}).get("linker"),
+        "reassembly_compiler": config["reassemble"]["compiler"],
+        "c_compilers": config["build"]["c"],
+        "cxx_compilers": config["build"]["cpp"],
+        "optimizations": config["build"]["optimizations"],
+        "strip_exe": config["test"].get("strip_exe", "strip-dummy"),
+        "strip": config["test"].get("strip", False),
+        "sstrip": config["test"].get("sstrip", False),
+        "skip_test": config["test"].get("skip", False),
+        "cfg_checks": config["test"].get("cfg_checks"),
+        "exec_wrapper": config["test"].get("wrapper"),
+        "arch": config.get("arch"),
+        "extra_ddisasm_flags": config.get("disassemble", {}).get("flags", []),
+    }
+    if config["reassemble"].get("skip", False):
+        args["reassemble_function"] = skip_reassemble
+    return args
+
+
+def run_case(case: Case, scratch=False) -> Tuple[bool, float]:
+    """
+    Run one case and return whether it passed and how long it took.
+    """
+    path = Path(case.test["path"]) / case.test["name"]
+    binary = case.test.get("binary", case.test["name"])
+    args = example_args(case.test)
+    args["c_compilers"] = [case.compiler]
+    args["cxx_compilers"] = [case.cxx_compiler]
+    args["optimizations"] = [case.optimization]
+    start = timer()
+    success = drt(path, binary, **args, jobs=1, scratch=scratch)
+    return success, timer() - start
+
+
 class TestExamples(unittest.TestCase):
     def setUp(self):
-        self.configs = Path("./tests/").glob("*.yaml")
-        if __name__ == "__main__" and sys.argv[1:]:
-            self.configs = [
-                arg for arg in sys.argv[1:] if arg.endswith(".yaml")
-            ]
+        self.configs = CONFIGS or Path("./tests/").glob("*.yaml")
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
@@ -60,51 +238,77 @@ class TestExamples(unittest.TestCase):
         )
 
     def test_examples(self):
-        for path in self.configs:
-            # Parse YAML config file.
-            with open(str(path)) as f:
-                config = yaml.safe_load(f)
-            platform_compatible = compatible_test(config, {})
-            # Run setup command.
-            if platform_compatible and "setup" in config:
-                subprocess.run(config["setup"])
-            # Run all test cases for this host.
-            for test in config["tests"]:
-                with self.subTest(test=test):
-                    if not compatible_test(config, test):
-                        self.skipTest("skipping incompatible test")
-                    self.disassemble_example(test)
-            # Run teardown command.
-            if platform_compatible and "teardown" in config:
-                subprocess.run(config["teardown"])
-
-    def disassemble_example(self, config):
-        path = Path(config["path"]) / config["name"]
-        binary = config.get("binary", config["name"])
-        args = {
-            "extra_compile_flags": config["build"]["flags"],
-            "extra_reassemble_flags": config["reassemble"]["flags"],
-            "extra_link_flags": config.get("link", {}).get("flags", []),
-            "linker": config.get("link", {}).get("linker"),
-            "reassembly_compiler": config["reassemble"]["compiler"],
-            "c_compilers": config["build"]["c"],
-            "cxx_compilers": config["build"]["cpp"],
-            "optimizations": config["build"]["optimizations"],
-            "strip_exe": config["test"].get("strip_exe", "strip-dummy"),
-            "strip": config["test"].get("strip", False),
-            "sstrip": config["test"].get("sstrip", False),
-            "skip_test": config["test"].get("skip", False),
-            "cfg_checks": config["test"].get("cfg_checks"),
-            "exec_wrapper": config["test"].get("wrapper"),
-            "arch": config.get("arch"),
-            "extra_ddisasm_flags": config.get("disassemble", {}).get(
-                "flags", []
-            ),
-        }
-        if config["reassemble"].get("skip", False):
-            args["reassemble_function"] = skip_reassemble
-        self.assertTrue(drt(path, binary, **args))
+        skipped = []
+        cases, configs = load_cases(self.configs, skipped)
+        durations = load_durations(DURATIONS)
+        cases = schedule(cases, SHARD, durations)
+
+        # Report the tests that do not run on this host, so that a wrong
+        # platform filter does not look like a smaller, passing suite.
+        for test in skipped:
+            with self.subTest(test=test):
+                self.skipTest("skipping incompatible test")
+
+        # Run setup commands.
+        used_configs = sorted({case.config for case in cases})
+        for path in used_configs:
+            if "setup" in configs[path]:
+                subprocess.run(configs[path]["setup"])
+
+        new_durations = {}
+        try:
+            if JOBS <= 1:
+                for case in cases:
+                    with self.subTest(case=case.id):
+                        success, duration = run_case(case)
+                        new_durations[case.id] = duration
+                        self.assertTrue(success)
+            else:
+                with cell_pool(JOBS) as executor:
+                    futures = {
+                        executor.submit(run_case, case, True): case
+                        for case in cases
+                    }
+                    for future in concurrent.futures.as_completed(futures):
+                        case = futures[future]
+                        with self.subTest(case=case.id):
+                            success, duration = future.result()
+                            new_durations[case.id] = duration
+                            self.assertTrue(success)
+        finally:
+            save_durations(DURATIONS, new_durations)
+
+            # Run teardown commands.
+            for path in used_configs:
+                if "teardown" in configs[path]:
+                    subprocess.run(configs[path]["teardown"])
 
 
 if __name__ == "__main__":
-    unittest.main(argv=sys.argv[:1])
+    parser = argparse.ArgumentParser(description="Run end-to-end tests.")
+    parser.add_argument("configs", nargs="*", help="YAML configs to run")
+    parser.add_argument(
+        "--shard",
+        default=SHARD,
+        help="run only the i-th of N shards of the cases, given as i/N",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=JOBS,
+        help="number of cases to run in parallel",
+    )
+    parser.add_argument(
+        "--durations",
+        default=DURATIONS,
+        help="JSON file of case durations used to balance the shards; "
+        "updated with the durations of this run",
+    )
+    args, unittest_args = parser.parse_known_args()
+    CONFIGS, SHARD, JOBS, DURATIONS = (
+        args.configs,
+        args.shard,
+        args.jobs,
+        args.durations,
+    )
+    unittest.main(argv=sys.argv[:1] + unittest_args)
@@ -1,5 +1,6 @@
 import os
 import platform
+import subprocess
 import tempfile
 import unittest
 from disassemble_reassemble_check import (
@@ -103,6 +104,139 @@ class ExtraArgsTest(unittest.TestCase):
                 self.assertNotIn("bad-hint", invalid_text)
                 self.assertNotIn("0x100000", invalid_text)
 
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_checkpoints(self):
+        """Test `--checkpoint-dir' and `--resume-from'. Resuming after a
+        pass from its checkpoint gives the same listing as an
+        uninterrupted run.
+        """
+        slugs = [
+            "disassembly",
+            "SCC-analysis",
+            "no-return-analysis",
+            "function-inference",
+        ]
+        with cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+
+            with tempfile.TemporaryDirectory() as checkpoint_dir:
+                self.assertTrue(
+                    disassemble(
+                        "ex",
+                        "ex.s",
+                        extra_args=["--checkpoint-dir", checkpoint_dir],
+                    )[0]
+                )
+                expected = Path("ex.s").read_text()
+                for slug in slugs:
+                    checkpoint = Path(checkpoint_dir) / (slug + ".gtirb")
+                    self.assertTrue(checkpoint.exists(), checkpoint)
+                    gtirb.IR.load_protobuf(str(checkpoint))
+
+                for slug in slugs:
+                    with self.subTest(resume_from=slug):
+                        completed = subprocess.run(
+                            [
+                                "ddisasm",
+                                "--checkpoint-dir",
+                                checkpoint_dir,
+                                "--resume-from",
+                                slug,
+                                "--asm",
+                                "ex_resumed.s",
+                            ]
+                        )
+                        self.assertEqual(completed.returncode, 0)
+                        self.assertEqual(
+                            Path("ex_resumed.s").read_text(), expected
+                        )
+
+        # Checkpoints are rejected for archives with several modules.
+        with cd(ex_dir / "ex_static_lib"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+            with tempfile.TemporaryDirectory() as checkpoint_dir:
+                completed = subprocess.run(
+                    [
+                        "ddisasm",
+                        "libmsg.a",
+                        "--ir",
+                        "libmsg.gtirb",
+                        "--checkpoint-dir",
+                        checkpoint_dir,
+                    ],
+                    stderr=subprocess.PIPE,
+                    encoding="utf-8",
+                )
+                self.assertEqual(completed.returncode, 1)
+                self.assertIn(
+                    "not supported for inputs with multiple modules",
+                    completed.stderr,
+                )
+                self.assertEqual(os.listdir(checkpoint_dir), [])
+
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_incremental_hints(self):
+        """Test `--incremental-dir'. A second run with the same hints
+        reuses the checkpoints of the first one, and a run with a new
+        hint reruns the passes and takes the hint into account.
+        """
+
+        def main_block():
+            ir = gtirb.IR.load_protobuf("ex.gtirb")
+            m = ir.modules[0]
+            return next(
+                sym for sym in m.symbols if sym.name == "main"
+            ).referent
+
+        with cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+
+            with tempfile.TemporaryDirectory() as state_dir:
+                with tempfile.NamedTemporaryFile(mode="w") as hints_file:
+                    args = [
+                        "--incremental-dir",
+                        state_dir,
+                        "--hints",
+                        hints_file.name,
+                    ]
+                    checkpoint = Path(state_dir) / "disassembly.gtirb"
+                    state = Path(state_dir) / "incremental-state"
+
+                    self.assertTrue(
+                        disassemble("ex", format="--ir", extra_args=args)[0]
+                    )
+                    self.assertIsInstance(main_block(), gtirb.CodeBlock)
+                    self.assertTrue(checkpoint.exists())
+                    first_state = state.read_text()
+                    self.assertIn("disassembly ", first_state)
+
+                    # Nothing changed: every pass is skipped.
+                    mtime = checkpoint.stat().st_mtime_ns
+                    self.assertTrue(
+                        disassemble("ex", format="--ir", extra_args=args)[0]
+                    )
+                    self.assertIsInstance(main_block(), gtirb.CodeBlock)
+                    self.assertEqual(checkpoint.stat().st_mtime_ns, mtime)
+                    self.assertEqual(state.read_text(), first_state)
+
+                    # A new hint for the first pass reruns all the passes.
+                    print(
+                        "disassembly.invalid\t{}\tuser-provided-hint".format(
+                            main_block().address
+                        ),
+                        file=hints_file,
+                        flush=True,
+                    )
+                    self.assertTrue(
+                        disassemble("ex", format="--ir", extra_args=args)[0]
+                    )
+                    self.assertIsInstance(main_block(), gtirb.DataBlock)
+                    self.assertNotEqual(state.read_text(), first_state)
+
     @unittest.skipUnless(
         os.path.exists("./build/lib/libfunctors.so")
         and platform.system() == "Linux",
@@ -6,7 +6,7 @@ from pathlib import Path
 import gtirb
 import yaml
 
-from check_gtirb import lookup_sym
+from check_gtirb import ModuleIndex
 from disassemble_reassemble_check import compile, disassemble, cd
 
 ex_dir = Path("./examples/")
@@ -57,13 +57,15 @@ class TestJumptableCallEdge(unittest.TestCase):
 
                 ex_ir = gtirb.IR.load_protobuf(gtirb_path)
                 module = ex_ir.modules[0]
+                index = ModuleIndex(module)
 
                 # Locate the jumptable where the functions are called
                 funcs = {"one", "two", "three", "four"}
                 for node in module.cfg_nodes:
 
                     targets = {
-                        lookup_sym(edge.target) for edge in node.outgoing_edges
+                        index.lookup_sym(edge.target)
+                        for edge in node.outgoing_edges
                     }
                     if funcs.issubset(targets):
                         jumptable = node
@@ -74,7 +76,7 @@ class TestJumptableCallEdge(unittest.TestCase):
 
                 # The edges to the functions should be calls.
                 for edge in jumptable.outgoing_edges:
-                    if lookup_sym(edge.target) not in funcs:
+                    if index.lookup_sym(edge.target) not in funcs:
                         continue
 
                     self.assertEqual(edge.label.type, gtirb.Edge.Type.Call)
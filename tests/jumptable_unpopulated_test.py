@@ -5,7 +5,7 @@ from pathlib import Path
 
 import gtirb
 
-from check_gtirb import lookup_sym
+from check_gtirb import ModuleIndex
 from disassemble_reassemble_check import compile, disassemble, cd
 from gtirb.cfg import EdgeType
 
@@ -28,6 +28,7 @@ class TestUnpopulatedJumpTable(unittest.TestCase):
 
             ex_ir = gtirb.IR.load_protobuf(gtirb_path)
             module = ex_ir.modules[0]
+            index = ModuleIndex(module)
 
             # Find the function with the jump table.
             fun_sym = next(sym for sym in module.symbols if sym.name == "fun")
@@ -49,14 +50,14 @@ class TestUnpopulatedJumpTable(unittest.TestCase):
 
             block = fallthrough_from(fun_block, n=3)
             target_syms = [
-                lookup_sym(edge.target) for edge in block.outgoing_edges
+                index.lookup_sym(edge.target) for edge in block.outgoing_edges
             ]
             self.assertEqual(4, len(target_syms))
             # Check that there are edges to the functions.
             dest_set = set()
             for edge1 in block.outgoing_edges:
                 for edge2 in edge1.target.outgoing_edges:
-                    dest_set.add(lookup_sym(edge2.target))
+                    dest_set.add(index.lookup_sym(edge2.target))
             self.assertTrue({"one", "two", "three", "four"}.issubset(dest_set))
 
 
@@ -14,6 +14,8 @@ from pathlib import Path
 from typing import Optional, Tuple
 import gtirb
 
+from souffle_relations import Relations
+
 if platform.system() == "Linux":
     import lief
 
@@ -215,6 +217,72 @@ class AuxDataTests(unittest.TestCase):
             # compare the relations directories
             subprocess.check_call(["diff", "dbg", "aux"])
 
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_souffle_relations_filter(self):
+        """Test selecting relations with `--souffle-relations'."""
+
+        with cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+            self.assertTrue(
+                disassemble(
+                    "ex",
+                    format="--ir",
+                    extra_args=[
+                        "--souffle-relations",
+                        "disassembly.stack_def_use.*,*.block_points",
+                    ],
+                )[0]
+            )
+            m = gtirb.IR.load_protobuf("ex.gtirb").modules[0]
+
+            self.assertEqual(set(m.aux_data["souffleFacts"].data), set())
+            outputs = set(m.aux_data["souffleOutputs"].data)
+            self.assertIn("disassembly.block_points", outputs)
+            self.assertIn("disassembly.stack_def_use.def_used", outputs)
+            for name in outputs:
+                self.assertTrue(
+                    name.startswith("disassembly.stack_def_use.")
+                    or name.endswith(".block_points"),
+                    name,
+                )
+
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_binary_souffle_relations(self):
+        """Test `--binary-souffle-relations' equivalence to CSV."""
+
+        with cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+
+            modules = []
+            for extra_args in ([], ["--binary-souffle-relations"]):
+                self.assertTrue(
+                    disassemble(
+                        "ex",
+                        format="--ir",
+                        extra_args=["-F", "--with-souffle-relations"]
+                        + extra_args,
+                    )[0]
+                )
+                modules.append(gtirb.IR.load_protobuf("ex.gtirb").modules[0])
+            text, binary = modules
+            self.assertNotIn("souffleSymbols", text.aux_data)
+            self.assertIn("souffleSymbols", binary.aux_data)
+
+            for table in ("souffleFacts", "souffleOutputs"):
+                text_relations = Relations(text, table)
+                binary_relations = Relations(binary, table)
+                self.assertEqual(set(text_relations), set(binary_relations))
+                for name, relation in text_relations.items():
+                    with self.subTest(name=name):
+                        self.assertEqual(
+                            list(relation.rows()),
+                            list(binary_relations[name].rows()),
+                        )
+
 
 class MovedLabelTests(unittest.TestCase):
     @unittest.skipUnless(
@@ -0,0 +1,216 @@
+"""
+Flag performance regressions recorded by asm_db between two commits.
+
+Runs are grouped by example, compilers, compiler arguments, strip and
+platform. A measure of a group (wall time, peak RSS or the wall time of a
+pass) is flagged when its runs at the candidate commit are significantly
+larger than at the baseline commit, using a one-sided Mann-Whitney U test,
+and its median grew by more than a threshold.
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+from typing import Dict, List, NamedTuple, Tuple
+
+import asm_db
+
+Key = Tuple
+
+
+class Regression(NamedTuple):
+    """
+    A measure of a group of runs that is larger at the candidate commit.
+    """
+
+    key: Key
+    measure: str
+    baseline: float
+    candidate: float
+    p_value: float
+
+    @property
+    def ratio(self) -> float:
+        return self.candidate / self.baseline if self.baseline else math.inf
+
+
+def fetch_runs(conn, commit) -> Dict[Tuple[Key, str], List[float]]:
+    """
+    Get the measures of the runs of 'commit', by group and measure.
+    """
+    runs = {}
+    cursor = conn.cursor()
+    cursor.execute(
+        asm_db.DB.query(
+            """
+            SELECT name, compiler, compiler_args, strip, platform,
+                   wall_time, peak_rss
+            FROM disassembled
+            WHERE ci_commit_sha = %s AND wall_time IS NOT NULL
+        """
+        ),
+        (commit,),
+    )
+    for *key, wall_time, peak_rss in cursor.fetchall():
+        runs.setdefault((tuple(key), "wall_time"), []).append(wall_time)
+        if peak_rss is not None:
+            runs.setdefault((tuple(key), "peak_rss"), []).append(peak_rss)
+
+    cursor.execute(
+        asm_db.DB.query(
+            """
+            SELECT d.name, d.compiler, d.compiler_args, d.strip, d.platform,
+                   p.pass, SUM(p.wall_time)
+            FROM pass_timing p
+            JOIN disassembled d ON p.disassembled_id = d.disassembled_id
+            WHERE d.ci_commit_sha = %s
+            GROUP BY d.disassembled_id, d.name, d.compiler, d.compiler_args,
+                     d.strip, d.platform, p.pass
+        """
+        ),
+        (commit,),
+    )
+    for *key, pass_name, wall_time in cursor.fetchall():
+        measure = "pass:" + pass_name
+        runs.setdefault((tuple(key), measure), []).append(wall_time)
+    return runs
+
+
+def mann_whitney_greater(baseline, candidate) -> float:
+    """
+    Compute the p-value of the hypothesis that 'candidate' values tend to be
+    greater than 'baseline' values (normal approximation of the U statistic,
+    corrected for ties).
+    """
+    n1, n2 = len(baseline), len(candidate)
+    values = sorted([(v, 0) for v in baseline] + [(v, 1) for v in candidate])
+
+    # Rank the values, giving tied values their average rank.
+    rank_sum = 0.0
+    ties = 0.0
+    i = 0
+    while i < len(values):
+        j = i
+        while j < len(values) and values[j][0] == values[i][0]:
+            j += 1
+        rank = (i + j + 1) / 2
+        rank_sum += rank * sum(1 for _, group in values[i:j] if group)
+        ties += (j - i) ** 3 - (j - i)
+        i = j
+
+    n = n1 + n2
+    u = rank_sum - n2 * (n2 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 1 - statistics.NormalDist().cdf(z)
+
+
+def sign_test_greater(slower, total) -> float:
+    """
+    Compute the p-value of 'slower' or more of 'total' groups being slower if
+    slowdowns and speedups were equally likely.
+    """
+    if total == 0:
+        return 1.0
+    return sum(math.comb(total, k) for k in range(slower, total + 1)) / (
+        2**total
+    )
+
+
+def find_regressions(
+    baseline_runs, candidate_runs, alpha, threshold, min_samples
+) -> Tuple[List[Regression], int, int]:
+    """
+    Compare the runs of two commits.
+
+    Returns the regressions, the number of groups and measures compared and
+    the number of those whose median is larger at the candidate.
+    """
+    regressions = []
+    compared = 0
+    slower = 0
+    for (key, measure), candidate in sorted(candidate_runs.items()):
+        baseline = baseline_runs.get((key, measure), [])
+        if len(baseline) < min_samples or len(candidate) < min_samples:
+            continue
+        compared += 1
+        baseline_median = statistics.median(baseline)
+        candidate_median = statistics.median(candidate)
+        if candidate_median <= baseline_median:
+            continue
+        slower += 1
+        p_value = mann_whitney_greater(baseline, candidate)
+        if p_value < alpha and candidate_median > baseline_median * (
+            1 + threshold
+        ):
+            regressions.append(
+                Regression(
+                    key, measure, baseline_median, candidate_median, p_value
+                )
+            )
+    return regressions, compared, slower
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Flag performance regressions against a baseline commit."
+    )
+    parser.add_argument("--baseline", required=True, help="baseline commit")
+    parser.add_argument(
+        "--commit",
+        default=os.environ.get("CI_COMMIT_SHA"),
+        help="candidate commit (default: $CI_COMMIT_SHA)",
+    )
+    parser.add_argument(
+        "--alpha", type=float, default=0.05, help="significance level"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.05,
+        help="minimum relative growth of the median to report",
+    )
+    parser.add_argument(
+        "--min-samples",
+        type=int,
+        default=3,
+        help="minimum runs per commit to compare a group",
+    )
+    args = parser.parse_args()
+    if not args.commit:
+        parser.error("--commit is required when CI_COMMIT_SHA is not set")
+
+    conn = asm_db.DB()
+    if not conn:
+        sys.exit("ERROR: no database; set DATABASE_URL")
+
+    regressions, compared, slower = find_regressions(
+        fetch_runs(conn, args.baseline),
+        fetch_runs(conn, args.commit),
+        args.alpha,
+        args.threshold,
+        args.min_samples,
+    )
+    for regression in regressions:
+        print(
+            "{}: {} {:.3g} -> {:.3g} ({:+.1%}, p={:.3g})".format(
+                " ".join(str(field) for field in regression.key),
+                regression.measure,
+                regression.baseline,
+                regression.candidate,
+                regression.ratio - 1,
+                regression.p_value,
+            )
+        )
+    print(
+        "{} of {} measures slower (sign test p={:.3g}), {} regressions".format(
+            slower,
+            compared,
+            sign_test_greater(slower, compared),
+            len(regressions),
+        )
+    )
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+import unittest
+
+import asm_db
+from perf_report import (
+    Regression,
+    find_regressions,
+    mann_whitney_greater,
+    sign_test_greater,
+)
+
+KEY = ("ex1", "gcc g++", "-O0", False, "Linux")
+
+
+class MannWhitneyTest(unittest.TestCase):
+    # Reference p-values from R:
+    # wilcox.test(candidate, baseline, alternative="greater", exact=FALSE)
+
+    def test_separated(self):
+        baseline, candidate = [1, 2, 3, 4, 5], [6, 7, 8, 9, 10]
+        self.assertAlmostEqual(
+            mann_whitney_greater(baseline, candidate), 0.006093, places=6
+        )
+        self.assertAlmostEqual(
+            mann_whitney_greater(candidate, baseline), 0.9967, places=4
+        )
+
+    def test_ties(self):
+        self.assertAlmostEqual(
+            mann_whitney_greater([1, 2, 2, 3], [2, 3, 3, 4]),
+            0.08602,
+            places=5,
+        )
+
+    def test_all_equal(self):
+        self.assertEqual(mann_whitney_greater([1, 1, 1], [1, 1, 1]), 1.0)
+
+    def test_sign_test(self):
+        self.assertEqual(sign_test_greater(8, 10), 56 / 1024)
+        self.assertEqual(sign_test_greater(0, 10), 1.0)
+        self.assertEqual(sign_test_greater(0, 0), 1.0)
+
+
+class FindRegressionsTest(unittest.TestCase):
+    def test_find_regressions(self):
+        baseline = {
+            (KEY, "wall_time"): [1.0, 1.1, 0.9, 1.0, 1.05],
+            (KEY, "peak_rss"): [100, 101, 99, 100, 100],
+            (KEY, "pass:disassembly"): [0.5, 0.5, 0.6, 0.4, 0.5],
+            (KEY, "pass:SCC analysis"): [0.1, 0.1, 0.1],
+        }
+        candidate = {
+            # Significantly and substantially slower.
+            (KEY, "wall_time"): [1.5, 1.6, 1.4, 1.5, 1.55],
+            # Significantly but only slightly larger.
+            (KEY, "peak_rss"): [102, 102, 103, 102, 102],
+            # Not slower.
+            (KEY, "pass:disassembly"): [0.4, 0.5, 0.5, 0.5, 0.4],
+            # Too few samples.
+            (KEY, "pass:SCC analysis"): [1.0, 1.0],
+            # No baseline.
+            (KEY, "pass:function inference"): [1.0, 1.0, 1.0],
+        }
+        regressions, compared, slower = find_regressions(
+            baseline, candidate, alpha=0.05, threshold=0.05, min_samples=3
+        )
+        self.assertEqual(compared, 3)
+        self.assertEqual(slower, 2)
+        self.assertEqual(
+            regressions,
+            [
+                Regression(
+                    KEY,
+                    "wall_time",
+                    1.0,
+                    1.5,
+                    mann_whitney_greater(
+                        baseline[(KEY, "wall_time")],
+                        candidate[(KEY, "wall_time")],
+                    ),
+                )
+            ],
+        )
+        self.assertLess(regressions[0].p_value, 0.05)
+        self.assertAlmostEqual(regressions[0].ratio, 1.5)
+
+
+class LoadStatsTest(unittest.TestCase):
+    def test_load_stats(self):
+        stats = {
+            "ddisasm_version": "1.0",
+            "passes": [
+                {
+                    "module": "ex",
+                    "pass": "disassembly",
+                    "phases": [
+                        {
+                            "phase": "load",
+                            "wall_time": 0.5,
+                            "cpu_time": 0.4,
+                            "peak_rss_delta": 1024,
+                        },
+                        {
+                            "phase": "analyze",
+                            "wall_time": 2.0,
+                            "cpu_time": 7.5,
+                            "peak_rss_delta": 4096,
+                        },
+                    ],
+                    "relations": {"code_in_block": 120, "instruction": 200},
+                },
+                {
+                    "module": "ex",
+                    "pass": "SCC analysis",
+                    "phases": [
+                        {
+                            "phase": "analyze",
+                            "wall_time": 0.1,
+                            "cpu_time": 0.1,
+                            "peak_rss_delta": 0,
+                        }
+                    ],
+                    "relations": {},
+                },
+            ],
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "stats.json")
+            with open(path, "w") as f:
+                json.dump(stats, f)
+            timings, instruction_count = asm_db.load_stats(path)
+
+        self.assertEqual(
+            timings,
+            [
+                ("ex", "disassembly", "load", 0.5, 0.4, 1024),
+                ("ex", "disassembly", "analyze", 2.0, 7.5, 4096),
+                ("ex", "SCC analysis", "analyze", 0.1, 0.1, 0),
+            ],
+        )
+        self.assertEqual(instruction_count, 120)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import io
+import os
+import platform
+import subprocess
+import unittest
+from pathlib import Path
+
+import gtirb
+
+from disassemble_reassemble_check import compile, cd, disassemble
+
+ex_dir = Path("./examples/")
+
+
+def read_response(stream):
+    """Read one "<status> <size>" header and its payload."""
+    status, size = stream.readline().split()
+    return status, stream.read(int(size))
+
+
+class ServeTest(unittest.TestCase):
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_serve(self):
+        """Test `--serve': several requests are served by one process, and
+        bad requests get an error response without stopping it.
+        """
+        with cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+            self.assertTrue(disassemble("ex", "ex.s")[0])
+            binary = os.path.abspath("ex").encode()
+
+            process = subprocess.Popen(
+                ["ddisasm", "--serve"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+            try:
+                process.stdin.write(b"asm " + binary + b"\n")
+                process.stdin.write(b"ir " + binary + b"\n")
+                process.stdin.write(b"ir " + binary + b".missing\n")
+                process.stdin.write(b"bogus request\n")
+                process.stdin.write(b"asm " + binary + b"\n")
+                process.stdin.close()
+
+                status, payload = read_response(process.stdout)
+                self.assertEqual(status, b"ok")
+                self.assertEqual(payload, Path("ex.s").read_bytes())
+
+                status, payload = read_response(process.stdout)
+                self.assertEqual(status, b"ok")
+                ir = gtirb.IR.load_protobuf_file(io.BytesIO(payload))
+                self.assertEqual(len(ir.modules), 1)
+
+                status, payload = read_response(process.stdout)
+                self.assertEqual(status, b"error")
+                self.assertIn(b"ex.missing", payload)
+
+                status, payload = read_response(process.stdout)
+                self.assertEqual(status, b"error")
+                self.assertIn(b"malformed request", payload)
+
+                status, payload = read_response(process.stdout)
+                self.assertEqual(status, b"ok")
+                self.assertEqual(payload, Path("ex.s").read_bytes())
+
+                self.assertEqual(process.stdout.read(), b"")
+                self.assertEqual(process.wait(timeout=60), 0)
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                process.stdout.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,418 @@
+"""
+Columnar access to the Souffle relations stored in GTIRB by ddisasm
+--with-souffle-relations (the souffleFacts and souffleOutputs AuxData).
+
+Relations are decoded when first accessed, one column at a time, into
+NumPy arrays if NumPy is installed and into `array.array`s (or lists, for
+symbols and records) otherwise. Relation.filter selects tuples with
+conditions evaluated over whole columns.
+
+Both the CSV text and the binary format of ddisasm
+--binary-souffle-relations are supported.
+"""
+import array
+import collections.abc
+import functools
+import io
+import struct
+import sys
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+import gtirb
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Souffle does not store the types of record fields; these mirror the record
+# types known to DatalogIO::serializeRecord.
+RECORD_TYPES = {"r:stack_var": ["s:register", "i:number"]}
+
+# Array type codes and NumPy types of the numeric attribute types.
+_ARRAY_TYPES = {"i": "q", "u": "Q", "f": "d"}
+_NUMPY_TYPES = {"i": "int64", "u": "uint64", "f": "float64"}
+
+# Header of relations in the binary format (see DatalogIO::writeRelationBinary)
+# followed by the arity and the number of tuples.
+BINARY_MAGIC = b"\0SRB\1"
+_BINARY_HEADER = struct.Struct("<IQ")
+
+
+class Attribute(NamedTuple):
+    """
+    An attribute of a relation, e.g. ("EA", "u:address").
+    """
+
+    name: str
+    type: str
+
+
+def parse_type_spec(type_spec: str) -> List[Attribute]:
+    """
+    Parse the type signature of a relation, e.g. "EA:u:address,Reg:s:reg".
+    """
+    attributes = []
+    for spec in type_spec.strip("<>").split(","):
+        name, type_name = spec.split(":", 1)
+        attributes.append(Attribute(name, type_name))
+    return attributes
+
+
+def _parse_record(text: str, type_name: str) -> Tuple[Any, ...]:
+    field_types = RECORD_TYPES[type_name]
+    text = text[1:-1]
+    fields = []
+    # The last field may itself be a record, so only split what we need.
+    for i, field_type in enumerate(field_types):
+        if i == len(field_types) - 1:
+            field = text
+        else:
+            field, text = text.split(", ", 1)
+        fields.append(_converter(field_type)(field))
+    return tuple(fields)
+
+
+def _converter(type_name: str) -> Callable[[str], Any]:
+    """
+    Get the function that decodes a field of the given attribute type.
+    """
+    base_type = type_name.split(":")[0]
+    if base_type == "u" and type_name == "u:address":
+        # Addresses are printed in hexadecimal; int accepts the 0x prefix.
+        return functools.partial(int, base=16)
+    if base_type in ("i", "u"):
+        return int
+    if base_type == "f":
+        return float
+    if base_type == "s":
+        return str
+    if base_type == "r":
+        return functools.partial(_parse_record, type_name=type_name)
+    raise ValueError("cannot parse type: " + type_name)
+
+
+def _struct_format(type_name: str) -> str:
+    """
+    Get the struct format of a value of the given type in the binary format.
+    """
+    base_type = type_name.split(":")[0]
+    if base_type == "s":
+        return "I"
+    if base_type in _ARRAY_TYPES:
+        return _ARRAY_TYPES[base_type]
+    if base_type == "r":
+        return "".join(_struct_format(t) for t in RECORD_TYPES[type_name])
+    raise ValueError("cannot parse type: " + type_name)
+
+
+def _build_value(values: Iterator, type_name: str, symbols: List[str]):
+    base_type = type_name.split(":")[0]
+    if base_type == "s":
+        return symbols[next(values)]
+    if base_type == "r":
+        return tuple(
+            _build_value(values, t, symbols) for t in RECORD_TYPES[type_name]
+        )
+    return next(values)
+
+
+def _decode_binary_column(
+    data: memoryview, count: int, type_name: str, symbols: List[str]
+):
+    base_type = type_name.split(":")[0]
+    if base_type in _ARRAY_TYPES:
+        if numpy is not None:
+            return numpy.frombuffer(
+                data, dtype="<" + _NUMPY_TYPES[base_type][0] + "8", count=count
+            ).astype(_NUMPY_TYPES[base_type])
+        column = array.array(_ARRAY_TYPES[base_type])
+        column.frombytes(data)
+        if sys.byteorder == "big":
+            column.byteswap()
+        return column
+
+    values = [
+        _build_value(iter(fields), type_name, symbols)
+        for fields in struct.iter_unpack("<" + _struct_format(type_name), data)
+    ]
+    if numpy is not None:
+        column = numpy.empty(count, dtype=object)
+        column[:] = values
+        return column
+    return values
+
+
+def _decode_column(fields: List[str], type_name: str):
+    values = map(_converter(type_name), fields)
+    base_type = type_name.split(":")[0]
+    if numpy is not None:
+        if base_type in _NUMPY_TYPES:
+            return numpy.fromiter(
+                values, dtype=_NUMPY_TYPES[base_type], count=len(fields)
+            )
+        column = numpy.empty(len(fields), dtype=object)
+        column[:] = list(values)
+        return column
+    if base_type in _ARRAY_TYPES:
+        return array.array(_ARRAY_TYPES[base_type], values)
+    return list(values)
+
+
+def _select(column, mask):
+    if numpy is not None:
+        return column[mask]
+    selected = [value for value, keep in zip(column, mask) if keep]
+    if isinstance(column, array.array):
+        return array.array(column.typecode, selected)
+    return selected
+
+
+Condition = Callable[[Any], Any]
+
+
+def between(low, high) -> Condition:
+    """
+    Select the values 'v' with low <= v < high.
+    """
+    if numpy is not None:
+        return lambda column: (column >= low) & (column < high)
+    return lambda column: [low <= value < high for value in column]
+
+
+def equal(value) -> Condition:
+    """
+    Select the values equal to 'value'.
+    """
+
+    def mask(column):
+        if numpy is None:
+            return [v == value for v in column]
+        if column.dtype != object:
+            return column == value
+        # Compare records as a whole rather than element-wise.
+        return numpy.fromiter(
+            (v == value for v in column), dtype=bool, count=len(column)
+        )
+
+    return mask
+
+
+def isin(values) -> Condition:
+    """
+    Select the values in 'values'.
+    """
+    values = set(values)
+    if numpy is not None:
+        return lambda column: numpy.fromiter(
+            (v in values for v in column), dtype=bool, count=len(column)
+        )
+    return lambda column: [v in values for v in column]
+
+
+class Relation:
+    """
+    The tuples of a Souffle relation, stored by column.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        type_spec: str,
+        data: Any = "",
+        symbols: Callable[[], List[str]] = list,
+    ):
+        """
+        'data' holds the tuples as text or in the binary format, as str or
+        bytes. 'symbols' returns the symbol table of binary relations.
+        """
+        self.name = name
+        self.attributes = parse_type_spec(type_spec)
+        self._text = data
+        self._fields = None
+        self._columns: Dict[str, Any] = {}
+        self._size = None
+        # The relation and mask this relation was filtered from, if any.
+        self._source = None
+        # The offsets of the columns of a relation in the binary format.
+        self._offsets = None
+        self._symbols = symbols
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            if bytes(data[: len(BINARY_MAGIC)]) == BINARY_MAGIC:
+                self._read_header(memoryview(data))
+            else:
+                self._text = bytes(data).decode("utf-8")
+
+    def _read_header(self, data: memoryview):
+        start = len(BINARY_MAGIC)
+        arity, self._size = _BINARY_HEADER.unpack_from(data, start)
+        if arity != len(self.attributes):
+            raise ValueError(
+                "{}: expected {} attributes, found {}".format(
+                    self.name, len(self.attributes), arity
+                )
+            )
+        offset = start + _BINARY_HEADER.size
+        self._offsets = []
+        for attribute in self.attributes:
+            size = struct.calcsize("<" + _struct_format(attribute.type))
+            self._offsets.append((offset, offset + size * self._size))
+            offset += size * self._size
+        if offset != len(data):
+            raise ValueError("{}: truncated binary relation".format(self.name))
+        self._text = data
+
+    def _split(self) -> List[List[str]]:
+        if self._fields is None:
+            lines = self._text.splitlines()
+            self._fields = [
+                list(column)
+                for column in zip(*(line.split("\t") for line in lines))
+            ] or [[] for _ in self.attributes]
+            self._size = len(lines)
+            self._text = ""
+        return self._fields
+
+    def __len__(self) -> int:
+        if self._size is None:
+            self._split()
+        return self._size
+
+    def column(self, name: str):
+        """
+        Get the values of an attribute, decoding them on first use.
+        """
+        if name not in self._columns:
+            if self._source is not None:
+                relation, mask = self._source
+                self._columns[name] = _select(relation.column(name), mask)
+            elif self._offsets is not None:
+                index = [a.name for a in self.attributes].index(name)
+                start, end = self._offsets[index]
+                symbols = self._symbols()
+                self._columns[name] = _decode_binary_column(
+                    self._text[start:end],
+                    self._size,
+                    self.attributes[index].type,
+                    symbols,
+                )
+            else:
+                index = [a.name for a in self.attributes].index(name)
+                self._columns[name] = _decode_column(
+                    self._split()[index], self.attributes[index].type
+                )
+            # Free the text once every column is decoded.
+            if len(self._columns) == len(self.attributes):
+                self._text = ""
+                self._fields = None
+                self._source = None
+        return self._columns[name]
+
+    __getitem__ = column
+
+    def rows(self) -> Iterator[Tuple[Any, ...]]:
+        """
+        Iterate over the tuples, as Python values.
+        """
+        columns = [self.column(a.name) for a in self.attributes]
+        if numpy is not None:
+            columns = [column.tolist() for column in columns]
+        return zip(*columns)
+
+    def filter(self, **conditions: Condition) -> "Relation":
+        """
+        Select the tuples whose attributes satisfy all the conditions, e.g.
+        ``relation.filter(EA=between(start, end), Reg=equal("RAX"))``.
+
+        Only the columns that are used are selected from this relation.
+        """
+        mask = None
+        for name, condition in conditions.items():
+            column_mask = condition(self.column(name))
+            if mask is None:
+                mask = column_mask
+            elif numpy is not None:
+                mask = mask & column_mask
+            else:
+                mask = [a and b for a, b in zip(mask, column_mask)]
+        if mask is None:
+            return self
+
+        result = Relation.__new__(Relation)
+        result.name = self.name
+        result.attributes = self.attributes
+        result._text = ""
+        result._fields = None
+        result._columns = {}
+        result._size = int(mask.sum()) if numpy is not None else sum(mask)
+        result._source = (self, mask)
+        result._offsets = None
+        result._symbols = self._symbols
+        return result
+
+
+def _read_relation_map(raw: bytes) -> Dict[str, Tuple[str, bytes]]:
+    """
+    Decode a serialized mapping<string,tuple<string,string>> AuxData table,
+    leaving the tuples of each relation as bytes: relations in the binary
+    format are not valid UTF-8, which gtirb requires of strings.
+    """
+    stream = io.BytesIO(raw)
+
+    def read_bytes():
+        (size,) = struct.unpack("<Q", stream.read(8))
+        return stream.read(size)
+
+    (count,) = struct.unpack("<Q", stream.read(8))
+    relations = {}
+    for _ in range(count):
+        name = read_bytes().decode("utf-8")
+        type_spec = read_bytes().decode("utf-8")
+        relations[name] = (type_spec, read_bytes())
+    return relations
+
+
+class Relations(collections.abc.Mapping):
+    """
+    The relations of a module's souffleOutputs or souffleFacts AuxData,
+    by name (e.g. "disassembly.stack_def_use.def_used").
+
+    Each relation is decoded on first access and then cached.
+    """
+
+    def __init__(self, module: gtirb.Module, aux_data: str = "souffleOutputs"):
+        self._module = module
+        # Serialize the table rather than use its data, which gtirb would
+        # fail to decode for relations in the binary format.
+        self._data = _read_relation_map(
+            module.aux_data[aux_data]._to_protobuf().data
+        )
+        self._relations: Dict[str, Relation] = {}
+        self._symbols = None
+
+    def symbols(self, namespace: str) -> List[str]:
+        """
+        Get the symbol table of the binary relations of an analysis pass.
+        """
+        if self._symbols is None:
+            table = self._module.aux_data.get("souffleSymbols")
+            self._symbols = table.data if table is not None else {}
+        return self._symbols[namespace]
+
+    def __getitem__(self, name: str) -> Relation:
+        if name not in self._relations:
+            type_spec, data = self._data[name]
+            namespace = name.split(".", 1)[0]
+            self._relations[name] = Relation(
+                name,
+                type_spec,
+                data,
+                functools.partial(self.symbols, namespace),
+            )
+        return self._relations[name]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -6,7 +6,7 @@ from pathlib import Path
 import gtirb
 import yaml
 
-from check_gtirb import lookup_sym
+from check_gtirb import ModuleIndex
 from disassemble_reassemble_check import compile, disassemble, cd
 
 ex_dir = Path("./examples/")
@@ -61,12 +61,13 @@ class TestStackChkFallthrough(unittest.TestCase):
 
                 ex_ir = gtirb.IR.load_protobuf(gtirb_path)
                 module = ex_ir.modules[0]
+                index = ModuleIndex(module)
 
                 # Locate the PLT block for __stack_chk_fail
                 for node in module.cfg_nodes:
                     if (
                         isinstance(node, gtirb.ProxyBlock)
-                        and lookup_sym(node) == "__stack_chk_fail"
+                        and index.lookup_sym(node) == "__stack_chk_fail"
                     ):
                         proxy = node
                         break
@@ -9,6 +9,8 @@ import unittest
 from pathlib import Path
 import gtirb
 
+from souffle_relations import Relations, between, equal
+
 
 class SnippetTestException(Exception):
     """
@@ -103,82 +105,6 @@ def snippet_bounds(module: gtirb.Module) -> typing.Tuple[int, int]:
     return tuple(bounds)
 
 
-def parse_field(field: str, type_spec: str) -> typing.Any:
-    """
-    Parse a field in a tuple
-    """
-    base_type = type_spec.split(":")[1]
-
-    if base_type in ("i", "u"):
-        # base=0 supports both prefixed hexadecimal and decimal
-        value = int(field, base=0)
-    elif base_type == "s":
-        value = field
-    elif base_type == "r":
-        value = parse_record(field, type_spec)
-    else:
-        raise SnippetTestException("Cannot parse type: " + str(type_spec))
-
-    return value
-
-
-def parse_record(record_str: str, type_spec: str) -> typing.Tuple[typing.Any]:
-    """
-    Parse a record entry using a type spec generator
-    """
-    record_types = {"stack_var": "BaseReg:s:register,StackPos:i:number"}
-    type_name = type_spec.split(":")[2]
-    type_spec = record_types[type_name]
-
-    # strip brackets
-    record_str = record_str.strip("[]")
-
-    field_types = type_spec.split(",")
-    parsed_fields = []
-
-    # we can't just split the fields by ", " since there might be nested
-    # records.
-    for i, t in enumerate(field_types):
-        if i == len(field_types) - 1:
-            field = record_str
-            record_str = ""
-        else:
-            field, record_str = record_str.split(", ", 1)
-
-        parsed_fields.append(parse_field(field, t))
-    return tuple(parsed_fields)
-
-
-def parse_souffle_output(module: gtirb.Module, relation_name: str):
-    """
-    Parse a relation from the souffleOutputs auxdata
-    """
-    type_spec, data = module.aux_data["souffleOutputs"].data[
-        "disassembly." + relation_name
-    ]
-    type_spec = type_spec.strip("<>")
-
-    lines = data.strip().split("\n")
-    if lines[0] == "":
-        # empty relation
-        return
-    for line in lines:
-        fields = line.split("\t")
-
-        parsed_fields = []
-        for field, t in zip(fields, type_spec.split(",")):
-            parsed_fields.append(parse_field(field, t))
-
-        yield tuple(parsed_fields)
-
-
-def in_bounds(bounds: typing.Tuple[int, int], val: int):
-    """
-    Return if a value is within a range
-    """
-    return val >= bounds[0] and val < bounds[1]
-
-
 stack_var_type = typing.Tuple[str, int]
 
 
@@ -189,19 +115,15 @@ def count_stack_def_use_in_snippet(
     """
     Count stack_def_use.def_used tuples for a stack variable in the snippet
 
-    If stack_var is None, count all in_bounds tuples.
+    If stack_var is None, count all tuples in the snippet.
     """
-    count = 0
     bounds = snippet_bounds(module)
-    for def_used in parse_souffle_output(module, "stack_def_use.def_used"):
-        if stack_var_pair is not None and (
-            def_used[1] != stack_var_pair[0]
-            or def_used[3] != stack_var_pair[1]
-        ):
-            continue
-        if in_bounds(bounds, def_used[0]) and in_bounds(bounds, def_used[2]):
-            count += 1
-    return count
+    conditions = {"EA_def": between(*bounds), "EA_used": between(*bounds)}
+    if stack_var_pair is not None:
+        conditions["VarDef"] = equal(stack_var_pair[0])
+        conditions["VarUsed"] = equal(stack_var_pair[1])
+    def_used = Relations(module)["disassembly.stack_def_use.def_used"]
+    return len(def_used.filter(**conditions))
 
 
 class StackVarTests(unittest.TestCase):
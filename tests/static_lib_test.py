@@ -169,3 +169,36 @@ class TestStaticLib(unittest.TestCase):
                         link(re_compiler, "ex", ["ex.o", binary], re_flags)
                     )
                     self.assertTrue(test(wrapper))
+
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_module_jobs(self):
+        """
+        Test that analyzing the modules of an archive concurrently with
+        `--module-jobs' gives the same listings as analyzing them serially.
+        """
+        with cd(ex_dir / "ex_static_lib"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+
+            listings = {}
+            for jobs in (1, 4):
+                asm_dir = Path("libmsg-j{}".format(jobs))
+                self.assertTrue(
+                    disassemble(
+                        "libmsg.a",
+                        str(asm_dir),
+                        format="--asm",
+                        extra_args=["--module-jobs", str(jobs)],
+                    )[0]
+                )
+                listings[jobs] = {
+                    name: (asm_dir / name).read_text()
+                    for name in os.listdir(asm_dir)
+                }
+
+            self.assertEqual(len(listings[1]), 4)
+            self.assertEqual(listings[1].keys(), listings[4].keys())
+            for name in listings[1]:
+                with self.subTest(module=name):
+                    self.assertEqual(listings[1][name], listings[4][name])
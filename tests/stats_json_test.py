@@ -0,0 +1,59 @@
+import json
+import platform
+import unittest
+from pathlib import Path
+
+from disassemble_reassemble_check import compile, cd, disassemble
+
+ex_dir = Path("./examples/")
+
+
+class StatsJsonTest(unittest.TestCase):
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_stats_json(self):
+        """Test the schema of the file written by `--stats-json'."""
+        with cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+            self.assertTrue(
+                disassemble(
+                    "ex", "ex.s", extra_args=["--stats-json", "stats.json"]
+                )[0]
+            )
+            with open("stats.json") as f:
+                stats = json.load(f)
+
+        self.assertIsInstance(stats["ddisasm_version"], str)
+        passes = stats["passes"]
+        self.assertEqual(
+            [p["pass"] for p in passes],
+            [
+                "disassembly",
+                "SCC analysis",
+                "no return analysis",
+                "function inference",
+            ],
+        )
+        for p in passes:
+            self.assertEqual(p["module"], "ex")
+            self.assertTrue(p["phases"])
+            for phase in p["phases"]:
+                self.assertIn(phase["phase"], ("load", "analyze", "transform"))
+                self.assertGreaterEqual(phase["wall_time"], 0)
+                self.assertGreaterEqual(phase["cpu_time"], 0)
+                self.assertIsInstance(phase["peak_rss_delta"], int)
+                self.assertGreaterEqual(phase["peak_rss_delta"], 0)
+            for name, size in p["relations"].items():
+                self.assertIsInstance(name, str)
+                self.assertIsInstance(size, int)
+                self.assertGreaterEqual(size, 0)
+
+        # The disassembly pass is a Datalog pass: its relations are recorded.
+        relations = passes[0]["relations"]
+        self.assertGreater(relations["code_in_block"], 0)
+        self.assertGreater(relations["instruction"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
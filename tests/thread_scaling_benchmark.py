@@ -0,0 +1,238 @@
+"""
+Measure how ddisasm scales with the number of Datalog threads.
+
+Each selected example of the end-to-end YAML configs is compiled once and
+disassembled repeatedly at each thread count. Wall time, user and system
+time and peak RSS of every run are written to a CSV and/or JSON report.
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from disassemble_reassemble_check import (
+    bcolors,
+    cd,
+    compile,
+    get_target,
+    measure,
+)
+from end2end_test import example_args, load_cases
+
+
+class Sample(NamedTuple):
+    """
+    One disassembly of one example.
+    """
+
+    config: str
+    example: str
+    compiler: str
+    optimization: str
+    threads: int
+    trial: int
+    returncode: int
+    wall_time: float
+    user_time: Optional[float]
+    sys_time: Optional[float]
+    peak_rss: Optional[int]
+
+
+def benchmark_case(case, threads: List[int], trials: int) -> List[Sample]:
+    """
+    Compile the example of an end-to-end case and disassemble it 'trials'
+    times with each number of threads.
+    """
+    args = example_args(case.test)
+    make_dir = Path(case.test["path"]) / case.test["name"]
+    binary = case.test.get("binary", case.test["name"])
+    samples = []
+    with cd(make_dir):
+        print(
+            bcolors.okblue(
+                "Benchmarking",
+                str(make_dir),
+                "with",
+                case.compiler,
+                "and",
+                case.optimization,
+            )
+        )
+        if not compile(
+            case.compiler,
+            case.cxx_compiler,
+            case.optimization,
+            args["extra_compile_flags"],
+            args["exec_wrapper"],
+            args["arch"],
+        ):
+            print(bcolors.fail("Compilation failed"))
+            return samples
+
+        with get_target(
+            binary, args["strip_exe"], args["strip"], args["sstrip"]
+        ) as target_binary, tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "out.gtirb")
+            for count in threads:
+                cmd = ["ddisasm", target_binary, "--ir", output]
+                cmd += ["-j", str(count)] + args["extra_ddisasm_flags"]
+                for trial in range(trials):
+                    result = measure(cmd, stdout=subprocess.DEVNULL)
+                    samples.append(
+                        Sample(
+                            "{}:{}".format(Path(case.config).name, case.index),
+                            str(make_dir),
+                            case.compiler,
+                            case.optimization,
+                            count,
+                            trial,
+                            **result,
+                        )
+                    )
+                    print(
+                        "  -j {:<3} trial {}: {:.2f}s wall".format(
+                            count, trial, result["wall_time"]
+                        )
+                    )
+    return samples
+
+
+def _median(values):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def summarize(samples: List[Sample]) -> List[dict]:
+    """
+    Compute the median of each measure for each example and thread count,
+    and the speedup over the smallest thread count.
+    """
+    groups = {}
+    for sample in samples:
+        if sample.returncode != 0:
+            continue
+        key = (
+            sample.config,
+            sample.example,
+            sample.compiler,
+            sample.optimization,
+        )
+        groups.setdefault(key, {}).setdefault(sample.threads, []).append(
+            sample
+        )
+
+    summary = []
+    for key, by_threads in groups.items():
+        config, example, compiler, optimization = key
+        baseline = None
+        for count in sorted(by_threads):
+            runs = by_threads[count]
+            wall_time = statistics.median(s.wall_time for s in runs)
+            if baseline is None:
+                baseline = wall_time
+            rss = [s.peak_rss for s in runs if s.peak_rss is not None]
+            summary.append(
+                {
+                    "config": config,
+                    "example": example,
+                    "compiler": compiler,
+                    "optimization": optimization,
+                    "threads": count,
+                    "trials": len(runs),
+                    "wall_time": wall_time,
+                    "user_time": _median(s.user_time for s in runs),
+                    "sys_time": _median(s.sys_time for s in runs),
+                    "peak_rss": max(rss) if rss else None,
+                    "speedup": baseline / wall_time if wall_time else None,
+                }
+            )
+    return summary
+
+
+def ddisasm_version() -> str:
+    completed_process = subprocess.run(
+        ["ddisasm", "--version"], stdout=subprocess.PIPE, encoding="utf-8"
+    )
+    return completed_process.stdout.strip()
+
+
+def default_threads() -> List[int]:
+    """
+    Powers of two up to the number of CPUs.
+    """
+    threads = [1]
+    while threads[-1] * 2 <= (os.cpu_count() or 1):
+        threads.append(threads[-1] * 2)
+    return threads
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure how ddisasm scales with the number of threads."
+    )
+    parser.add_argument(
+        "configs",
+        nargs="*",
+        help="YAML configs of the examples (default: tests/*.yaml)",
+    )
+    parser.add_argument(
+        "--example",
+        action="append",
+        help="only benchmark examples with this name (repeatable)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=lambda arg: [int(n) for n in arg.split(",")],
+        default=default_threads(),
+        help="comma-separated thread counts (default: powers of two up to "
+        "the number of CPUs)",
+    )
+    parser.add_argument(
+        "--trials", type=int, default=3, help="runs per thread count"
+    )
+    parser.add_argument("--csv", help="write every run to this CSV file")
+    parser.add_argument(
+        "--json", help="write every run and a summary to this JSON file"
+    )
+    args = parser.parse_args()
+
+    cases, _ = load_cases(args.configs or sorted(Path("tests").glob("*.yaml")))
+    if args.example:
+        cases = [c for c in cases if c.test["name"] in args.example]
+
+    samples = []
+    for case in cases:
+        samples += benchmark_case(case, args.threads, args.trials)
+    summary = summarize(samples)
+
+    for row in summary:
+        print(
+            "{example} {compiler} {optimization} -j {threads}: "
+            "{wall_time:.2f}s wall, {speedup:.2f}x".format(**row)
+        )
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(Sample._fields)
+            writer.writerows(samples)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "ddisasm_version": ddisasm_version(),
+                    "samples": [s._asdict() for s in samples],
+                    "summary": summary,
+                },
+                f,
+                indent=2,
+            )
+
+    failures = sum(1 for s in samples if s.returncode != 0)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,76 @@
+import json
+import platform
+import unittest
+from pathlib import Path
+
+from disassemble_reassemble_check import compile, cd, disassemble
+
+ex_dir = Path("./examples/")
+
+
+class TraceEventsTest(unittest.TestCase):
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_trace_events(self):
+        """Test the Chrome trace written by `--trace-events'."""
+        with cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+            self.assertTrue(
+                disassemble(
+                    "ex", "ex.s", extra_args=["--trace-events", "trace.json"]
+                )[0]
+            )
+            with open("trace.json") as f:
+                trace = json.load(f)
+
+        events = trace["traceEvents"]
+        self.assertTrue(events)
+        for event in events:
+            # Complete events carry their own duration: no B/E pairs to match.
+            self.assertEqual(event["ph"], "X")
+            self.assertIsInstance(event["pid"], int)
+            self.assertIsInstance(event["tid"], int)
+            self.assertGreaterEqual(event["ts"], 0)
+            self.assertGreaterEqual(event["dur"], 0)
+            self.assertIsInstance(event["name"], str)
+            self.assertIsInstance(event["args"]["module"], str)
+
+        def spans(cat, name=None):
+            return [
+                e
+                for e in events
+                if e["cat"] == cat and (name is None or e["name"] == name)
+            ]
+
+        def contains(outer, inner):
+            return (
+                outer["ts"] <= inner["ts"]
+                and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+            )
+
+        self.assertEqual(len(spans("ddisasm", "build")), 1)
+        self.assertEqual(len(spans("ddisasm", "print")), 1)
+        (module,) = spans("module", "ex")
+        passes = spans("pass")
+        self.assertEqual(
+            [p["name"] for p in passes],
+            [
+                "disassembly",
+                "SCC analysis",
+                "no return analysis",
+                "function inference",
+            ],
+        )
+        for phase in spans("phase"):
+            self.assertIn(phase["name"], ("load", "analyze", "transform"))
+            self.assertEqual(phase["args"]["module"], "ex")
+            self.assertTrue(any(contains(p, phase) for p in passes))
+        for p in passes:
+            self.assertEqual(p["args"]["module"], "ex")
+            self.assertTrue(contains(module, p))
+        self.assertTrue(spans("phase", "analyze"))
+
+
+if __name__ == "__main__":
+    unittest.main()